@@ -1,13 +1,21 @@
+from collections.abc import Iterator
 from dataclasses import dataclass
 
 import requests
+from cache import DEFAULT_CACHE_TTL, TTLCache
 from client import VCSClient, VCSRepoClient
 from common import (
+    PULL_REQUEST_DECLINED,
+    PULL_REQUEST_MERGED,
+    PULL_REQUEST_OPEN,
     CredentialsValidationError,
+    PullRequestAccessError,
     PullRequestCreationError,
     PullRequestInfo,
+    PullRequestStatus,
     RepositoryAccessError,
     RepositoryInfo,
+    parse_datetime,
 )
 
 
@@ -16,13 +24,20 @@ class ADORepositoryInfo(RepositoryInfo):
     organization: str
     project: str
 
+    @property
+    def full_name(self) -> str:
+        return f"{self.organization}/{self.project}/{self.name}"
+
 
 class ADOClient(VCSClient):
     token_prefix = "Basic"
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, cache: TTLCache | None = None, **kwargs):
         super().__init__(*args, **kwargs)
         self.headers["Accept"] = "application/json;api-version=6.0;"
+        # Repository lists and language metrics are per project: they are fetched
+        # once per project and shared by the workers
+        self.cache = cache if cache is not None else TTLCache(DEFAULT_CACHE_TTL)
 
     def validate_credentials(self) -> None:
         """
@@ -42,29 +57,21 @@ class ADOClient(VCSClient):
 
         organization, project, repository = repo_paths
 
-        try:
-            resp = self.get(
-                f"{organization}/{project}/_apis/git/repositories/{repository}"
-            )
-            resp.json()
-            if resp.status_code == 401:
-                raise CredentialsValidationError(
-                    f"Invalid Azure DevOps token for {self.instance_url}"
-                )
-        except (
-            requests.exceptions.ConnectionError,
-            requests.exceptions.JSONDecodeError,
-        ):
-            raise CredentialsValidationError(
-                f"Can't connect to Azure DevOps at {self.instance_url}"
-            )
-
-        if not resp.ok:
+        repositories = self._list_project_repositories(organization, project)
+        data = next(
+            (
+                data
+                for data in repositories
+                if repository.lower() in (data["name"].lower(), data["id"].lower())
+            ),
+            None,
+        )
+        if data is None:
             raise RepositoryAccessError(
-                f"Can't get repository info for {repo_name}: {resp.json()['message']}"
+                f"Can't get repository info for {repo_name}: the repository does not exist "
+                f"in {organization}/{project} or you do not have permissions to access it"
             )
 
-        data = resp.json()
         default_branch = data.get("defaultBranch", None)
         name = data["name"]
         repo_id = data["id"]
@@ -74,26 +81,8 @@ class ADOClient(VCSClient):
                 f"Repository does not have a default branch: {repo_name}"
             )
 
-        language = None
-
-        resp = self.get(
-            f"{organization}/{project}/_apis/projectanalysis/languagemetrics"
-        )
-
-        if resp.status_code == 401:
-            print(
-                f"Can't get language metrics for {repo_name}. You need to include Analytics scope for your PAT"
-            )
-        else:
-            data = resp.json()
-
-            if data and "languageBreakdown" in data:
-                language_data = data["languageBreakdown"]
-                if language_data:
-                    language = language_data[0]["name"].lower()
-
         return ADORepositoryInfo(
-            main_language=language,
+            main_language=self._get_language(organization, project, repo_id),
             default_branch=default_branch,
             name=name,
             id=repo_id,
@@ -101,6 +90,144 @@ class ADOClient(VCSClient):
             organization=organization,
         )
 
+    def _list_project_repositories(self, organization: str, project: str) -> list[dict]:
+        """
+        Get the repositories of a project, from the cache if possible
+        """
+
+        def list_repositories() -> list[dict]:
+            try:
+                resp = self.get(f"{organization}/{project}/_apis/git/repositories")
+                resp.json()
+                if resp.status_code == 401:
+                    raise CredentialsValidationError(
+                        f"Invalid Azure DevOps token for {self.instance_url}"
+                    )
+            except (
+                requests.exceptions.ConnectionError,
+                requests.exceptions.JSONDecodeError,
+            ):
+                raise CredentialsValidationError(
+                    f"Can't connect to Azure DevOps at {self.instance_url}"
+                )
+
+            if not resp.ok:
+                raise RepositoryAccessError(
+                    f"Can't list repositories of {organization}/{project}: {resp.json()['message']}"
+                )
+            return resp.json()["value"]
+
+        return self.cache.get(
+            f"repositories:{self.instance_url}/{organization}/{project}",
+            list_repositories,
+        )
+
+    def _get_language(
+        self, organization: str, project: str, repo_id: str
+    ) -> str | None:
+        """
+        Get the main language of a repository from the language metrics of its
+        project, which are fetched once per project.
+        Fall back to the main language of the project.
+        """
+
+        def get_language_metrics() -> dict:
+            resp = self.get(
+                f"{organization}/{project}/_apis/projectanalysis/languagemetrics"
+            )
+
+            if resp.status_code == 401:
+                print(
+                    f"Can't get language metrics for {organization}/{project}. You need to include Analytics scope for your PAT"
+                )
+                return {}
+            return resp.json() or {}
+
+        data = self.cache.get(
+            f"languagemetrics:{self.instance_url}/{organization}/{project}",
+            get_language_metrics,
+        )
+
+        for repo_data in data.get("repositoryLanguageAnalytics") or []:
+            if repo_data.get("id") == repo_id and repo_data.get("languageBreakdown"):
+                return repo_data["languageBreakdown"][0]["name"].lower()
+
+        language_data = data.get("languageBreakdown")
+        if language_data:
+            return language_data[0]["name"].lower()
+        return None
+
+    def iter_repositories(
+        self, namespace: str, include_archived: bool = False
+    ) -> Iterator[RepositoryInfo]:
+        """
+        List the repositories of an Azure DevOps project, given as organization/project.
+        Disabled repositories are considered archived.
+        """
+        project_paths = namespace.split("/")
+        if len(project_paths) != 2:
+            raise RepositoryAccessError(
+                "Organization name should be included in the project path: organization/project"
+            )
+
+        organization, project = project_paths
+        for data in self._list_project_repositories(organization, project):
+            if data.get("isDisabled") and not include_archived:
+                continue
+            if not data.get("defaultBranch"):
+                continue
+            yield ADORepositoryInfo(
+                main_language=self._get_language(organization, project, data["id"]),
+                default_branch=data["defaultBranch"],
+                name=data["name"],
+                id=data["id"],
+                project=project,
+                organization=organization,
+            )
+
+    def get_pull_request(self, pull_request_url: str) -> dict:
+        """
+        Get a pull request from its URL,
+        e.g. https://dev.azure.com/organization/project/_git/repository/pullrequest/3
+        """
+        path = pull_request_url.removeprefix(self.instance_url).strip("/").split("/")
+        if len(path) != 6 or path[2] != "_git" or path[4] != "pullrequest":
+            raise PullRequestAccessError(f"Invalid pull request URL: {pull_request_url}")
+        organization, project, _, _, _, pull_request_id = path
+
+        resp = self.get(
+            f"{organization}/{project}/_apis/git/pullrequests/{pull_request_id}"
+        )
+        if not resp.ok:
+            raise PullRequestAccessError(
+                f"Can't get pull request {pull_request_url}: {resp.json()['message']}"
+            )
+        return resp.json()
+
+    def pull_request_status(self, pull_request: dict) -> PullRequestStatus:
+        state = {
+            "completed": PULL_REQUEST_MERGED,
+            "abandoned": PULL_REQUEST_DECLINED,
+        }.get(pull_request["status"], PULL_REQUEST_OPEN)
+
+        repository = pull_request["repository"]
+        organization = (
+            pull_request["url"].removeprefix(self.instance_url).strip("/").split("/")[0]
+        )
+        return PullRequestStatus(
+            state=state,
+            created_at=parse_datetime(pull_request["creationDate"]),
+            branch=pull_request["sourceRefName"].removeprefix("refs/heads/"),
+            repository=ADORepositoryInfo(
+                main_language=None,
+                default_branch=pull_request["targetRefName"],
+                name=repository["name"],
+                id=repository["id"],
+                project=repository["project"]["name"],
+                organization=organization,
+            ),
+        )
+
 
 class ADORepoClient(VCSRepoClient):
     token_prefix = "Basic"
@@ -148,12 +275,13 @@ class ADORepoClient(VCSRepoClient):
                         "changes": [
                             {
                                 "changeType": "add",
-                                "item": {"path": f"/{pr_info.filename}"},
+                                "item": {"path": f"/{file.filename}"},
                                 "newContent": {
-                                    "content": pr_info.content,
+                                    "content": file.content,
                                     "contentType": "rawtext",
                                 },
                             }
+                            for file in pr_info.files
                         ],
                     }
                 ],
@@ -0,0 +1,164 @@
+"""
+Measure the throughput of disseminate_honeytokens.py against the local mocks of
+mock_servers.py, for each VCS and number of repositories.
+
+The arguments after -- are given to disseminate_honeytokens.py, e.g.
+python benchmark.py --vcs github --sizes 100 1000 -- --workers 32
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from mock_servers import (
+    GitGuardianBackend,
+    MockServer,
+    add_settings_arguments,
+    create_vcs_backend,
+    namespace_for_vcs,
+    settings_from_arguments,
+)
+
+DEFAULT_SIZES = [100, 1000, 10000]
+# The mocks have no secondary rate limits, unless --rate-limit is set
+DEFAULT_DISSEMINATION_ARGUMENTS = ["--vcs-write-interval", "0"]
+
+
+class BenchmarkError(Exception):
+    ...
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure the repositories per minute of disseminate_honeytokens.py "
+        "against local mocks of the VCS and of GitGuardian"
+    )
+    parser.add_argument(
+        "--vcs",
+        nargs="+",
+        choices=["github", "gitlab", "ado", "bitbucket"],
+        default=["github", "gitlab", "ado", "bitbucket"],
+        help="Version control systems to benchmark",
+    )
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        type=int,
+        default=DEFAULT_SIZES,
+        help="Numbers of repositories to disseminate in",
+    )
+    parser.add_argument(
+        "--output",
+        choices=["json", "text"],
+        default="text",
+        help="Output format",
+    )
+    add_settings_arguments(parser)
+    args, dissemination_arguments = parser.parse_known_args()
+    if dissemination_arguments[:1] == ["--"]:
+        dissemination_arguments = dissemination_arguments[1:]
+    settings = settings_from_arguments(args)
+
+    results = []
+    for vcs in args.vcs:
+        for size in args.sizes:
+            try:
+                result = run_benchmark(vcs, size, settings, dissemination_arguments)
+            except BenchmarkError as error:
+                print(error, file=sys.stderr)
+                continue
+            results.append(result)
+            print(format_result(result), file=sys.stderr)
+
+    if args.output == "json":
+        print(json.dumps(results, indent=2))
+    else:
+        print_results(results)
+
+
+def run_benchmark(vcs: str, size: int, settings, dissemination_arguments: list[str]) -> dict:
+    """
+    Disseminate in `size` mocked repositories of a VCS, discovered from their namespace
+    :return: the summary of the run, with the number of requests received by each mock
+    """
+    vcs_server = MockServer(create_vcs_backend(vcs, size), settings).start()
+    gitguardian_server = MockServer(GitGuardianBackend(), settings).start()
+    try:
+        process = subprocess.run(
+            [
+                sys.executable,
+                os.path.join(os.path.dirname(os.path.abspath(__file__)), "disseminate_honeytokens.py"),
+                "--vcs",
+                vcs,
+                "--namespaces",
+                namespace_for_vcs(vcs),
+                "--output",
+                "jsonl",
+                *DEFAULT_DISSEMINATION_ARGUMENTS,
+                *dissemination_arguments,
+            ],
+            env={
+                **os.environ,
+                "VCS_URL": vcs_server.url,
+                "VCS_TOKEN": "mock",
+                "GITGUARDIAN_URL": gitguardian_server.url,
+                "GITGUARDIAN_TOKEN": "mock",
+            },
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+    finally:
+        vcs_server.stop()
+        gitguardian_server.stop()
+
+    lines = process.stdout.strip().splitlines()
+    summary = json.loads(lines[-1])["summary"] if lines else {}
+    if process.returncode != 0 or not summary:
+        message = process.stderr.strip().splitlines()[-1:] or ["no output"]
+        raise BenchmarkError(
+            f"{vcs}: the dissemination in {size} repositories failed: {message[0]}"
+        )
+
+    return {
+        "vcs": vcs,
+        "size": size,
+        "ok": summary["ok"],
+        "failed": summary["failed"],
+        "seconds": summary["seconds"],
+        "repositories_per_minute": summary["repositories_per_minute"],
+        "vcs_requests": vcs_server.requests,
+        "gitguardian_requests": gitguardian_server.requests,
+        "average_step_seconds": summary["average_step_seconds"],
+    }
+
+
+def format_result(result: dict) -> str:
+    return (
+        f"{result['vcs']}: {result['size']} repositories in {result['seconds']}s, "
+        f"{result['repositories_per_minute']} per minute ({result['failed']} failed)"
+    )
+
+
+def print_results(results: list[dict]):
+    header = ["VCS", "Repositories", "Failed", "Seconds", "Repos/minute", "VCS requests"]
+    rows = [
+        [
+            result["vcs"],
+            result["size"],
+            result["failed"],
+            result["seconds"],
+            result["repositories_per_minute"],
+            result["vcs_requests"],
+        ]
+        for result in results
+    ]
+    widths = [max(len(str(row[index])) for row in [header, *rows]) for index in range(len(header))]
+    for row in [header, *rows]:
+        print("  ".join(str(value).rjust(width) for value, width in zip(row, widths)))
+
+
+if __name__ == "__main__":
+    main()
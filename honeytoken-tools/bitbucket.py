@@ -1,11 +1,20 @@
+from collections.abc import Iterator
 from dataclasses import dataclass
+from datetime import datetime, timezone
 
 import requests
+from cache import DEFAULT_CACHE_TTL, TTLCache
 from client import VCSClient, VCSRepoClient
 from common import (
+    PULL_REQUEST_DECLINED,
+    PULL_REQUEST_MERGED,
+    PULL_REQUEST_OPEN,
     CredentialsValidationError,
+    PullRequestAccessError,
     PullRequestCreationError,
+    PullRequestFile,
     PullRequestInfo,
+    PullRequestStatus,
     RepositoryAccessError,
     RepositoryInfo,
 )
@@ -15,8 +24,25 @@ from common import (
 class BitBucketRepositoryInfo(RepositoryInfo):
     project: str
 
+    @property
+    def full_name(self) -> str:
+        return f"{self.project}/{self.name}"
+
 
 class BitBucketClient(VCSClient):
+    def __init__(
+        self,
+        *args,
+        cache: TTLCache | None = None,
+        default_branch: str | None = None,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        # Repositories are listed once per project and shared by the workers
+        self.cache = cache if cache is not None else TTLCache(DEFAULT_CACHE_TTL)
+        # Default branch of the repositories whose listing doesn't include it
+        self.default_branch = default_branch
+
     @property
     def common_url_path(self) -> str | None:
         return "rest/api/1.0"
@@ -47,32 +73,153 @@ class BitBucketClient(VCSClient):
 
         project_key, repository_slug = repo_paths
 
-        resp = self.get(f"projects/{project_key}/repos/{repository_slug}")
-        if not resp.ok:
+        repositories = self._list_project_repositories(project_key)
+        data = next(
+            (
+                data
+                for data in repositories
+                if data["slug"].lower() == repository_slug.lower()
+            ),
+            None,
+        )
+        if data is None:
             raise RepositoryAccessError(
-                f"Can't get repository info for {repo_name}: {resp.json()['errors'][0]['message']}"
+                f"Can't get repository info for {repo_name}: Repository {project_key}/{repository_slug} does not exist."
             )
 
-        data = resp.json()
-        repo_id = data["id"]
+        return BitBucketRepositoryInfo(
+            main_language=None,
+            default_branch=self._get_default_branch(project_key, data),
+            name=data["slug"],
+            id=data["id"],
+            project=project_key,
+        )
+
+    def _list_project_repositories(self, project_key: str) -> list[dict]:
+        """
+        Get the id, slug, archived state and default branch (when the server
+        returns it) of all the repositories of a project, from the cache if possible
+        """
+
+        def list_repositories() -> list[dict]:
+            repositories = []
+            start = 0
+            while True:
+                resp = self.get(f"projects/{project_key}/repos?start={start}&limit=1000")
+                if not resp.ok:
+                    raise RepositoryAccessError(
+                        f"Can't list repositories of {project_key}: {resp.json()['errors'][0]['message']}"
+                    )
+
+                page = resp.json()
+                repositories.extend(
+                    {
+                        "id": data["id"],
+                        "slug": data["slug"],
+                        "archived": data.get("archived", False),
+                        "default_branch": data.get("defaultBranch"),
+                    }
+                    for data in page["values"]
+                )
+                if page.get("isLastPage", True):
+                    return repositories
+                start = page["nextPageStart"]
+
+        return self.cache.get(
+            f"repositories:{self.instance_url}/{project_key}", list_repositories
+        )
+
+    def _get_default_branch(self, project_key: str, data: dict) -> str:
+        """
+        Get the default branch of a repository listed by _list_project_repositories.
+        Servers that don't return it in the listing are asked once per repository,
+        unless a default branch was given to the client.
+        """
+        default_branch = data["default_branch"] or self.default_branch
+        if default_branch:
+            if not default_branch.startswith("refs/"):
+                default_branch = f"refs/heads/{default_branch}"
+            return default_branch
+
+        repository_slug = data["slug"]
+
+        def get_default_branch() -> str:
+            resp = self.get(
+                f"projects/{project_key}/repos/{repository_slug}/default-branch"
+            )
+            if not resp.ok:
+                raise RepositoryAccessError(
+                    f"Can't get default branch for {project_key}/{repository_slug}: "
+                    f"{resp.json()['errors'][0]['message']}"
+                )
+            return resp.json()["id"]
+
+        return self.cache.get(
+            f"default-branch:{self.instance_url}/{project_key}/{repository_slug}",
+            get_default_branch,
+        )
+
+    def iter_repositories(
+        self, namespace: str, include_archived: bool = False
+    ) -> Iterator[RepositoryInfo]:
+        """
+        List the repositories of a BitBucket Server project, given by its key
+        """
+        for data in self._list_project_repositories(namespace):
+            if data["archived"] and not include_archived:
+                continue
+            try:
+                default_branch = self._get_default_branch(namespace, data)
+            except RepositoryAccessError:
+                # Empty repositories have no default branch
+                continue
+            yield BitBucketRepositoryInfo(
+                main_language=None,
+                default_branch=default_branch,
+                name=data["slug"],
+                id=data["id"],
+                project=namespace,
+            )
+
+    def get_pull_request(self, pull_request_url: str) -> dict:
+        """
+        Get a pull request from its URL,
+        e.g. https://bitbucket.example.com/projects/PROJECT/repos/repository/pull-requests/3
+        """
+        path = pull_request_url.removeprefix(self.instance_url).strip("/").split("/")
+        if len(path) < 6 or path[0] != "projects" or path[4] != "pull-requests":
+            raise PullRequestAccessError(f"Invalid pull request URL: {pull_request_url}")
+        _, project_key, _, repository_slug, _, pull_request_id = path[:6]
 
         resp = self.get(
-            f"projects/{project_key}/repos/{repository_slug}/default-branch"
+            f"projects/{project_key}/repos/{repository_slug}/pull-requests/{pull_request_id}"
         )
         if not resp.ok:
-            raise RepositoryAccessError(
-                f"Can't get default branch for {repo_name}: {resp.json()['errors'][0]['message']}"
+            raise PullRequestAccessError(
+                f"Can't get pull request {pull_request_url}: {resp.json()['errors'][0]['message']}"
             )
+        return resp.json()
 
-        data = resp.json()
-        default_branch = data["id"]
+    def pull_request_status(self, pull_request: dict) -> PullRequestStatus:
+        state = {
+            "MERGED": PULL_REQUEST_MERGED,
+            "DECLINED": PULL_REQUEST_DECLINED,
+        }.get(pull_request["state"], PULL_REQUEST_OPEN)
 
-        return BitBucketRepositoryInfo(
-            main_language=None,
-            default_branch=default_branch,
-            name=repository_slug,
-            id=repo_id,
-            project=project_key,
+        repository = pull_request["toRef"]["repository"]
+        return PullRequestStatus(
+            state=state,
+            created_at=datetime.fromtimestamp(
+                pull_request["createdDate"] / 1000, timezone.utc
+            ),
+            branch=pull_request["fromRef"]["displayId"],
+            repository=BitBucketRepositoryInfo(
+                main_language=None,
+                default_branch=pull_request["toRef"]["id"],
+                name=repository["slug"],
+                id=repository["id"],
+                project=repository["project"]["key"],
+            ),
         )
 
 
@@ -94,19 +241,35 @@ class BitBucketRepoClient(VCSRepoClient):
     def create_new_commit(
         self, pr_info: PullRequestInfo, repo_info: RepositoryInfo
     ) -> None:
-        resp = self.put(
-            f"browse/{pr_info.filename}",
-            data={
-                "content": pr_info.content,
-                "message": pr_info.commit_message,
-                "branch": pr_info.branch,
-            },
-        )
+        """
+        BitBucket Server creates a commit per file, the files are added by
+        successive commits on the branch. The files already on the branch, committed
+        by a dissemination interrupted before its last file, are not added again.
+        """
+        for file in pr_info.files:
+            resp = self.put(
+                f"browse/{file.filename}",
+                data={
+                    "content": file.content,
+                    "message": pr_info.commit_message,
+                    "branch": pr_info.branch,
+                },
+            )
+
+            if not resp.ok and not self.file_committed(pr_info.branch, file):
+                raise PullRequestCreationError(
+                    f"Can't create new commit: {resp.json()['errors'][0]['message']}"
+                )
 
+    def file_committed(self, branch_name: str, file: PullRequestFile) -> bool:
+        """
+        Whether a file is on the branch with the same content
+        """
+        resp = self.get(f"browse/{file.filename}?at=refs/heads/{branch_name}&limit=1000")
         if not resp.ok:
-            raise PullRequestCreationError(
-                f"Can't create new commit: {resp.json()['errors'][0]['message']}"
-            )
+            return False
+        lines = [line["text"] for line in resp.json()["lines"]]
+        return lines == file.content.splitlines()
 
     def create_pull_request(
         self,
@@ -151,8 +314,9 @@ class BitBucketRepoClient(VCSRepoClient):
         return data["links"]["self"][0]["href"]
 
     def delete_branch(self, branch_name: str) -> None:
-        # use here directly requests since different api is used to delete branch
-        resp = requests.delete(
+        # use here directly the full url since different api is used to delete branch
+        resp = self.request(
+            "DELETE",
             f"{self.instance_url}/rest/branch-utils/1.0/projects/{self.repo_info.project}/"
             f"repos/{self.repo_info.name}/"
             "branches",
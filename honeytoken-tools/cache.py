@@ -0,0 +1,69 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+DEFAULT_CACHE_TTL = 3600.0
+
+
+class TTLCache:
+    """
+    Thread-safe cache of API responses, whose entries expire after `ttl` seconds.
+
+    Concurrent lookups of a missing key wait for a single computation of its value,
+    so that workers sharing the cache don't send the same request several times.
+    With a path, the entries are also stored in a JSON file and reused by later runs.
+    """
+
+    def __init__(self, ttl: float, path: str | None = None):
+        self.ttl = ttl
+        self.path = path
+        self.lock = threading.Lock()
+        self.key_locks: dict[str, threading.Lock] = {}
+        # key -> {"expires_at": epoch seconds, "value": ...}
+        self.entries: dict[str, dict] = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+
+    def get(self, key: str, compute: Callable[[], Any]) -> Any:
+        """
+        Get the value of a key, computing it with `compute` if it is missing or expired.
+        The value must be serializable to JSON.
+        """
+        value = self._lookup(key)
+        if value is not None:
+            return value
+
+        with self.lock:
+            key_lock = self.key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            # computed by another thread while waiting for the lock
+            value = self._lookup(key)
+            if value is not None:
+                return value
+
+            value = compute()
+            with self.lock:
+                self.entries[key] = {"expires_at": time.time() + self.ttl, "value": value}
+                if self.path:
+                    self._save()
+            return value
+
+    def _lookup(self, key: str) -> Any:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry["expires_at"] <= time.time():
+                return None
+            return entry["value"]
+
+    def _save(self) -> None:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with tempfile.NamedTemporaryFile(
+            "w", dir=directory, delete=False, suffix=".tmp"
+        ) as f:
+            json.dump(self.entries, f)
+        os.replace(f.name, self.path)
@@ -1,7 +1,47 @@
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
 from copy import copy
 
 import requests
-from common import PullRequestInfo, RepositoryInfo
+from common import (
+    PullRequestInfo,
+    PullRequestStatus,
+    RepositoryAccessError,
+    RepositoryInfo,
+)
+from metrics import RequestStats
+from rate_limit import RateLimitScheduler
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_RETRIES = 3
+
+
+def create_session(
+    pool_size: int = 10,
+    retries: int = DEFAULT_RETRIES,
+    backoff_factor: float = 0.5,
+) -> requests.Session:
+    """
+    Create a session keeping up to `pool_size` connections alive per host.
+    Connection errors and 502/503/504 responses are retried with an exponential
+    backoff, for idempotent methods only: a POST creating a branch or a
+    honeytoken is never sent twice.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
 
 
 class ApiTokenClient:
@@ -16,35 +56,108 @@ class ApiTokenClient:
         self,
         instance_url: str,
         instance_token: str,
+        limiter: threading.BoundedSemaphore | None = None,
+        session: requests.Session | None = None,
+        timeout: float | None = DEFAULT_TIMEOUT,
+        scheduler: RateLimitScheduler | None = None,
+        stats: RequestStats | None = None,
     ):
         self.instance_url = instance_url
         self.instance_token = instance_token
+        # The limiter caps the number of concurrent requests to the host, the session
+        # keeps its connections alive and the scheduler follows the rate limits of the
+        # host. They are shared by the clients created from this one, see connection_kwargs,
+        # as well as the stats of the requests.
+        self.limiter = limiter
+        self.session = session if session is not None else create_session()
+        self.timeout = timeout
+        self.scheduler = scheduler
+        self.stats = stats
 
         self.headers = {
             "Authorization": f"{self.token_prefix} {self.instance_token}",
         }
 
+    def connection_kwargs(self) -> dict:
+        """
+        Keyword arguments to give to the clients created from this one,
+        so that they share its connection settings
+        """
+        return {
+            "limiter": self.limiter,
+            "session": self.session,
+            "timeout": self.timeout,
+            "scheduler": self.scheduler,
+            "stats": self.stats,
+        }
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send a request. With a scheduler, the request waits for the rate limits of
+        the host and is sent again when it is rejected by a rate limit.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        retries = 0
+        while True:
+            if self.scheduler is not None:
+                self.scheduler.wait(method)
+
+            started_at = time.perf_counter()
+            resp = self._send(method, url, **kwargs)
+            latency = time.perf_counter() - started_at
+
+            delay = self.scheduler.update(resp) if self.scheduler is not None else None
+            if self.stats is not None:
+                self.stats.record(url, latency, resp, rate_limited=delay is not None)
+            if delay is None or retries >= self.scheduler.max_retries:
+                return resp
+            retries += 1
+
+    def _send(self, method: str, url: str, **kwargs) -> requests.Response:
+        if self.limiter is None:
+            return self.session.request(method, url, **kwargs)
+        with self.limiter:
+            return self.session.request(method, url, **kwargs)
+
     def get(self, path: str) -> requests.Response:
-        return requests.get(self.get_url(path), headers=self.headers)
+        return self.request("GET", self.get_url(path), headers=self.headers)
 
     def post(self, path: str, json) -> requests.Response:
-        return requests.post(
+        return self.request(
+            "POST",
             self.get_url(path),
             json=json,
             headers={**self.headers, "Content-Type": "application/json"},
         )
 
     def put(self, path: str, data: dict) -> requests.Response:
-        return requests.put(
+        return self.request(
+            "PUT",
             self.get_url(path),
             files=data,
             headers=self.headers,
         )
 
     def delete(self, path: str) -> requests.Response:
-        return requests.delete(self.get_url(path), headers=self.headers)
+        return self.request("DELETE", self.get_url(path), headers=self.headers)
+
+    def iter_pages(self, path: str) -> Iterator[requests.Response]:
+        """
+        Get a paginated resource, following the `next` links of the responses.
+        Stops after the first response that is not successful.
+        """
+        url = path
+        while url:
+            resp = self.get(url)
+            yield resp
+            if not resp.ok:
+                return
+            url = resp.links.get("next", {}).get("url")
 
     def get_url(self, path: str) -> str:
+        if path.startswith(("https://", "http://")):
+            # Absolute URL, e.g. taken from a pagination link
+            return path
         if self.common_url_path:
             return f"{self.instance_url}/{self.common_url_path}/{path}"
         else:
@@ -56,6 +169,9 @@ class VCSClient(ApiTokenClient):
     Base class for VCS clients
     """
 
+    # Number of repositories that get_repositories_info fetches at once
+    repositories_batch_size = 1
+
     def validate_credentials(self) -> None:
         """
         Validate the credentials and connection to the VCS with the credentials
@@ -71,8 +187,54 @@ class VCSClient(ApiTokenClient):
         """
         raise NotImplementedError
 
+    def get_repositories_info(
+        self, repo_names: list[str]
+    ) -> dict[str, RepositoryInfo | RepositoryAccessError]:
+        """
+        Get the info about several repositories
+        :param repo_names: names of the repositories
+        :return: info about each repository, or the error raised when it can't be accessed
+        """
+        results = {}
+        for repo_name in repo_names:
+            try:
+                results[repo_name] = self.get_repository_info(repo_name)
+            except RepositoryAccessError as error:
+                results[repo_name] = error
+        return results
+
+    def iter_repositories(
+        self, namespace: str, include_archived: bool = False
+    ) -> Iterator[RepositoryInfo]:
+        """
+        List the repositories of a namespace (organization, group or project),
+        page by page. Repositories without a default branch are skipped.
+        :param namespace: the namespace to list
+        :param include_archived: also list archived or disabled repositories
+        :return: info about each repository, as soon as its page is fetched
+        """
+        raise NotImplementedError
+
+    def get_pull_request(self, pull_request_url: str) -> dict:
+        """
+        Get a pull request opened by a dissemination
+        :param pull_request_url: URL of the pull request, as returned by create_pull_request
+        :return: the pull request, as returned by the VCS API
+        """
+        raise NotImplementedError
+
+    def pull_request_status(self, pull_request: dict) -> PullRequestStatus:
+        """
+        Get the state, creation date and branch of a pull request
+        :param pull_request: the pull request, as returned by get_pull_request
+        """
+        raise NotImplementedError
+
 
 class VCSRepoClient(VCSClient):
+    # The branch is created by the commit, create_new_branch does nothing
+    commit_creates_branch = False
+
     def __init__(self, repo_info: RepositoryInfo, *args, **kwargs):
         self.repo_info = repo_info
         super().__init__(*args, **kwargs)
@@ -93,11 +255,17 @@ class VCSRepoClient(VCSClient):
         """
         raise NotImplementedError
 
+    def branch_exists(self, branch_name: str) -> bool:
+        """
+        Whether a branch exists, required when commit_creates_branch is set
+        """
+        raise NotImplementedError
+
     def create_new_commit(
         self, pr_info: PullRequestInfo, repo_info: RepositoryInfo
     ) -> None:
         """
-        Create a new commit based on the info in PullRequestInfo
+        Create a new commit adding all the files of PullRequestInfo
         """
         raise NotImplementedError
 
@@ -117,13 +285,40 @@ class VCSRepoClient(VCSClient):
     #     """
     #     raise NotImplementedError
 
-    def disseminate_in_pull_request(self, pr_info: PullRequestInfo) -> str:
+    def disseminate_in_pull_request(
+        self,
+        pr_info: PullRequestInfo,
+        completed_steps: Iterable[str] = (),
+        on_step: Callable[[str], None] | None = None,
+    ) -> str:
         """
-        Create a pull request on a VCS repository
+        Create a pull request on a VCS repository.
+        The "branch" and "commit" steps in completed_steps are not done again,
+        on_step is called with the name of each step once it is done.
+        The branch is deleted if the pull request can't be created.
         """
-        self.create_new_branch(pr_info.branch, self.repo_info.default_branch)
+        completed_steps = set(completed_steps)
+
+        def step_done(step: str) -> None:
+            if on_step is not None:
+                on_step(step)
+
+        if "branch" not in completed_steps:
+            self.create_new_branch(pr_info.branch, self.repo_info.default_branch)
+            step_done("branch")
+        elif (
+            "commit" not in completed_steps
+            and self.commit_creates_branch
+            and self.branch_exists(pr_info.branch)
+        ):
+            # the commit creating the branch was done before the dissemination was
+            # interrupted: creating it again would fail on the existing branch
+            completed_steps.add("commit")
+            step_done("commit")
         try:
-            self.create_new_commit(pr_info, self.repo_info)
+            if "commit" not in completed_steps:
+                self.create_new_commit(pr_info, self.repo_info)
+                step_done("commit")
 
             merge_request_url = self.create_pull_request(
                 pr_info.branch,
@@ -1,8 +1,12 @@
 import random
 import re
 import string
+import sys
+import threading
+import time
 import unicodedata
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from datetime import datetime
 from urllib.parse import urlparse
 
 
@@ -36,6 +40,14 @@ class RepositoryAccessError(MessageError):
     ...
 
 
+class HoneyTokenAccessError(MessageError):
+    ...
+
+
+class PullRequestAccessError(MessageError):
+    ...
+
+
 class BitBucketCloudNotSupportedError(Exception):
     ...
 
@@ -47,6 +59,20 @@ class RepositoryInfo:
     default_branch: str
     main_language: str | None
 
+    @property
+    def full_name(self) -> str:
+        """
+        Name identifying the repository on its VCS instance, as given to --repo-names.
+        Used as the key of the ledger and of the results.
+        """
+        return self.name
+
+
+@dataclass
+class PullRequestFile:
+    filename: str
+    content: str
+
 
 @dataclass
 class PullRequestInfo:
@@ -54,6 +80,46 @@ class PullRequestInfo:
     commit_message: str
     branch: str
     filename: str
+    # files added by the same commit, after filename
+    extra_files: list[PullRequestFile] = field(default_factory=list)
+
+    @property
+    def files(self) -> list[PullRequestFile]:
+        """
+        All the files added by the commit
+        """
+        return [PullRequestFile(self.filename, self.content), *self.extra_files]
+
+
+# States of a pull request, see PullRequestStatus
+PULL_REQUEST_OPEN = "open"
+PULL_REQUEST_MERGED = "merged"
+PULL_REQUEST_DECLINED = "declined"
+
+
+@dataclass
+class PullRequestStatus:
+    state: str
+    created_at: datetime
+    # source branch, and repository to delete it from
+    branch: str
+    repository: RepositoryInfo
+
+
+def parse_datetime(value: str) -> datetime:
+    """
+    Parse an ISO 8601 date returned by a VCS API, e.g. 2024-01-31T10:00:00.1234567Z
+    """
+    date, _, fraction = value.removesuffix("Z").partition(".")
+    offset = "+00:00"
+    for sign in "+-":
+        if sign in fraction:
+            fraction, offset = fraction.split(sign, 1)
+            offset = sign + offset
+    if "+" in date[10:] or "-" in date[10:]:
+        return datetime.fromisoformat(date)
+    fraction = f".{fraction[:6].ljust(6, '0')}" if fraction else ""
+    return datetime.fromisoformat(f"{date}{fraction}{offset}")
 
 
 def generate_random_suffix() -> str:
@@ -111,3 +177,41 @@ def dashboard_to_api_url(dashboard_url: str) -> str:
             path=f"{parsed_url.path}{ON_PREMISE_API_URL_PATH_PREFIX}"
         )
     return parsed_url.geturl()
+
+
+class ProgressDisplay:
+    """
+    Thread-safe progress counter displayed on stderr.
+    The line is redrawn in place on a terminal, and printed once when done otherwise.
+    """
+
+    refresh_interval = 0.1
+
+    def __init__(self, label: str, total: int):
+        self.label = label
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.lock = threading.Lock()
+        self.interactive = sys.stderr.isatty()
+        self.last_refresh = 0.0
+
+    def advance(self, failed: bool = False) -> None:
+        with self.lock:
+            self.done += 1
+            self.failed += int(failed)
+            now = time.monotonic()
+            if self.interactive and (
+                now - self.last_refresh >= self.refresh_interval
+                or self.done == self.total
+            ):
+                self.last_refresh = now
+                sys.stderr.write(f"\r{self}")
+                sys.stderr.flush()
+
+    def finish(self) -> None:
+        sys.stderr.write(f"\r{self}\n" if self.interactive else f"{self}\n")
+        sys.stderr.flush()
+
+    def __str__(self) -> str:
+        return f"{self.label}: {self.done}/{self.total} ({self.failed} failed)"
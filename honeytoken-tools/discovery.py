@@ -0,0 +1,78 @@
+import hashlib
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from fnmatch import fnmatch
+
+from client import VCSClient
+from common import RepositoryInfo
+
+
+@dataclass
+class RepositoryFilter:
+    """
+    Selection of the discovered repositories.
+    Patterns are shell-style wildcards matched against the repository name,
+    languages are compared case-insensitively to the main language.
+    """
+
+    include: list[str] = field(default_factory=list)
+    exclude: list[str] = field(default_factory=list)
+    languages: list[str] = field(default_factory=list)
+    sample: float = 100.0
+
+    def matches(self, repo: RepositoryInfo) -> bool:
+        if self.include and not any(
+            fnmatch(repo.name, pattern) for pattern in self.include
+        ):
+            return False
+        if any(fnmatch(repo.name, pattern) for pattern in self.exclude):
+            return False
+        if self.languages and (repo.main_language or "") not in {
+            language.lower() for language in self.languages
+        }:
+            return False
+        return self.is_sampled(repo)
+
+    def is_sampled(self, repo: RepositoryInfo) -> bool:
+        """
+        Keep `sample` percent of the repositories. The choice only depends on the
+        repository name, so that re-running a rollout selects the same repositories.
+        """
+        if self.sample >= 100:
+            return True
+        digest = hashlib.sha256(repo.name.encode()).digest()
+        return int.from_bytes(digest[:8], "big") / 2**64 * 100 < self.sample
+
+
+def discover_repositories(
+    vcs_client: VCSClient,
+    namespaces: Iterable[str],
+    repository_filter: RepositoryFilter,
+    include_archived: bool = False,
+) -> Iterator[RepositoryInfo]:
+    """
+    List the repositories of all the namespaces that pass the filter.
+    Repositories are yielded as their page is fetched, each one only once.
+    """
+    seen_ids = set()
+    for namespace in dict.fromkeys(namespaces):
+        for repo in vcs_client.iter_repositories(namespace, include_archived):
+            if repo.id in seen_ids or not repository_filter.matches(repo):
+                continue
+            seen_ids.add(repo.id)
+            yield repo
+
+
+def unique_repositories(repos: Iterable[RepositoryInfo]) -> Iterator[RepositoryInfo]:
+    """
+    Yield each repository once, e.g. when it is both given to --repo-names and
+    listed in one of the namespaces. Repositories are compared by their full name,
+    case-insensitively like the ledger.
+    """
+    seen_names = set()
+    for repo in repos:
+        full_name = repo.full_name.lower()
+        if full_name in seen_names:
+            continue
+        seen_names.add(full_name)
+        yield repo
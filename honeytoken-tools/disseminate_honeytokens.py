@@ -1,13 +1,25 @@
 import argparse
+import itertools
 import json
 import os
-
+import posixpath
+import sys
+import threading
+import time
+from collections import deque
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from cache import DEFAULT_CACHE_TTL, TTLCache
+from client import DEFAULT_RETRIES, DEFAULT_TIMEOUT, create_session
 from common import (
     GITGUARDIAN_SAAS,
     BitBucketCloudNotSupportedError,
     CredentialsValidationError,
-    HoneyTokenCreationError,
-    PullRequestCreationError,
+    MessageError,
+    ProgressDisplay,
+    PullRequestFile,
     PullRequestInfo,
     RepositoryAccessError,
     RepositoryInfo,
@@ -15,7 +27,13 @@ from common import (
     get_branch_name_from_commit_message,
     get_saas_url_for_vcs,
 )
+from discovery import RepositoryFilter, discover_repositories, unique_repositories
 from gg_client import GGClient
+from honeytoken_pool import HoneytokenPool
+from ledger import IN_PROGRESS, DisseminationLedger
+from metrics import RequestStats, StepTimer, run_summary
+from rate_limit import RateLimitScheduler
+from rollout import RolloutScheduler
 
 from utils import get_client_for_vcs, get_repository_client_from_vcs_client
 
@@ -59,16 +77,36 @@ def validate_parameters(args: argparse.Namespace, parser: argparse.ArgumentParse
             "GitGuardian access token is required. Configure it via environment variable GITGUARDIAN_TOKEN."
         )
 
-    repos_names = []
-    for value in args.repo_names:
-        if "," in value:
-            repos_names.extend(value.split(","))
-        else:
-            repos_names.append(value)
+    if not args.repo_names and not args.namespaces:
+        parser.error("At least one of --repo-names and --namespaces is required.")
+
+    if not 0 < args.sample <= 100:
+        parser.error("--sample must be a percentage between 0 and 100.")
+
+    if args.honeytokens_per_repository < 1:
+        parser.error("--honeytokens-per-repository must be at least 1.")
+
+    if args.wave_size is None and (args.wave_interval or args.max_waves):
+        parser.error("--wave-interval and --max-waves require --wave-size.")
+
+    if args.max_waves and not args.ledger:
+        parser.error("--max-waves requires --ledger, to resume the rollout later.")
+
+    repos_names = split_values(args.repo_names)
 
     return vcs_url, vcs_token, gitguardian_url, gitguardian_token, repos_names
 
 
+def split_values(values: list[str] | None) -> list[str]:
+    """
+    Flatten a list of comma-separated or space-separated command line values
+    """
+    result = []
+    for value in values or []:
+        result.extend(value.split(","))
+    return result
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Script to disseminate honeytokens in your repositories via pull requests."
@@ -93,11 +131,171 @@ def main():
     parser.add_argument(
         "--repo-names",
         nargs="+",
-        required=True,
         help="Comma-separated or space-separated list of repository names",
     )
     parser.add_argument(
-        "--output", choices=["json", "text"], default="text", help="Output format"
+        "--namespaces",
+        nargs="+",
+        help="Comma-separated or space-separated list of GitHub organizations, Gitlab groups, "
+        "Azure DevOps projects (organization/project) or BitBucket projects whose "
+        "repositories are all targeted",
+    )
+    parser.add_argument(
+        "--include",
+        nargs="+",
+        default=[],
+        help="Only target the discovered repositories whose name matches one of these "
+        "wildcard patterns",
+    )
+    parser.add_argument(
+        "--exclude",
+        nargs="+",
+        default=[],
+        help="Skip the discovered repositories whose name matches one of these wildcard patterns",
+    )
+    parser.add_argument(
+        "--languages",
+        nargs="+",
+        default=[],
+        help="Only target the discovered repositories whose main language is one of these",
+    )
+    parser.add_argument(
+        "--include-archived",
+        action="store_true",
+        help="Also target archived (or disabled) repositories of the namespaces",
+    )
+    parser.add_argument(
+        "--sample",
+        type=float,
+        default=100.0,
+        help="Percentage of the discovered repositories to target. The selection is "
+        "deterministic, re-running with the same value targets the same repositories.",
+    )
+    parser.add_argument(
+        "--output",
+        choices=["json", "jsonl", "text"],
+        default="text",
+        help="Output format. jsonl writes the result of each repository as soon as it is "
+        "done, followed by a summary of the run.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=8,
+        help="Number of repositories processed concurrently",
+    )
+    parser.add_argument(
+        "--gitguardian-concurrency",
+        type=int,
+        default=4,
+        help="Maximum number of concurrent requests to the GitGuardian instance",
+    )
+    parser.add_argument(
+        "--vcs-concurrency",
+        type=int,
+        default=8,
+        help="Maximum number of concurrent requests to the VCS instance",
+    )
+
+    parser.add_argument(
+        "--github-graphql",
+        action="store_true",
+        help="Use the GitHub GraphQL API to get the repositories info and to create the "
+        "branches, commits and pull requests, with fewer requests per repository",
+    )
+    parser.add_argument(
+        "--bitbucket-default-branch",
+        help="Branch targeted by the pull requests in the BitBucket repositories whose "
+        "default branch is not returned by the listing of their project, instead of "
+        "asking each repository for its default branch",
+    )
+    parser.add_argument(
+        "--honeytoken-prefetch",
+        type=int,
+        default=16,
+        help="Number of repositories ahead of the dissemination for which honeytokens "
+        "are created in the background. 0 creates each honeytoken when its repository "
+        "is processed.",
+    )
+    parser.add_argument(
+        "--ledger",
+        help="SQLite file recording the progress of the dissemination. Re-running with the "
+        "same ledger skips the repositories already done and resumes the interrupted ones.",
+    )
+    parser.add_argument(
+        "--wave-size",
+        type=int,
+        help="Number of repositories per wave. A wave starts once all the repositories of "
+        "the previous one are done.",
+    )
+    parser.add_argument(
+        "--wave-interval",
+        type=float,
+        default=0.0,
+        help="Number of seconds between the end of a wave and the start of the next one",
+    )
+    parser.add_argument(
+        "--max-waves",
+        type=int,
+        help="Stop after this number of waves. Re-running with the same --ledger resumes "
+        "the rollout with the next wave.",
+    )
+    parser.add_argument(
+        "--pull-requests-per-minute",
+        type=float,
+        help="Maximum number of pull requests opened per minute on the VCS instance",
+    )
+    parser.add_argument(
+        "--org-pull-requests-per-minute",
+        type=float,
+        help="Maximum number of pull requests opened per minute in each GitHub "
+        "organization, Gitlab top-level group, Azure DevOps organization or BitBucket project",
+    )
+    parser.add_argument(
+        "--latency-threshold",
+        type=float,
+        default=2.0,
+        help="With waves or a pace, slow the rollout down when the median latency of "
+        "the recent VCS requests reaches this multiple of the lowest one observed",
+    )
+    parser.add_argument(
+        "--vcs-write-interval",
+        type=float,
+        help="Minimum number of seconds between two content-creating requests to the VCS "
+        "instance. Defaults to 1 for GitHub, to avoid its secondary rate limits, "
+        "and to 0 for the other VCS.",
+    )
+    parser.add_argument(
+        "--cache-file",
+        help="JSON file keeping the project-wide responses of Azure DevOps and BitBucket "
+        "(repository lists, language metrics and default branches) between runs. "
+        "They are only kept in memory otherwise.",
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=DEFAULT_CACHE_TTL,
+        help="Number of seconds during which the cached responses are reused",
+    )
+    parser.add_argument(
+        "--honeytokens-per-repository",
+        type=int,
+        default=1,
+        help="Number of honeytokens added to each repository. They are all added by "
+        "the same commit of a single pull request.",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=DEFAULT_TIMEOUT,
+        help="Timeout of each request to the VCS and GitGuardian instances, in seconds",
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=DEFAULT_RETRIES,
+        help="Number of retries of idempotent requests failing with a connection "
+        "error or an HTTP 502, 503 or 504 response",
     )
 
     args = parser.parse_args()
@@ -110,83 +308,530 @@ def main():
         repos_names,
     ) = validate_parameters(args, parser)
 
+    vcs_kwargs = {}
+    if args.github_graphql:
+        if args.vcs != "github":
+            parser.error("--github-graphql can only be used with --vcs github.")
+        vcs_kwargs["use_graphql"] = True
+
+    if args.bitbucket_default_branch:
+        if args.vcs != "bitbucket":
+            parser.error(
+                "--bitbucket-default-branch can only be used with --vcs bitbucket."
+            )
+        vcs_kwargs["default_branch"] = args.bitbucket_default_branch
+
+    if args.vcs in ("ado", "bitbucket"):
+        vcs_kwargs["cache"] = TTLCache(args.cache_ttl, args.cache_file)
+
+    vcs_write_interval = args.vcs_write_interval
+    if vcs_write_interval is None:
+        vcs_write_interval = 1.0 if args.vcs == "github" else 0.0
+
+    ledger = DisseminationLedger(args.ledger, args.vcs, vcs_url) if args.ledger else None
+
+    request_stats = RequestStats()
+
     try:
-        vcs_client = get_client_for_vcs(args.vcs, vcs_url, vcs_token)
+        vcs_client = get_client_for_vcs(
+            args.vcs,
+            vcs_url,
+            vcs_token,
+            **vcs_kwargs,
+            limiter=threading.BoundedSemaphore(args.vcs_concurrency),
+            session=create_session(args.vcs_concurrency, args.retries),
+            timeout=args.timeout,
+            scheduler=RateLimitScheduler(write_interval=vcs_write_interval),
+            stats=request_stats,
+        )
         vcs_client.validate_credentials()
 
         # validate access to all the repositories
-        vcs_repos = [vcs_client.get_repository_info(repo) for repo in repos_names]
-
-        gg_client = GGClient(dashboard_to_api_url(gitguardian_url), gitguardian_token)
+        vcs_repos = []
+        if repos_names:
+            vcs_repos = validate_repositories(vcs_client, repos_names, args.workers)
+
+        if args.namespaces:
+            # repositories of the namespaces are listed while the dissemination runs
+            discovered_repos = discover_repositories(
+                vcs_client,
+                split_values(args.namespaces),
+                RepositoryFilter(
+                    include=args.include,
+                    exclude=args.exclude,
+                    languages=args.languages,
+                    sample=args.sample,
+                ),
+                include_archived=args.include_archived,
+            )
+            vcs_repos = itertools.chain(vcs_repos, discovered_repos)
+        vcs_repos = unique_repositories(vcs_repos)
+
+        gg_client = GGClient(
+            dashboard_to_api_url(gitguardian_url),
+            gitguardian_token,
+            limiter=threading.BoundedSemaphore(args.gitguardian_concurrency),
+            session=create_session(args.gitguardian_concurrency, args.retries),
+            timeout=args.timeout,
+            scheduler=RateLimitScheduler(),
+            stats=request_stats,
+        )
         gg_client.validate_credentials()
 
-        disseminate_honeytokens(vcs_client, gg_client, vcs_repos, args.output)
+        rollout = None
+        if (
+            args.wave_size
+            or args.pull_requests_per_minute
+            or args.org_pull_requests_per_minute
+        ):
+            rollout = RolloutScheduler(
+                wave_size=args.wave_size,
+                wave_interval=args.wave_interval,
+                max_waves=args.max_waves,
+                pull_requests_per_minute=args.pull_requests_per_minute,
+                org_pull_requests_per_minute=args.org_pull_requests_per_minute,
+                request_stats=request_stats,
+                vcs_host=urlparse(vcs_client.get_url("")).netloc,
+                latency_threshold=args.latency_threshold,
+                needs_pull_request=(
+                    (lambda repo: needs_pull_request(ledger, repo)) if ledger else None
+                ),
+            )
+
+        disseminate_honeytokens(
+            vcs_client,
+            gg_client,
+            vcs_repos,
+            args.output,
+            workers=args.workers,
+            ledger=ledger,
+            honeytokens_per_repository=args.honeytokens_per_repository,
+            rollout=rollout,
+            # paced repositories don't wait for the GitGuardian API
+            honeytoken_prefetch=args.honeytoken_prefetch if rollout is None else 0,
+            gitguardian_workers=args.gitguardian_concurrency,
+            request_stats=request_stats,
+        )
 
     except (CredentialsValidationError, RepositoryAccessError) as error:
         parser.error(error.message)
+    finally:
+        if ledger is not None:
+            ledger.close()
+
+
+def validate_repositories(
+    vcs_client, repos_names: list[str], workers: int = 1
+) -> list[RepositoryInfo]:
+    """
+    Get the info of all the repositories, in batches of the size supported by
+    the VCS client, up to `workers` batches at a time.
+    All the inaccessible repositories are reported together in a single
+    RepositoryAccessError.
+    """
+    progress = ProgressDisplay("Validating repositories", len(repos_names))
+    batch_size = vcs_client.repositories_batch_size
+    batches = [
+        repos_names[start : start + batch_size]
+        for start in range(0, len(repos_names), batch_size)
+    ]
+    errors = {}
+
+    def validate(batch: list[str]) -> list[RepositoryInfo | None]:
+        try:
+            results = vcs_client.get_repositories_info(batch)
+        except CredentialsValidationError:
+            raise
+        except Exception as error:
+            message = format_error(error)
+            results = {repo_name: message for repo_name in batch}
+
+        repos = []
+        for repo_name in batch:
+            repo_info = results[repo_name]
+            if isinstance(repo_info, RepositoryInfo):
+                progress.advance()
+                repos.append(repo_info)
+            else:
+                errors[repo_name] = getattr(repo_info, "message", repo_info)
+                progress.advance(failed=True)
+                repos.append(None)
+        return repos
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        repos = [
+            repo_info
+            for batch_repos in executor.map(validate, batches)
+            for repo_info in batch_repos
+        ]
+    progress.finish()
+
+    if errors:
+        report = "\n".join(
+            f"  {repo_name}: {errors[repo_name]}"
+            for repo_name in repos_names
+            if repo_name in errors
+        )
+        raise RepositoryAccessError(
+            f"{len(errors)} of {len(repos_names)} repositories are not accessible:\n{report}"
+        )
+
+    return repos
 
 
 def disseminate_honeytokens(
-    vcs_client, gg_client: GGClient, repos: list[RepositoryInfo], output: str
+    vcs_client,
+    gg_client: GGClient,
+    repos: Iterable[RepositoryInfo],
+    output: str,
+    workers: int = 1,
+    ledger: DisseminationLedger | None = None,
+    honeytokens_per_repository: int = 1,
+    rollout: RolloutScheduler | None = None,
+    honeytoken_prefetch: int = 0,
+    gitguardian_workers: int = 1,
+    request_stats: RequestStats | None = None,
 ):
+    """
+    Disseminate `honeytokens_per_repository` honeytokens in each repository,
+    processing up to `workers` repositories concurrently. Results are printed in the order of `repos`.
+    `repos` is consumed as the repositories are processed, so it can be a
+    stream of discovered repositories. If it fails, the results of the
+    repositories already submitted are printed before the error is raised.
+
+    With a `rollout` scheduler, the repositories are started in waves and at its pace.
+
+    The first honeytoken of the next `honeytoken_prefetch` repositories is created
+    in the background by `gitguardian_workers` threads.
+
+    With the jsonl output, each result is written as soon as its repository is
+    done. A summary of the run, including `request_stats`, is written last.
+    """
+    started_at = time.perf_counter()
+    output_lock = threading.Lock()
+
+    def write_result(repo_name: str, future) -> None:
+        if future.exception() is not None:
+            return
+        with output_lock:
+            print(json.dumps({"repository": repo_name, **future.result()}), flush=True)
+
+    honeytoken_pool = None
+    if honeytoken_prefetch > 0:
+        honeytoken_pool = HoneytokenPool(
+            gg_client,
+            honeytoken_prefetch,
+            gitguardian_workers,
+            needs_honeytoken=(
+                (lambda repo: ledger.get(repo.full_name) is None) if ledger else None
+            ),
+        )
+        repos = honeytoken_pool.prefetched(repos)
+    if rollout is not None:
+        repos = rollout.scheduled(repos)
+
     result_output = dict()
-    for repo in repos:
-        result_output[repo.name] = {
-            "url": "",
-            "ok": True,
-            "error": "",
-            "honeytoken_id": "",
-        }
-
-        # 1. create a honeytoken with context
+    pending = deque()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            try:
+                for repo in repos:
+                    future = executor.submit(
+                        disseminate_in_repository,
+                        vcs_client,
+                        gg_client,
+                        repo,
+                        ledger,
+                        honeytoken_pool,
+                        honeytokens_per_repository,
+                    )
+                    if output == "jsonl":
+                        future.add_done_callback(
+                            lambda future, repo_name=repo.full_name: write_result(
+                                repo_name, future
+                            )
+                        )
+                    if rollout is not None:
+                        future.add_done_callback(
+                            lambda future, repository=repo.full_name: rollout.done(
+                                repository
+                            )
+                        )
+                    pending.append((repo, future))
+                    # bound the number of submitted repositories
+                    if len(pending) >= 2 * workers:
+                        done_repo, future = pending.popleft()
+                        result_output[done_repo.full_name] = future.result()
+            finally:
+                for repo, future in pending:
+                    result_output[repo.full_name] = future.result()
+    finally:
+        # the executor is shut down: all the jsonl results are written
+        if honeytoken_pool is not None:
+            not_revoked = honeytoken_pool.close()
+            if not_revoked:
+                print(
+                    "Could not revoke the unused honeytokens: "
+                    + ", ".join(not_revoked),
+                    file=sys.stderr,
+                )
+        report_run(result_output, output, started_at, request_stats)
+
+
+def report_run(
+    result_output: dict,
+    output: str,
+    started_at: float,
+    request_stats: RequestStats | None,
+) -> None:
+    """
+    Print the results of a run, unless they were written as jsonl, then its summary
+    """
+    summary = run_summary(result_output, time.perf_counter() - started_at, request_stats)
+    if output == "jsonl":
+        print(json.dumps({"summary": summary}), flush=True)
+    else:
+        print_results(result_output, output)
+        print_summary(summary)
+
+
+def disseminate_in_repository(
+    vcs_client,
+    gg_client: GGClient,
+    repo: RepositoryInfo,
+    ledger: DisseminationLedger | None = None,
+    honeytoken_pool: HoneytokenPool | None = None,
+    honeytokens_per_repository: int = 1,
+) -> dict:
+    """
+    Create `honeytokens_per_repository` honeytokens and open a pull request adding
+    them to the repository, in a single commit.
+    The honeytokens are revoked if the pull request can't be created.
+    With a ledger, a repository already done (or reconciled) is skipped, and an interrupted
+    dissemination reuses its honeytoken and resumes after the last step done.
+    """
+    result = {
+        "url": "",
+        "ok": True,
+        "error": "",
+        "honeytoken_id": "",
+        "timings": {},
+    }
+    timer = StepTimer()
+
+    entry = ledger.get(repo.full_name) if ledger is not None else None
+    if entry is not None and entry["status"] != IN_PROGRESS:
+        return ledger_result(result, entry)
+
+    # 1. create honeytokens with context
+    if entry is not None:
+        data, extra_honeytokens = entry["honeytoken"], entry["extra_honeytokens"]
+    else:
+        honeytokens = []
         try:
             error_msg = None
-            data = gg_client.create_honey_token_with_context(repo)
-        except HoneyTokenCreationError as error:
-            error_msg = error.message
+            if honeytoken_pool is not None:
+                honeytokens.append(honeytoken_pool.take(repo))
+            while len(honeytokens) < honeytokens_per_repository:
+                honeytokens.append(gg_client.create_honey_token_with_context(repo))
         except Exception as error:
-            error_msg = type(error).__name__ + ": " + str(error)
+            error_msg = format_error(error)
 
         if error_msg:
-            result_output[repo.name]["ok"] = False
-            result_output[repo.name][
-                "error"
-            ] = f"Failed to create a honeytoken: {error_msg}"
-            continue
-
-        # 2. create pull request
-        pr_info = PullRequestInfo(
-            content=data["content"],
-            commit_message=data["suggested_commit_message"],
-            branch=get_branch_name_from_commit_message(
-                data["suggested_commit_message"]
-            ),
-            filename=data["filename"],
+            # the honeytokens of a repository are all disseminated, or none of them
+            honey_token_ids = [honeytoken["honeytoken_id"] for honeytoken in honeytokens]
+            result["ok"] = False
+            result["error"] = f"Failed to create a honeytoken: {error_msg}"
+            if not revoke_honey_tokens(gg_client, honey_token_ids):
+                result["error"] += f". {created_honeytokens(honey_token_ids)} and not revoked."
+            return result
+        data, *extra_honeytokens = honeytokens
+        timer.step_done("honeytoken")
+
+    # 2. create pull request
+    pr_info = pull_request_info(data, extra_honeytokens)
+    honey_token_ids = set_honeytoken_ids(result, data, extra_honeytokens)
+    completed_steps = start_pull_request(
+        ledger, repo, entry, data, pr_info, extra_honeytokens
+    )
+
+    def on_step(step: str) -> None:
+        timer.step_done(step)
+        if ledger is not None:
+            ledger.record_step(repo.full_name, step)
+
+    try:
+        error_msg = None
+        repo_client = get_repository_client_from_vcs_client(vcs_client, repo)
+        pull_request_url = repo_client.disseminate_in_pull_request(
+            pr_info, completed_steps, on_step
         )
+    except Exception as error:
+        error_msg = format_error(error)
 
-        honey_token_id = data["honeytoken_id"]
-        result_output[repo.name]["honeytoken_id"] = honey_token_id
+    if error_msg:
+        ht_revoked = revoke_honey_tokens(gg_client, honey_token_ids)
+        return dissemination_failed(
+            result, timer, ledger, repo, error_msg, honey_token_ids, ht_revoked
+        )
 
+    return dissemination_done(result, timer, ledger, repo, pull_request_url)
+
+
+def format_error(error: Exception) -> str:
+    """
+    Message of the errors raised by the clients, name and text of the unexpected ones
+    """
+    if isinstance(error, MessageError):
+        return error.message
+    return type(error).__name__ + ": " + str(error)
+
+
+def revoke_honey_tokens(gg_client: GGClient, honey_token_ids: list[str]) -> bool:
+    """
+    Revoke honeytokens, a revocation that fails with an error counts as not revoked
+    :return: whether all the honeytokens were revoked
+    """
+    revoked = True
+    for honey_token_id in honey_token_ids:
         try:
-            error_msg = None
-            repo_client = get_repository_client_from_vcs_client(vcs_client, repo)
-            pull_request_url = repo_client.disseminate_in_pull_request(pr_info)
-        except PullRequestCreationError as error:
-            error_msg = error.message
-        except Exception as error:
-            error_msg = type(error).__name__ + ": " + str(error)
+            revoked &= gg_client.revoke_honey_token(honey_token_id)
+        except Exception:
+            revoked = False
+    return revoked
+
+
+def needs_pull_request(ledger: DisseminationLedger, repo: RepositoryInfo) -> bool:
+    """
+    Whether the pull request of a repository is still to be opened
+    """
+    entry = ledger.get(repo.full_name)
+    return entry is None or entry["status"] == IN_PROGRESS
+
+
+def pull_request_info(
+    honeytoken: dict, extra_honeytokens: list[dict] = ()
+) -> PullRequestInfo:
+    """
+    Pull request adding honeytokens created with context, with the commit
+    message and branch suggested for the first one.
+    Files suggested with the same name are numbered: config.py, config-2.py...
+    """
+    filenames = {honeytoken["filename"]}
+    extra_files = []
+    for extra_honeytoken in extra_honeytokens:
+        root, extension = posixpath.splitext(extra_honeytoken["filename"])
+        filename = extra_honeytoken["filename"]
+        for number in itertools.count(2):
+            if filename not in filenames:
+                break
+            filename = f"{root}-{number}{extension}"
+        filenames.add(filename)
+        extra_files.append(PullRequestFile(filename, extra_honeytoken["content"]))
+
+    return PullRequestInfo(
+        content=honeytoken["content"],
+        commit_message=honeytoken["suggested_commit_message"],
+        branch=get_branch_name_from_commit_message(
+            honeytoken["suggested_commit_message"]
+        ),
+        filename=honeytoken["filename"],
+        extra_files=extra_files,
+    )
 
-        if error_msg:
-            ht_revoked = gg_client.revoke_honey_token(honey_token_id)
-            result_output[repo.name]["ok"] = False
-            result_output[repo.name]["error"] = (
-                f"Failed to disseminate honeytoken. {error_msg}. Honeytoken {honey_token_id} was created "
-                + ("but revoked." if ht_revoked else "and not revoked.")
-            )
-            continue
 
-        result_output[repo.name]["url"] = pull_request_url
+def set_honeytoken_ids(
+    result: dict, honeytoken: dict, extra_honeytokens: list[dict]
+) -> list[str]:
+    """
+    Add the ids of the honeytokens of a repository to its result
+    :return: the ids
+    """
+    result["honeytoken_id"] = honeytoken["honeytoken_id"]
+    extra_ids = [extra["honeytoken_id"] for extra in extra_honeytokens]
+    if extra_ids:
+        result["extra_honeytoken_ids"] = extra_ids
+    return [result["honeytoken_id"], *extra_ids]
+
+
+def ledger_result(result: dict, entry: dict) -> dict:
+    """
+    Result of a repository already done, from its ledger entry
+    """
+    result["url"] = entry["pull_request_url"]
+    set_honeytoken_ids(result, entry, entry["extra_honeytokens"])
+    return result
+
+
+def start_pull_request(
+    ledger: DisseminationLedger | None,
+    repo: RepositoryInfo,
+    entry: dict | None,
+    honeytoken: dict,
+    pr_info: PullRequestInfo,
+    extra_honeytokens: list[dict] = (),
+) -> list[str]:
+    """
+    Record new honeytokens in the ledger.
+    :return: the pull request steps already done by an interrupted dissemination
+    """
+    if ledger is None:
+        return []
+    if entry is None:
+        ledger.record_honeytoken(
+            repo.full_name, honeytoken, pr_info.branch, extra_honeytokens
+        )
+        return []
+    return entry["steps"]
+
+
+def dissemination_failed(
+    result: dict,
+    timer: StepTimer,
+    ledger: DisseminationLedger | None,
+    repo: RepositoryInfo,
+    error_msg: str,
+    honey_token_ids: list[str],
+    ht_revoked: bool,
+) -> dict:
+    if ledger is not None:
+        # the branch was deleted, a re-run starts over
+        if ht_revoked:
+            ledger.forget(repo.full_name)
+        else:
+            ledger.reset_steps(repo.full_name)
+    result["ok"] = False
+    result["error"] = (
+        f"Failed to disseminate honeytoken. {error_msg}. "
+        f"{created_honeytokens(honey_token_ids)} "
+        + ("but revoked." if ht_revoked else "and not revoked.")
+    )
+    result["timings"] = timer.timings
+    return result
+
+
+def created_honeytokens(honey_token_ids: list[str]) -> str:
+    if len(honey_token_ids) == 1:
+        return f"Honeytoken {honey_token_ids[0]} was created"
+    return f"Honeytokens {', '.join(honey_token_ids)} were created"
+
 
+def dissemination_done(
+    result: dict,
+    timer: StepTimer,
+    ledger: DisseminationLedger | None,
+    repo: RepositoryInfo,
+    pull_request_url: str,
+) -> dict:
+    timer.step_done("pull_request")
+    if ledger is not None:
+        ledger.record_pull_request(repo.full_name, pull_request_url)
+    result["url"] = pull_request_url
+    result["timings"] = {**timer.timings, "total": timer.total()}
+    return result
+
+
+def print_results(result_output: dict, output: str):
     if output == "json":
         print(json.dumps(result_output, indent=2))
     else:
@@ -208,5 +853,31 @@ def disseminate_honeytokens(
                 print(f"{repo}: {result_output[repo]['error']}")
 
 
+def print_summary(summary: dict):
+    """
+    Print the summary of a run on stderr, out of the way of the results
+    """
+    lines = [
+        f"Processed {summary['repositories']} repositories in {summary['seconds']}s "
+        f"({summary['repositories_per_minute']} per minute): "
+        f"{summary['ok']} succeeded, {summary['failed']} failed",
+    ]
+    if summary["average_step_seconds"]:
+        lines.append(
+            "Average step durations: "
+            + ", ".join(
+                f"{step} {seconds}s"
+                for step, seconds in summary["average_step_seconds"].items()
+            )
+        )
+    for host, stats in summary["hosts"].items():
+        lines.append(
+            f"{host}: {stats['requests']} requests, {stats['errors']} errors, "
+            f"{stats['retries']} retries, {stats['rate_limited']} rate limited, "
+            f"p50 {stats['latency_p50']}s, p95 {stats['latency_p95']}s"
+        )
+    print("\n".join(lines), file=sys.stderr)
+
+
 if __name__ == "__main__":
     main()
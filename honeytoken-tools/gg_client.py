@@ -1,7 +1,10 @@
+from collections.abc import Iterator
+
 import requests
 from client import ApiTokenClient
 from common import (
     CredentialsValidationError,
+    HoneyTokenAccessError,
     HoneyTokenCreationError,
     RepositoryInfo,
     generate_random_suffix,
@@ -53,3 +56,14 @@ class GGClient(ApiTokenClient):
     def revoke_honey_token(self, honey_token_id: str) -> bool:
         resp = self.post(f"honeytokens/{honey_token_id}/revoke", {})
         return resp.ok
+
+    def iter_honey_tokens(self) -> Iterator[dict]:
+        """
+        List the honeytokens of the workspace, page by page
+        """
+        for resp in self.iter_pages("honeytokens?per_page=100"):
+            if not resp.ok:
+                raise HoneyTokenAccessError(
+                    f"Can't list honeytokens: {resp.json()['detail']}"
+                )
+            yield from resp.json()
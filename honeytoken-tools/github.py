@@ -1,16 +1,134 @@
+import itertools
+from base64 import b64encode
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+from urllib.parse import urlparse
+
 import requests
 from client import VCSClient, VCSRepoClient
 from common import (
     GITHUB_SAAS,
+    PULL_REQUEST_DECLINED,
+    PULL_REQUEST_MERGED,
+    PULL_REQUEST_OPEN,
     CredentialsValidationError,
+    MessageError,
+    PullRequestAccessError,
     PullRequestCreationError,
     PullRequestInfo,
+    PullRequestStatus,
     RepositoryAccessError,
     RepositoryInfo,
+    parse_datetime,
 )
 
+# Maximum number of repositories fetched by a single GraphQL query
+GRAPHQL_BATCH_SIZE = 100
+
+REPOSITORY_FIELDS = """
+    id
+    databaseId
+    primaryLanguage { name }
+    defaultBranchRef {
+      name
+      target { ... on Commit { oid tree { oid } } }
+    }
+"""
+
+CREATE_REF_MUTATION = """
+mutation($repositoryId: ID!, $name: String!, $oid: GitObjectID!) {
+  createRef(input: {repositoryId: $repositoryId, name: $name, oid: $oid}) {
+    ref { id }
+  }
+}
+"""
+
+CREATE_COMMIT_MUTATION = """
+mutation($input: CreateCommitOnBranchInput!) {
+  createCommitOnBranch(input: $input) {
+    commit { oid }
+  }
+}
+"""
+
+CREATE_PULL_REQUEST_MUTATION = """
+mutation($input: CreatePullRequestInput!) {
+  createPullRequest(input: $input) {
+    pullRequest { url }
+  }
+}
+"""
+
+
+@dataclass
+class GitHubRepositoryInfo(RepositoryInfo):
+    node_id: str | None = None
+    # Head of the default branch when the info was fetched, if known
+    head_sha: str | None = None
+    head_tree_sha: str | None = None
+
+
+class GitHubGraphQLMixin:
+    """
+    Access to the GitHub GraphQL API, for GitHub clients
+    """
+
+    def graphql(
+        self,
+        query: str,
+        variables: dict,
+        error_class: type[MessageError] = PullRequestCreationError,
+    ) -> dict:
+        """
+        Run a GraphQL query and return its data.
+        Raise error_class if the query fails.
+        """
+        response = self.graphql_response(query, variables, error_class)
+        if response.get("errors"):
+            raise error_class(
+                "; ".join(error["message"] for error in response["errors"])
+            )
+        return response["data"]
+
+    def graphql_response(
+        self,
+        query: str,
+        variables: dict,
+        error_class: type[MessageError] = PullRequestCreationError,
+    ) -> dict:
+        """
+        Run a GraphQL query and return the whole response, with its errors
+        and the partial data of the fields without error.
+        Raise error_class if the request fails.
+        """
+        if self.instance_url != GITHUB_SAAS:
+            url = f"{self.instance_url}/api/graphql"
+        else:
+            url = f"{self.instance_url}/graphql"
+
+        resp = self.request(
+            "POST",
+            url,
+            json={"query": query, "variables": variables},
+            headers={**self.headers, "Content-Type": "application/json"},
+        )
+        if not resp.ok:
+            raise error_class(f"GraphQL request failed: {resp.json()['message']}")
+        return resp.json()
+
+
+class GitHubClient(GitHubGraphQLMixin, VCSClient):
+    def __init__(self, *args, use_graphql: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.use_graphql = use_graphql
+
+    def connection_kwargs(self) -> dict:
+        return {**super().connection_kwargs(), "use_graphql": self.use_graphql}
+
+    @property
+    def repositories_batch_size(self) -> int:
+        return GRAPHQL_BATCH_SIZE if self.use_graphql else 1
 
-class GitHubClient(VCSClient):
     @property
     def common_url_path(self) -> str | None:
         if self.instance_url != GITHUB_SAAS:
@@ -37,6 +155,12 @@ class GitHubClient(VCSClient):
         """
         Get the info about the GitHub repository
         """
+        if self.use_graphql:
+            repo_info = self.get_repositories_info([repo_name])[repo_name]
+            if isinstance(repo_info, RepositoryAccessError):
+                raise repo_info
+            return repo_info
+
         resp = self.get(f"repos/{repo_name}")
 
         if not resp.ok:
@@ -55,15 +179,167 @@ class GitHubClient(VCSClient):
                 f"Repository does not have a default branch: {repo_name}"
             )
 
-        return RepositoryInfo(
+        return GitHubRepositoryInfo(
             main_language=language,
             default_branch=default_branch,
             name=repo_name,
             id=data["id"],
+            node_id=data.get("node_id"),
+        )
+
+    def get_repositories_info(
+        self, repo_names: list[str]
+    ) -> dict[str, RepositoryInfo | RepositoryAccessError]:
+        """
+        Get the info about GitHub repositories and the head of their default branch,
+        with one GraphQL query per GRAPHQL_BATCH_SIZE repositories
+        """
+        if not self.use_graphql:
+            return super().get_repositories_info(repo_names)
+
+        results = {}
+        for start in range(0, len(repo_names), GRAPHQL_BATCH_SIZE):
+            batch = repo_names[start : start + GRAPHQL_BATCH_SIZE]
+            variables = {}
+            for index, repo_name in enumerate(batch):
+                owner, _, name = repo_name.partition("/")
+                variables[f"owner{index}"] = owner
+                variables[f"name{index}"] = name
+
+            response = self.graphql_response(
+                _repositories_query(len(batch)), variables, RepositoryAccessError
+            )
+            data = response.get("data") or {}
+            # errors of the aliased repository fields, e.g. repositories not found
+            errors = {}
+            for error in response.get("errors") or []:
+                alias = (error.get("path") or [None])[0]
+                errors[alias] = error["message"]
+
+            for index, repo_name in enumerate(batch):
+                alias = f"repo{index}"
+                if data.get(alias) is None:
+                    message = errors.get(alias) or errors.get(None) or "Not Found"
+                    results[repo_name] = RepositoryAccessError(
+                        f"Can't get repository info for {repo_name}: {message}"
+                    )
+                    continue
+                try:
+                    results[repo_name] = _parse_repository(repo_name, data[alias])
+                except RepositoryAccessError as error:
+                    results[repo_name] = error
+        return results
+
+    def iter_repositories(
+        self, namespace: str, include_archived: bool = False
+    ) -> Iterator[RepositoryInfo]:
+        """
+        List the repositories of a GitHub organization, or of a user
+        """
+        pages = self.iter_pages(f"orgs/{namespace}/repos?type=all&per_page=100")
+        first_page = next(pages)
+        if first_page.status_code == 404:
+            pages = self.iter_pages(f"users/{namespace}/repos?type=all&per_page=100")
+            first_page = next(pages)
+
+        for resp in itertools.chain([first_page], pages):
+            if not resp.ok:
+                raise RepositoryAccessError(
+                    f"Can't list repositories of {namespace}: {resp.json()['message']}"
+                )
+            for data in resp.json():
+                if data.get("archived") and not include_archived:
+                    continue
+                if not data.get("default_branch"):
+                    continue
+                language = data.get("language", None)
+                yield GitHubRepositoryInfo(
+                    main_language=language.lower() if language else None,
+                    default_branch=data["default_branch"],
+                    name=data["full_name"],
+                    id=data["id"],
+                    node_id=data.get("node_id"),
+                )
+
+    def get_pull_request(self, pull_request_url: str) -> dict:
+        """
+        Get a pull request from its URL, e.g. https://github.com/owner/repo/pull/3
+        """
+        path = urlparse(pull_request_url).path.strip("/").split("/")
+        if len(path) < 4 or path[-2] != "pull":
+            raise PullRequestAccessError(f"Invalid pull request URL: {pull_request_url}")
+        owner, repo, _, number = path[-4:]
+
+        resp = self.get(f"repos/{owner}/{repo}/pulls/{number}")
+        if not resp.ok:
+            raise PullRequestAccessError(
+                f"Can't get pull request {pull_request_url}: {resp.json()['message']}"
+            )
+        return resp.json()
+
+    def pull_request_status(self, pull_request: dict) -> PullRequestStatus:
+        if pull_request["state"] == "open":
+            state = PULL_REQUEST_OPEN
+        elif pull_request.get("merged_at"):
+            state = PULL_REQUEST_MERGED
+        else:
+            state = PULL_REQUEST_DECLINED
+
+        base = pull_request["base"]
+        return PullRequestStatus(
+            state=state,
+            created_at=parse_datetime(pull_request["created_at"]),
+            branch=pull_request["head"]["ref"],
+            repository=GitHubRepositoryInfo(
+                main_language=None,
+                default_branch=base["ref"],
+                name=base["repo"]["full_name"],
+                id=base["repo"]["id"],
+                node_id=base["repo"].get("node_id"),
+            ),
+        )
+
+
+def _repositories_query(count: int) -> str:
+    """
+    GraphQL query of `count` repositories, aliased repo0, repo1... and taking
+    the variables owner0, name0, owner1, name1...
+    """
+    parameters = ", ".join(
+        f"$owner{index}: String!, $name{index}: String!" for index in range(count)
+    )
+    fields = "\n".join(
+        f"  repo{index}: repository(owner: $owner{index}, name: $name{index}) {{"
+        f"{REPOSITORY_FIELDS}  }}"
+        for index in range(count)
+    )
+    return f"query({parameters}) {{\n{fields}\n}}"
+
+
+def _parse_repository(repo_name: str, data: dict) -> GitHubRepositoryInfo:
+    default_branch = data["defaultBranchRef"]
+    if not default_branch:
+        raise RepositoryAccessError(
+            f"Repository does not have a default branch: {repo_name}"
         )
 
+    language = data["primaryLanguage"]
+    return GitHubRepositoryInfo(
+        main_language=language["name"].lower() if language else None,
+        default_branch=default_branch["name"],
+        name=repo_name,
+        id=data["databaseId"],
+        node_id=data["id"],
+        head_sha=default_branch["target"]["oid"],
+        head_tree_sha=default_branch["target"]["tree"]["oid"],
+    )
+
+
+class GitHubRepoClient(GitHubGraphQLMixin, VCSRepoClient):
+    def __init__(self, *args, use_graphql: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.use_graphql = use_graphql
 
-class GitHubRepoClient(VCSRepoClient):
     @property
     def common_url_path(self) -> str | None:
         if self.instance_url != GITHUB_SAAS:
@@ -78,13 +354,7 @@ class GitHubRepoClient(VCSRepoClient):
         """
         Create a new branch on a repository from the target branch.
         """
-        resp = self.get(f"branches/{target_branch}")
-
-        if not resp.ok:
-            raise PullRequestCreationError(f"Can't find branch: {target_branch}")
-
-        data = resp.json()
-        last_commit_sha = data["commit"]["sha"]
+        last_commit_sha, _ = self._get_branch_head(target_branch)
 
         resp = self.post(
             "git/refs",
@@ -98,6 +368,35 @@ class GitHubRepoClient(VCSRepoClient):
                 f"Can't create new branch: {resp.json()['message']}"
             )
 
+    def _get_branch_head(self, branch_name: str) -> tuple[str, str]:
+        """
+        Get the commit and tree hashes of the head of a branch. The head of the
+        default branch is taken from the repository info when it is known, and
+        fetched at most once otherwise.
+        """
+        repo_info = self.repo_info
+        is_default_branch = branch_name == repo_info.default_branch
+        if (
+            is_default_branch
+            and isinstance(repo_info, GitHubRepositoryInfo)
+            and repo_info.head_sha
+            and repo_info.head_tree_sha
+        ):
+            return repo_info.head_sha, repo_info.head_tree_sha
+
+        resp = self.get(f"branches/{branch_name}")
+
+        if not resp.ok:
+            raise PullRequestCreationError(f"Can't find branch: {branch_name}")
+
+        data = resp.json()
+        commit_sha = data["commit"]["sha"]
+        tree_sha = data["commit"]["commit"]["tree"]["sha"]
+        if is_default_branch and isinstance(repo_info, GitHubRepositoryInfo):
+            repo_info.head_sha = commit_sha
+            repo_info.head_tree_sha = tree_sha
+        return commit_sha, tree_sha
+
     def _create_new_tree(
         self,
         tree_sha_to_update: str,
@@ -167,26 +466,20 @@ class GitHubRepoClient(VCSRepoClient):
     def create_new_commit(
         self, pr_info: PullRequestInfo, repo_info: RepositoryInfo
     ) -> None:
-        resp = self.get(f"branches/{repo_info.default_branch}")
-
-        if not resp.ok:
-            raise PullRequestCreationError(
-                f"Can't find branch: {repo_info.default_branch}"
-            )
-
-        data = resp.json()
-        last_commit_sha = data["commit"]["sha"]
-        last_tree_sha = data["commit"]["commit"]["tree"]["sha"]
+        last_commit_sha, last_tree_sha = self._get_branch_head(
+            repo_info.default_branch
+        )
 
         new_tree_sha = self._create_new_tree(
             tree_sha_to_update=last_tree_sha,
             tree_update=[
                 {
-                    "path": pr_info.filename,
+                    "path": file.filename,
                     "mode": "100644",
                     "type": "blob",
-                    "content": pr_info.content,
+                    "content": file.content,
                 }
+                for file in pr_info.files
             ],
         )
 
@@ -228,3 +521,82 @@ class GitHubRepoClient(VCSRepoClient):
             )
 
         return pr_response.json()["html_url"]
+
+    def disseminate_in_pull_request(
+        self,
+        pr_info: PullRequestInfo,
+        completed_steps: Iterable[str] = (),
+        on_step: Callable[[str], None] | None = None,
+    ) -> str:
+        """
+        Create a pull request on a GitHub repository.
+        With GraphQL, the branch, the commit and the pull request are each created
+        in a single request. Interrupted disseminations, and repositories whose
+        node id is unknown, go through the REST API.
+        """
+        completed_steps = set(completed_steps)
+        repo_id = getattr(self.repo_info, "node_id", None)
+        if not self.use_graphql or completed_steps or not repo_id:
+            return super().disseminate_in_pull_request(
+                pr_info, completed_steps, on_step
+            )
+
+        def step_done(step: str) -> None:
+            if on_step is not None:
+                on_step(step)
+
+        head_sha, _ = self._get_branch_head(self.repo_info.default_branch)
+
+        self.graphql(
+            CREATE_REF_MUTATION,
+            {
+                "repositoryId": repo_id,
+                "name": f"refs/heads/{pr_info.branch}",
+                "oid": head_sha,
+            },
+        )
+        step_done("branch")
+        try:
+            self.graphql(
+                CREATE_COMMIT_MUTATION,
+                {
+                    "input": {
+                        "branch": {
+                            "repositoryNameWithOwner": self.repo_info.name,
+                            "branchName": pr_info.branch,
+                        },
+                        "message": {"headline": pr_info.commit_message},
+                        "fileChanges": {
+                            "additions": [
+                                {
+                                    "path": file.filename,
+                                    "contents": b64encode(
+                                        file.content.encode()
+                                    ).decode(),
+                                }
+                                for file in pr_info.files
+                            ]
+                        },
+                        "expectedHeadOid": head_sha,
+                    }
+                },
+            )
+            step_done("commit")
+
+            data = self.graphql(
+                CREATE_PULL_REQUEST_MUTATION,
+                {
+                    "input": {
+                        "repositoryId": repo_id,
+                        "baseRefName": self.repo_info.default_branch,
+                        "headRefName": pr_info.branch,
+                        "title": pr_info.commit_message,
+                        "body": "",
+                    }
+                },
+            )
+        except Exception as e:
+            self.delete_branch(branch_name=pr_info.branch)
+            raise e
+        return data["createPullRequest"]["pullRequest"]["url"]
+
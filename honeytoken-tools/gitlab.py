@@ -1,17 +1,42 @@
 import urllib.parse
+from collections.abc import Iterator
 
 import requests
 from client import VCSClient, VCSRepoClient
 from common import (
+    PULL_REQUEST_DECLINED,
+    PULL_REQUEST_MERGED,
+    PULL_REQUEST_OPEN,
     CredentialsValidationError,
+    PullRequestAccessError,
     PullRequestCreationError,
     PullRequestInfo,
+    PullRequestStatus,
     RepositoryAccessError,
     RepositoryInfo,
+    parse_datetime,
 )
 
+# Maximum number of full paths accepted by the projects GraphQL query
+GRAPHQL_BATCH_SIZE = 50
+
+PROJECTS_QUERY = """
+query($fullPaths: [String!]) {
+  projects(fullPaths: $fullPaths, first: 50) {
+    nodes {
+      id
+      fullPath
+      repository { rootRef }
+      languages { name share }
+    }
+  }
+}
+"""
+
 
 class GitLabClient(VCSClient):
+    repositories_batch_size = GRAPHQL_BATCH_SIZE
+
     @property
     def common_url_path(self) -> str | None:
         return "api/v4"
@@ -46,7 +71,7 @@ class GitLabClient(VCSClient):
 
         data = resp.json()
         default_branch = data.get("default_branch", None)
-        name = data["name_with_namespace"]
+        name = data["path_with_namespace"]
         repo_id = data["id"]
 
         if not default_branch:
@@ -54,22 +79,182 @@ class GitLabClient(VCSClient):
                 f"Repository does not have a default branch: {repo_name}"
             )
 
+        return RepositoryInfo(
+            main_language=self._get_main_language(repo_id),
+            default_branch=default_branch,
+            name=name,
+            id=repo_id,
+        )
+
+    def _get_main_language(self, repo_id: int) -> str | None:
         resp = self.get(f"projects/{repo_id}/languages")
         data = resp.json()
 
         language = None
         if data:
             language = list(data.keys())[0].lower()
+        return language
 
-        return RepositoryInfo(
-            main_language=language,
-            default_branch=default_branch,
-            name=name,
-            id=repo_id,
+    def _query_projects(self, full_paths: list[str]) -> dict[str, dict]:
+        """
+        Get the id, default branch and languages of up to GRAPHQL_BATCH_SIZE projects
+        in a single GraphQL query
+        :return: the projects found, by lowercase full path
+        """
+        resp = self.request(
+            "POST",
+            f"{self.instance_url}/api/graphql",
+            json={"query": PROJECTS_QUERY, "variables": {"fullPaths": full_paths}},
+            headers={**self.headers, "Content-Type": "application/json"},
         )
+        if not resp.ok:
+            raise RepositoryAccessError(
+                f"GraphQL request failed: {resp.status_code} {resp.reason}"
+            )
+
+        data = resp.json()
+        if data.get("errors"):
+            raise RepositoryAccessError(
+                "GraphQL request failed: "
+                + "; ".join(error["message"] for error in data["errors"])
+            )
+
+        return {
+            project["fullPath"].lower(): project
+            for project in data["data"]["projects"]["nodes"]
+        }
+
+    def get_repositories_info(
+        self, repo_names: list[str]
+    ) -> dict[str, RepositoryInfo | RepositoryAccessError]:
+        """
+        Get the info about Gitlab projects, with one GraphQL query per
+        GRAPHQL_BATCH_SIZE projects. Projects given by their numeric id
+        rather than their full path are fetched one by one from the REST API.
+        """
+        results = {}
+        full_paths = []
+        for repo_name in repo_names:
+            if "/" in repo_name:
+                full_paths.append(repo_name)
+                continue
+            try:
+                results[repo_name] = self.get_repository_info(repo_name)
+            except RepositoryAccessError as error:
+                results[repo_name] = error
+        for start in range(0, len(full_paths), GRAPHQL_BATCH_SIZE):
+            batch = full_paths[start : start + GRAPHQL_BATCH_SIZE]
+            projects = self._query_projects(batch)
+            for repo_name in batch:
+                project = projects.get(repo_name.lower())
+                if project is None:
+                    results[repo_name] = RepositoryAccessError(
+                        f"Can't get repository info for {repo_name}: 404 Project Not Found"
+                    )
+                elif not (project["repository"] or {}).get("rootRef"):
+                    results[repo_name] = RepositoryAccessError(
+                        f"Repository does not have a default branch: {repo_name}"
+                    )
+                else:
+                    results[repo_name] = RepositoryInfo(
+                        main_language=_main_language(project),
+                        default_branch=project["repository"]["rootRef"],
+                        name=project["fullPath"],
+                        id=int(project["id"].rsplit("/", 1)[-1]),
+                    )
+        return results
+
+    def iter_repositories(
+        self, namespace: str, include_archived: bool = False
+    ) -> Iterator[RepositoryInfo]:
+        """
+        List the projects of a Gitlab group and of its subgroups
+        """
+        group_safe = urllib.parse.quote_plus(namespace)
+        path = (
+            f"groups/{group_safe}/projects?include_subgroups=true&per_page=100"
+            "&pagination=keyset&order_by=id&sort=asc"
+        )
+        if not include_archived:
+            path += "&archived=false"
+
+        for resp in self.iter_pages(path):
+            if not resp.ok:
+                raise RepositoryAccessError(
+                    f"Can't list projects of {namespace}: {resp.json()['message']}"
+                )
+            page = [data for data in resp.json() if data.get("default_branch")]
+            # languages of the whole page, in a few GraphQL queries
+            projects = {}
+            for start in range(0, len(page), GRAPHQL_BATCH_SIZE):
+                projects.update(
+                    self._query_projects(
+                        [
+                            data["path_with_namespace"]
+                            for data in page[start : start + GRAPHQL_BATCH_SIZE]
+                        ]
+                    )
+                )
+
+            for data in page:
+                project = projects.get(data["path_with_namespace"].lower())
+                yield RepositoryInfo(
+                    main_language=_main_language(project) if project else None,
+                    default_branch=data["default_branch"],
+                    name=data["path_with_namespace"],
+                    id=data["id"],
+                )
+
+    def get_pull_request(self, pull_request_url: str) -> dict:
+        """
+        Get a merge request from its URL, e.g. https://gitlab.com/group/project/-/merge_requests/3
+        """
+        project_url, _, iid = pull_request_url.partition("/-/merge_requests/")
+        project_path = project_url.removeprefix(self.instance_url).strip("/")
+        if not iid or not project_path:
+            raise PullRequestAccessError(f"Invalid merge request URL: {pull_request_url}")
+
+        project_safe = urllib.parse.quote_plus(project_path)
+        resp = self.get(f"projects/{project_safe}/merge_requests/{iid.strip('/')}")
+        if not resp.ok:
+            raise PullRequestAccessError(
+                f"Can't get merge request {pull_request_url}: {resp.json()['message']}"
+            )
+        return resp.json()
+
+    def pull_request_status(self, pull_request: dict) -> PullRequestStatus:
+        state = {
+            "merged": PULL_REQUEST_MERGED,
+            "closed": PULL_REQUEST_DECLINED,
+        }.get(pull_request["state"], PULL_REQUEST_OPEN)
+
+        project_path = pull_request["web_url"].partition("/-/merge_requests/")[0]
+        return PullRequestStatus(
+            state=state,
+            created_at=parse_datetime(pull_request["created_at"]),
+            branch=pull_request["source_branch"],
+            repository=RepositoryInfo(
+                main_language=None,
+                default_branch=pull_request["target_branch"],
+                name=project_path.removeprefix(self.instance_url).strip("/"),
+                id=pull_request["project_id"],
+            ),
+        )
+
+
+def _main_language(project: dict) -> str | None:
+    """
+    Main language of a project returned by the GraphQL API
+    """
+    languages = project.get("languages") or []
+    if not languages:
+        return None
+    return max(languages, key=lambda language: language["share"] or 0)["name"].lower()
 
 
 class GitLabRepoClient(VCSRepoClient):
+    commit_creates_branch = True
+
     @property
     def common_url_path(self) -> str | None:
         return f"api/v4/projects/{self.repo_info.id}"
@@ -80,32 +265,25 @@ class GitLabRepoClient(VCSRepoClient):
         target_branch: str,
     ) -> None:
         """
-        Create a new branch on a GitLab project with the name branch_name from the target_branch
+        The branch is created with the commit, see create_new_commit
         """
-        resp = self.post(
-            "repository/branches",
-            json={
-                "ref": target_branch,
-                "branch": branch_name,
-            },
-        )
-        if not resp.ok:
-            raise PullRequestCreationError(
-                f"Can't create new branch: {resp.json()['message']}"
-            )
+        pass
 
     def create_new_commit(
         self, pr_info: PullRequestInfo, repo_info: RepositoryInfo
     ) -> None:
+        # start_branch creates the branch from the default branch in the same request
         json_payload = {
             "branch": pr_info.branch,
+            "start_branch": repo_info.default_branch,
             "commit_message": pr_info.commit_message,
             "actions": [
                 {
                     "action": "create",
-                    "file_path": pr_info.filename,
-                    "content": pr_info.content,
+                    "file_path": file.filename,
+                    "content": file.content,
                 }
+                for file in pr_info.files
             ],
         }
 
@@ -143,3 +321,14 @@ class GitLabRepoClient(VCSRepoClient):
         self.delete(
             f"repository/branches/{branch_name}",
         )
+
+    def branch_exists(self, branch_name: str) -> bool:
+        branch_safe = urllib.parse.quote_plus(branch_name)
+        resp = self.get(f"repository/branches/{branch_safe}")
+        if resp.status_code == 404:
+            return False
+        if not resp.ok:
+            raise PullRequestCreationError(
+                f"Failed to get branch {branch_name}: {resp.json()['message']}"
+            )
+        return True
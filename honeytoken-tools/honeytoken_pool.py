@@ -0,0 +1,92 @@
+import threading
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from common import RepositoryInfo
+from gg_client import GGClient
+
+
+class HoneytokenPool:
+    """
+    Create honeytokens in the background, ahead of the repositories that need them,
+    so that the GitGuardian API latency is not on the critical path of each repository.
+
+    Honeytokens are named after their repository and created with its main language,
+    so each one is created for a given repository rather than taken from a shared stock.
+    The honeytokens that were created but not taken are revoked by close.
+    """
+
+    def __init__(
+        self,
+        gg_client: GGClient,
+        size: int,
+        workers: int = 1,
+        needs_honeytoken: Callable[[RepositoryInfo], bool] | None = None,
+    ):
+        self.gg_client = gg_client
+        self.size = size
+        self.needs_honeytoken = needs_honeytoken
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="honeytoken-pool"
+        )
+        self.futures: dict[str, Future] = {}
+        self.lock = threading.Lock()
+
+    def prefetch(self, repo: RepositoryInfo) -> None:
+        """
+        Start creating the honeytoken of a repository
+        """
+        if self.needs_honeytoken is not None and not self.needs_honeytoken(repo):
+            return
+        with self.lock:
+            if repo.full_name not in self.futures:
+                self.futures[repo.full_name] = self.executor.submit(
+                    self.gg_client.create_honey_token_with_context, repo
+                )
+
+    def prefetched(self, repos: Iterable[RepositoryInfo]) -> Iterator[RepositoryInfo]:
+        """
+        Yield the repositories, while the honeytokens of the next `size` ones are created
+        """
+        window = deque()
+        for repo in repos:
+            self.prefetch(repo)
+            window.append(repo)
+            if len(window) > self.size:
+                yield window.popleft()
+        yield from window
+
+    def take(self, repo: RepositoryInfo) -> dict:
+        """
+        Get the honeytoken of a repository, waiting for it if it is still being created.
+        It is created right away if it was not prefetched.
+        Raise the errors of the honeytoken creation.
+        """
+        with self.lock:
+            future = self.futures.pop(repo.full_name, None)
+        if future is None:
+            return self.gg_client.create_honey_token_with_context(repo)
+        return future.result()
+
+    def close(self) -> list[str]:
+        """
+        Wait for the honeytokens being created, and revoke the ones that were not taken.
+        :return: ids of the honeytokens that could not be revoked
+        """
+        self.executor.shutdown(wait=True)
+        with self.lock:
+            futures, self.futures = self.futures, {}
+
+        not_revoked = []
+        for future in futures.values():
+            if future.exception() is not None:
+                continue
+            honey_token_id = future.result()["honeytoken_id"]
+            try:
+                revoked = self.gg_client.revoke_honey_token(honey_token_id)
+            except Exception:
+                revoked = False
+            if not revoked:
+                not_revoked.append(honey_token_id)
+        return not_revoked
@@ -0,0 +1,271 @@
+import json
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from urllib.parse import unquote, urlparse
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS disseminations (
+    vcs TEXT NOT NULL,
+    instance TEXT NOT NULL,
+    repository TEXT NOT NULL,
+    status TEXT NOT NULL,
+    honeytoken_id TEXT NOT NULL,
+    honeytoken TEXT NOT NULL,
+    branch TEXT NOT NULL,
+    steps TEXT NOT NULL DEFAULT '[]',
+    pull_request_url TEXT,
+    extra_honeytokens TEXT NOT NULL DEFAULT '[]',
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (vcs, instance, repository)
+)
+"""
+
+IN_PROGRESS = "in_progress"
+DONE = "done"
+# set by reconcile_honeytokens.py once the pull request is merged, or the honeytoken revoked
+MERGED = "merged"
+REVOKED = "revoked"
+
+# Version of the ledgers keying the repositories by their full name,
+# see RepositoryInfo.full_name
+SCHEMA_VERSION = 2
+# VCS whose repositories were keyed by their bare name before
+BARE_NAME_VCS = ("ado", "bitbucket")
+
+
+class DisseminationLedger:
+    """
+    Local SQLite record of the dissemination in each repository, so that an
+    interrupted rollout can be run again: repositories with a pull request are
+    skipped, and the others reuse their honeytoken and the steps already done.
+    Repositories are identified by their full name, case-insensitively.
+
+    The ledger holds the honeytokens content, it must be kept private.
+    """
+
+    def __init__(self, path: str, vcs: str, instance_url: str):
+        self.vcs = vcs
+        self.instance_url = instance_url
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        with self.connection:
+            self.connection.execute(SCHEMA)
+            columns = {
+                row["name"]
+                for row in self.connection.execute("PRAGMA table_info(disseminations)")
+            }
+            # ledgers created before the honeytokens per repository option
+            if "extra_honeytokens" not in columns:
+                self.connection.execute(
+                    "ALTER TABLE disseminations "
+                    "ADD COLUMN extra_honeytokens TEXT NOT NULL DEFAULT '[]'"
+                )
+            version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+            if version < 1:
+                self._migrate_bare_names()
+            if version < 2:
+                self._migrate_gitlab_names()
+            if version < SCHEMA_VERSION:
+                self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
+
+    def get(self, repository: str) -> dict | None:
+        """
+        Get the ledger entry of a repository, None if nothing was recorded
+        """
+        with self.lock, self.connection:
+            row = self._select(repository)
+            bare_name = repository.rsplit("/", 1)[-1]
+            if row is None and self.vcs in BARE_NAME_VCS and bare_name != repository:
+                # entry of an older ledger, without pull request yet
+                row = self._select(bare_name)
+                if row is not None:
+                    self.connection.execute(
+                        "UPDATE OR IGNORE disseminations SET repository = ? WHERE rowid = ?",
+                        (repository, row["rowid"]),
+                    )
+                    row = self._select(repository)
+        if row is None:
+            return None
+
+        return _entry(row)
+
+    def entries(self, status: str) -> list[dict]:
+        """
+        Get the ledger entries with a given status
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT * FROM disseminations "
+                "WHERE vcs = ? AND instance = ? AND status = ? ORDER BY repository",
+                (self.vcs, self.instance_url, status),
+            ).fetchall()
+        return [_entry(row) for row in rows]
+
+    def record_honeytoken(
+        self,
+        repository: str,
+        honeytoken: dict,
+        branch: str,
+        extra_honeytokens: list[dict] = (),
+    ) -> None:
+        """
+        Record the honeytokens created for a repository, as returned by GitGuardian
+        """
+        self._execute(
+            "INSERT OR REPLACE INTO disseminations "
+            "(vcs, instance, repository, status, honeytoken_id, honeytoken, branch, "
+            "extra_honeytokens, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                self.vcs,
+                self.instance_url,
+                repository,
+                IN_PROGRESS,
+                honeytoken["honeytoken_id"],
+                json.dumps(honeytoken),
+                branch,
+                json.dumps(list(extra_honeytokens)),
+                _now(),
+            ),
+        )
+
+    def record_step(self, repository: str, step: str) -> None:
+        """
+        Record a dissemination step done in the repository, see VCSRepoClient.disseminate_in_pull_request
+        """
+        with self.lock, self.connection:
+            row = self.connection.execute(
+                "SELECT steps FROM disseminations "
+                "WHERE vcs = ? AND instance = ? AND repository = ? COLLATE NOCASE",
+                (self.vcs, self.instance_url, repository),
+            ).fetchone()
+            steps = json.loads(row["steps"]) if row else []
+            if step not in steps:
+                steps.append(step)
+            self.connection.execute(
+                "UPDATE disseminations SET steps = ?, updated_at = ? "
+                "WHERE vcs = ? AND instance = ? AND repository = ? COLLATE NOCASE",
+                (json.dumps(steps), _now(), self.vcs, self.instance_url, repository),
+            )
+
+    def reset_steps(self, repository: str) -> None:
+        """
+        Forget the steps done in the repository, keeping its honeytoken
+        """
+        self._execute(
+            "UPDATE disseminations SET steps = '[]', updated_at = ? "
+            "WHERE vcs = ? AND instance = ? AND repository = ? COLLATE NOCASE",
+            (_now(), self.vcs, self.instance_url, repository),
+        )
+
+    def record_pull_request(self, repository: str, pull_request_url: str) -> None:
+        self._execute(
+            "UPDATE disseminations SET status = ?, pull_request_url = ?, updated_at = ? "
+            "WHERE vcs = ? AND instance = ? AND repository = ? COLLATE NOCASE",
+            (DONE, pull_request_url, _now(), self.vcs, self.instance_url, repository),
+        )
+
+    def record_status(self, repository: str, status: str) -> None:
+        self._execute(
+            "UPDATE disseminations SET status = ?, updated_at = ? "
+            "WHERE vcs = ? AND instance = ? AND repository = ? COLLATE NOCASE",
+            (status, _now(), self.vcs, self.instance_url, repository),
+        )
+
+    def forget(self, repository: str) -> None:
+        """
+        Remove the entry of a repository, e.g. once its honeytoken is revoked
+        """
+        self._execute(
+            "DELETE FROM disseminations "
+            "WHERE vcs = ? AND instance = ? AND repository = ? COLLATE NOCASE",
+            (self.vcs, self.instance_url, repository),
+        )
+
+    def _migrate_bare_names(self) -> None:
+        """
+        Key the Azure DevOps and BitBucket entries of older ledgers by the full name
+        of their repository, found in their pull request URL. The entries without
+        a pull request yet are renamed by get.
+        """
+        rows = self.connection.execute(
+            "SELECT rowid, vcs, repository, pull_request_url FROM disseminations "
+            f"WHERE vcs IN ({', '.join('?' for _ in BARE_NAME_VCS)}) "
+            "AND pull_request_url IS NOT NULL AND repository NOT LIKE '%/%'",
+            BARE_NAME_VCS,
+        ).fetchall()
+        for row in rows:
+            full_name = _full_name_from_pull_request_url(
+                row["vcs"], row["pull_request_url"]
+            )
+            if full_name is not None:
+                self.connection.execute(
+                    "UPDATE OR IGNORE disseminations SET repository = ? WHERE rowid = ?",
+                    (full_name, row["rowid"]),
+                )
+
+    def _migrate_gitlab_names(self) -> None:
+        """
+        Key the Gitlab entries of older ledgers, recorded under the name of their
+        project ("Group / Project") when it was given to --repo-names, by its path
+        ("group/project"), found in their merge request URL
+        """
+        rows = self.connection.execute(
+            "SELECT rowid, instance, pull_request_url FROM disseminations "
+            "WHERE vcs = 'gitlab' AND pull_request_url IS NOT NULL "
+            "AND repository LIKE '% / %'"
+        ).fetchall()
+        for row in rows:
+            project_url = row["pull_request_url"].partition("/-/merge_requests/")[0]
+            self.connection.execute(
+                "UPDATE OR IGNORE disseminations SET repository = ? WHERE rowid = ?",
+                (project_url.removeprefix(row["instance"]).strip("/"), row["rowid"]),
+            )
+
+    def _select(self, repository: str) -> sqlite3.Row | None:
+        return self.connection.execute(
+            "SELECT rowid, * FROM disseminations "
+            "WHERE vcs = ? AND instance = ? AND repository = ? COLLATE NOCASE",
+            (self.vcs, self.instance_url, repository),
+        ).fetchone()
+
+    def _execute(self, query: str, parameters: tuple) -> None:
+        with self.lock, self.connection:
+            self.connection.execute(query, parameters)
+
+
+def _full_name_from_pull_request_url(vcs: str, pull_request_url: str) -> str | None:
+    """
+    Full name of the repository of a pull request URL, e.g.
+    https://dev.azure.com/organization/project/_git/repository/pullrequest/3 or
+    https://bitbucket.example.com/projects/PROJECT/repos/repository/pull-requests/3
+    """
+    path = [unquote(part) for part in urlparse(pull_request_url).path.split("/")]
+    if vcs == "ado" and "_git" in path:
+        index = path.index("_git")
+        if index >= 2 and index + 1 < len(path):
+            return "/".join([path[index - 2], path[index - 1], path[index + 1]])
+    if vcs == "bitbucket" and "projects" in path:
+        index = path.index("projects")
+        if index + 3 < len(path) and path[index + 2] == "repos":
+            return f"{path[index + 1]}/{path[index + 3]}"
+    return None
+
+
+def _entry(row: sqlite3.Row) -> dict:
+    entry = dict(row)
+    entry.pop("rowid", None)
+    entry["honeytoken"] = json.loads(entry["honeytoken"])
+    entry["steps"] = json.loads(entry["steps"])
+    entry["extra_honeytokens"] = json.loads(entry["extra_honeytokens"])
+    return entry
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
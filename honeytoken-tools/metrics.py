@@ -0,0 +1,112 @@
+import math
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+
+
+def percentile(values: list[float], percent: float) -> float:
+    """
+    Nearest-rank percentile, 0 for an empty list
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+class RequestStats:
+    """
+    Number, latencies and retries of the requests sent to each host.
+    A single instance is shared by all the clients of a run.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hosts: dict[str, dict] = {}
+
+    def record(
+        self, url: str, latency: float, resp: requests.Response, rate_limited: bool
+    ) -> None:
+        # retries done by the session, see client.create_session
+        retry_history = getattr(getattr(resp.raw, "retries", None), "history", ())
+        with self.lock:
+            host = self.hosts.setdefault(
+                urlparse(url).netloc,
+                {"requests": 0, "errors": 0, "retries": 0, "rate_limited": 0, "latencies": []},
+            )
+            host["requests"] += 1
+            host["errors"] += int(not resp.ok)
+            host["retries"] += len(retry_history)
+            host["rate_limited"] += int(rate_limited)
+            host["latencies"].append(latency)
+
+    def recent_latency(self, host: str, count: int) -> float | None:
+        """
+        Median latency of the last `count` requests to a host,
+        None until `count` requests were sent
+        """
+        with self.lock:
+            latencies = self.hosts.get(host, {}).get("latencies", [])[-count:]
+        if len(latencies) < count:
+            return None
+        return percentile(latencies, 50)
+
+    def summary(self) -> dict:
+        with self.lock:
+            return {
+                name: {
+                    "requests": host["requests"],
+                    "errors": host["errors"],
+                    "retries": host["retries"],
+                    "rate_limited": host["rate_limited"],
+                    "latency_p50": round(percentile(host["latencies"], 50), 3),
+                    "latency_p95": round(percentile(host["latencies"], 95), 3),
+                    "latency_max": round(max(host["latencies"], default=0.0), 3),
+                }
+                for name, host in self.hosts.items()
+            }
+
+
+class StepTimer:
+    """
+    Duration of the successive steps of a dissemination, in seconds
+    """
+
+    def __init__(self):
+        self.started_at = self.last_step_at = time.perf_counter()
+        self.timings: dict[str, float] = {}
+
+    def step_done(self, step: str) -> None:
+        now = time.perf_counter()
+        self.timings[step] = round(now - self.last_step_at, 3)
+        self.last_step_at = now
+
+    def total(self) -> float:
+        return round(self.last_step_at - self.started_at, 3)
+
+
+def run_summary(results: dict, elapsed: float, request_stats: RequestStats | None) -> dict:
+    """
+    Aggregate the results of a run: number of repositories, throughput,
+    average duration of each step and statistics of the requests per host
+    """
+    step_totals: dict[str, list[float]] = {}
+    for result in results.values():
+        for step, seconds in result.get("timings", {}).items():
+            step_totals.setdefault(step, []).append(seconds)
+
+    ok = sum(1 for result in results.values() if result["ok"])
+    return {
+        "repositories": len(results),
+        "ok": ok,
+        "failed": len(results) - ok,
+        "seconds": round(elapsed, 3),
+        "repositories_per_minute": round(len(results) / elapsed * 60, 1) if elapsed else 0.0,
+        "average_step_seconds": {
+            step: round(sum(values) / len(values), 3) for step, values in step_totals.items()
+        },
+        "hosts": request_stats.summary() if request_stats is not None else {},
+    }
@@ -0,0 +1,953 @@
+"""
+Local stand-ins for the GitHub, GitLab, Azure DevOps, BitBucket Server and GitGuardian
+APIs, implementing the endpoints called by the clients of honeytoken-tools, to run
+disseminations against fake repositories, e.g. with benchmark.py.
+
+Latency, failures and rate limits can be injected, see MockSettings.
+"""
+
+import argparse
+import email
+import hashlib
+import itertools
+import json
+import math
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+LANGUAGES = ["Python", "Go", "JavaScript", "Java", "Ruby"]
+
+
+@dataclass
+class MockSettings:
+    # each response is delayed by latency seconds, plus up to jitter seconds
+    latency: float = 0.0
+    jitter: float = 0.0
+    # fraction of the requests answered with an HTTP 503
+    failure_rate: float = 0.0
+    # number of requests accepted per rate_limit_window seconds, 0 for no limit
+    rate_limit: int = 0
+    rate_limit_window: float = 60.0
+    seed: int | None = None
+
+
+@dataclass
+class MockRequest:
+    method: str
+    path: str
+    query: dict[str, str]
+    body: bytes
+    content_type: str = ""
+
+    def json(self):
+        return json.loads(self.body or b"{}")
+
+    def form(self) -> dict[str, str]:
+        """
+        Fields of a multipart form, as sent with the files argument of requests
+        """
+        message = email.message_from_bytes(
+            f"Content-Type: {self.content_type}\r\n\r\n".encode() + self.body
+        )
+        return {
+            part.get_param("name", header="content-disposition"): part.get_payload(
+                decode=True
+            ).decode()
+            for part in message.get_payload()
+        }
+
+
+def error(status: int, message: str) -> tuple[int, dict]:
+    """
+    Error response readable by all the clients, whatever key they read the message from
+    """
+    return status, {"message": message, "detail": message, "errors": [{"message": message}]}
+
+
+def fake_sha(*parts) -> str:
+    return hashlib.sha1("/".join(str(part) for part in parts).encode()).hexdigest()
+
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+class MockBackend:
+    """
+    State and routes of a mocked API. Routes are (method, path regex, handler name),
+    the handlers get the request and the groups of the regex, and return a status
+    and a JSON body, with optional headers.
+    """
+
+    routes: list[tuple[str, str, str]] = []
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.base_url = ""
+        self.ids = itertools.count(1)
+
+    def handle(self, request: MockRequest) -> tuple:
+        for method, pattern, handler in self.routes:
+            if method != request.method:
+                continue
+            match = re.fullmatch(pattern, request.path)
+            if match:
+                groups = [unquote(group) if group else group for group in match.groups()]
+                return getattr(self, handler)(request, *groups)
+        return error(404, f"Not found: {request.method} {request.path}")
+
+
+class MockVCSBackend(MockBackend):
+    """
+    VCS with `repositories` repositories named repo-00000, repo-00001... in `namespace`,
+    whose default branch is main
+    """
+
+    def __init__(self, namespace: str, repositories: int):
+        super().__init__()
+        self.namespace = namespace
+        self.repositories = {
+            f"repo-{index:05d}": {
+                "id": index + 1,
+                "name": f"repo-{index:05d}",
+                "language": LANGUAGES[index % len(LANGUAGES)],
+                "branches": {"main": fake_sha(index, "main")},
+            }
+            for index in range(repositories)
+        }
+        self.pull_requests: dict[int, dict] = {}
+
+    def repository(self, name: str) -> dict | None:
+        return self.repositories.get(name.split("/")[-1])
+
+    def create_branch(self, repo: dict, branch: str, sha: str | None = None) -> bool:
+        with self.lock:
+            if branch in repo["branches"]:
+                return False
+            repo["branches"][branch] = sha or repo["branches"]["main"]
+            return True
+
+    def delete_branch(self, repo: dict, branch: str) -> None:
+        with self.lock:
+            repo["branches"].pop(branch, None)
+
+    def create_pull_request(self, repo: dict, branch: str, target: str) -> dict:
+        pull_request = {
+            "id": next(self.ids),
+            "repo": repo,
+            "branch": branch,
+            "target": target,
+            "created_at": now_iso(),
+        }
+        with self.lock:
+            self.pull_requests[pull_request["id"]] = pull_request
+        return pull_request
+
+
+class GitHubBackend(MockVCSBackend):
+    routes = [
+        ("GET", r"/api/v3/user", "get_user"),
+        ("GET", r"/api/v3/repos/[^/]+/([^/]+)", "get_repository"),
+        ("GET", r"/api/v3/(?:orgs|users)/([^/]+)/repos", "list_repositories"),
+        ("GET", r"/api/v3/repos/[^/]+/([^/]+)/branches/(.+)", "get_branch"),
+        ("POST", r"/api/v3/repos/[^/]+/([^/]+)/git/refs", "create_ref"),
+        ("POST", r"/api/v3/repos/[^/]+/([^/]+)/git/trees", "create_tree"),
+        ("POST", r"/api/v3/repos/[^/]+/([^/]+)/git/commits", "create_commit"),
+        ("POST", r"/api/v3/repos/[^/]+/([^/]+)/git/refs/heads/(.+)", "update_ref"),
+        ("DELETE", r"/api/v3/repos/[^/]+/([^/]+)/git/refs/heads/(.+)", "delete_ref"),
+        ("POST", r"/api/v3/repos/[^/]+/([^/]+)/pulls", "create_pull"),
+        ("GET", r"/api/v3/repos/[^/]+/([^/]+)/pulls/(\d+)", "get_pull"),
+        ("POST", r"/api/graphql", "graphql"),
+    ]
+
+    def repository_data(self, repo: dict) -> dict:
+        return {
+            "id": repo["id"],
+            "node_id": f"R_{repo['id']}",
+            "full_name": f"{self.namespace}/{repo['name']}",
+            "default_branch": "main",
+            "language": repo["language"],
+            "archived": False,
+        }
+
+    def get_user(self, request):
+        return 200, {"login": "benchmark"}
+
+    def get_repository(self, request, name):
+        repo = self.repository(name)
+        if repo is None:
+            return error(404, "Not Found")
+        return 200, self.repository_data(repo)
+
+    def list_repositories(self, request, namespace):
+        if namespace != self.namespace:
+            return error(404, "Not Found")
+        per_page = int(request.query.get("per_page", 30))
+        page = int(request.query.get("page", 1))
+        repos = list(self.repositories.values())
+        headers = {}
+        if page * per_page < len(repos):
+            headers["Link"] = (
+                f'<{self.base_url}/api/v3/orgs/{namespace}/repos?per_page={per_page}'
+                f'&page={page + 1}>; rel="next"'
+            )
+        page_repos = repos[(page - 1) * per_page : page * per_page]
+        return 200, [self.repository_data(repo) for repo in page_repos], headers
+
+    def get_branch(self, request, name, branch):
+        repo = self.repository(name)
+        if repo is None or branch not in repo["branches"]:
+            return error(404, "Branch not found")
+        sha = repo["branches"][branch]
+        return 200, {"commit": {"sha": sha, "commit": {"tree": {"sha": fake_sha(sha, "tree")}}}}
+
+    def create_ref(self, request, name):
+        repo = self.repository(name)
+        data = request.json()
+        branch = data["ref"].removeprefix("refs/heads/")
+        if repo is None or not self.create_branch(repo, branch, data["sha"]):
+            return error(422, "Reference already exists")
+        return 201, {"ref": data["ref"]}
+
+    def create_tree(self, request, name):
+        return 201, {"sha": fake_sha(name, "tree", next(self.ids))}
+
+    def create_commit(self, request, name):
+        return 201, {"sha": fake_sha(name, "commit", next(self.ids))}
+
+    def update_ref(self, request, name, branch):
+        repo = self.repository(name)
+        if repo is None or branch not in repo["branches"]:
+            return error(422, "Reference does not exist")
+        repo["branches"][branch] = request.json()["sha"]
+        return 200, {"ref": f"refs/heads/{branch}"}
+
+    def delete_ref(self, request, name, branch):
+        repo = self.repository(name)
+        if repo is not None:
+            self.delete_branch(repo, branch)
+        return 204, None
+
+    def pull_request_data(self, pull_request: dict) -> dict:
+        repo = pull_request["repo"]
+        full_name = f"{self.namespace}/{repo['name']}"
+        return {
+            "number": pull_request["id"],
+            "html_url": f"{self.base_url}/{full_name}/pull/{pull_request['id']}",
+            "state": "open",
+            "merged_at": None,
+            "created_at": pull_request["created_at"],
+            "head": {"ref": pull_request["branch"]},
+            "base": {"ref": pull_request["target"], "repo": self.repository_data(repo)},
+        }
+
+    def create_pull(self, request, name):
+        repo = self.repository(name)
+        data = request.json()
+        if repo is None or data["head"] not in repo["branches"]:
+            return error(422, "Validation Failed")
+        pull_request = self.create_pull_request(repo, data["head"], data["base"])
+        return 201, self.pull_request_data(pull_request)
+
+    def get_pull(self, request, name, number):
+        pull_request = self.pull_requests.get(int(number))
+        if pull_request is None:
+            return error(404, "Not Found")
+        return 200, self.pull_request_data(pull_request)
+
+    def graphql(self, request):
+        data = request.json()
+        query, variables = data["query"], data.get("variables") or {}
+        if "createRef" in query:
+            repo = self.repository_by_node_id(variables["repositoryId"])
+            branch = variables["name"].removeprefix("refs/heads/")
+            if repo is None or not self.create_branch(repo, branch, variables["oid"]):
+                return 200, {"errors": [{"message": "A ref named that already exists"}]}
+            return 200, {"data": {"createRef": {"ref": {"id": fake_sha(branch)}}}}
+        if "createCommitOnBranch" in query:
+            branch = variables["input"]["branch"]
+            repo = self.repository(branch["repositoryNameWithOwner"])
+            if repo is None or branch["branchName"] not in repo["branches"]:
+                return 200, {"errors": [{"message": "Branch not found"}]}
+            sha = fake_sha(branch["branchName"], next(self.ids))
+            repo["branches"][branch["branchName"]] = sha
+            return 200, {"data": {"createCommitOnBranch": {"commit": {"oid": sha}}}}
+        if "createPullRequest" in query:
+            pr_input = variables["input"]
+            repo = self.repository_by_node_id(pr_input["repositoryId"])
+            if repo is None:
+                return 200, {"errors": [{"message": "Repository not found"}]}
+            pull_request = self.create_pull_request(
+                repo, pr_input["headRefName"], pr_input["baseRefName"]
+            )
+            url = self.pull_request_data(pull_request)["html_url"]
+            return 200, {"data": {"createPullRequest": {"pullRequest": {"url": url}}}}
+        return self.graphql_repositories(variables)
+
+    def graphql_repositories(self, variables: dict):
+        result, errors = {}, []
+        for index in itertools.count():
+            if f"name{index}" not in variables:
+                break
+            repo = self.repository(variables[f"name{index}"])
+            if repo is None or variables[f"owner{index}"] != self.namespace:
+                result[f"repo{index}"] = None
+                errors.append(
+                    {"type": "NOT_FOUND", "path": [f"repo{index}"], "message": "Could not resolve"}
+                )
+                continue
+            sha = repo["branches"]["main"]
+            result[f"repo{index}"] = {
+                "id": f"R_{repo['id']}",
+                "databaseId": repo["id"],
+                "primaryLanguage": {"name": repo["language"]},
+                "defaultBranchRef": {
+                    "name": "main",
+                    "target": {"oid": sha, "tree": {"oid": fake_sha(sha, "tree")}},
+                },
+            }
+        response = {"data": result}
+        if errors:
+            response["errors"] = errors
+        return 200, response
+
+    def repository_by_node_id(self, node_id: str) -> dict | None:
+        repo_id = int(node_id.removeprefix("R_"))
+        return self.repository(f"repo-{repo_id - 1:05d}")
+
+
+class GitLabBackend(MockVCSBackend):
+    routes = [
+        ("GET", r"/api/v4/version", "get_version"),
+        ("GET", r"/api/v4/projects/([^/]+)", "get_project"),
+        ("GET", r"/api/v4/projects/([^/]+)/languages", "get_languages"),
+        ("GET", r"/api/v4/groups/([^/]+)/projects", "list_projects"),
+        ("POST", r"/api/v4/projects/([^/]+)/repository/commits", "create_commit"),
+        ("GET", r"/api/v4/projects/([^/]+)/repository/branches/(.+)", "get_branch"),
+        ("DELETE", r"/api/v4/projects/([^/]+)/repository/branches/(.+)", "delete_ref"),
+        ("POST", r"/api/v4/projects/([^/]+)/merge_requests", "create_merge_request"),
+        ("GET", r"/api/v4/projects/([^/]+)/merge_requests/(\d+)", "get_merge_request"),
+        ("POST", r"/api/graphql", "graphql"),
+    ]
+
+    def project(self, id_or_path: str) -> dict | None:
+        if id_or_path.isdigit():
+            return self.repository(f"repo-{int(id_or_path) - 1:05d}")
+        namespace, _, name = id_or_path.rpartition("/")
+        if namespace != self.namespace:
+            return None
+        return self.repository(name)
+
+    def project_data(self, repo: dict) -> dict:
+        return {
+            "id": repo["id"],
+            "name_with_namespace": f"{self.namespace.title()} / {repo['name']}",
+            "path_with_namespace": f"{self.namespace}/{repo['name']}",
+            "default_branch": "main",
+        }
+
+    def get_version(self, request):
+        return 200, {"version": "17.0.0"}
+
+    def get_project(self, request, id_or_path):
+        repo = self.project(id_or_path)
+        if repo is None:
+            return error(404, "404 Project Not Found")
+        return 200, self.project_data(repo)
+
+    def get_languages(self, request, id_or_path):
+        repo = self.project(id_or_path)
+        if repo is None:
+            return error(404, "404 Project Not Found")
+        return 200, {repo["language"]: 100.0}
+
+    def list_projects(self, request, group):
+        if group != self.namespace:
+            return error(404, "404 Group Not Found")
+        per_page = int(request.query.get("per_page", 20))
+        id_after = int(request.query.get("id_after", 0))
+        repos = [repo for repo in self.repositories.values() if repo["id"] > id_after]
+        page = repos[:per_page]
+        headers = {}
+        if len(repos) > per_page:
+            headers["Link"] = (
+                f"<{self.base_url}/api/v4/groups/{group}/projects?include_subgroups=true"
+                f"&per_page={per_page}&pagination=keyset&order_by=id&sort=asc"
+                f'&id_after={page[-1]["id"]}>; rel="next"'
+            )
+        return 200, [self.project_data(repo) for repo in page], headers
+
+    def create_commit(self, request, id_or_path):
+        repo = self.project(id_or_path)
+        data = request.json()
+        if repo is None:
+            return error(404, "404 Project Not Found")
+        if not self.create_branch(repo, data["branch"]):
+            return error(400, "A branch called this already exists")
+        return 201, {"id": fake_sha(data["branch"], next(self.ids))}
+
+    def get_branch(self, request, id_or_path, branch):
+        repo = self.project(id_or_path)
+        if repo is None or branch not in repo["branches"]:
+            return error(404, "404 Branch Not Found")
+        return 200, {"name": branch, "commit": {"id": repo["branches"][branch]}}
+
+    def delete_ref(self, request, id_or_path, branch):
+        repo = self.project(id_or_path)
+        if repo is not None:
+            self.delete_branch(repo, branch)
+        return 204, None
+
+    def merge_request_data(self, pull_request: dict) -> dict:
+        repo = pull_request["repo"]
+        return {
+            "iid": pull_request["id"],
+            "project_id": repo["id"],
+            "web_url": f"{self.base_url}/{self.namespace}/{repo['name']}/-/merge_requests/{pull_request['id']}",
+            "state": "opened",
+            "created_at": pull_request["created_at"],
+            "source_branch": pull_request["branch"],
+            "target_branch": pull_request["target"],
+        }
+
+    def create_merge_request(self, request, id_or_path):
+        repo = self.project(id_or_path)
+        data = request.json()
+        if repo is None or data["source_branch"] not in repo["branches"]:
+            return error(400, "Invalid source branch")
+        pull_request = self.create_pull_request(
+            repo, data["source_branch"], data["target_branch"]
+        )
+        return 201, self.merge_request_data(pull_request)
+
+    def get_merge_request(self, request, id_or_path, iid):
+        pull_request = self.pull_requests.get(int(iid))
+        if pull_request is None:
+            return error(404, "404 Not found")
+        return 200, self.merge_request_data(pull_request)
+
+    def graphql(self, request):
+        nodes = []
+        for full_path in request.json()["variables"]["fullPaths"]:
+            # GraphQL only resolves full paths, not numeric ids
+            repo = None if full_path.isdigit() else self.project(full_path)
+            if repo is None:
+                continue
+            nodes.append(
+                {
+                    "id": f"gid://gitlab/Project/{repo['id']}",
+                    "fullPath": self.project_data(repo)["path_with_namespace"],
+                    "repository": {"rootRef": "main"},
+                    "languages": [{"name": repo["language"], "share": 100.0}],
+                }
+            )
+        return 200, {"data": {"projects": {"nodes": nodes}}}
+
+
+class ADOBackend(MockVCSBackend):
+    """
+    Azure DevOps, with the repositories in the project `namespace` (organization/project)
+    """
+
+    routes = [
+        ("GET", r"/([^/]+)/([^/]+)/_apis/git/repositories", "list_repositories"),
+        ("GET", r"/([^/]+)/([^/]+)/_apis/projectanalysis/languagemetrics", "get_language_metrics"),
+        ("GET", r"/[^/]+/[^/]+/_apis/git/repositories/([^/]+)/refs(?:/heads/(.+))?", "get_refs"),
+        ("POST", r"/[^/]+/[^/]+/_apis/git/repositories/([^/]+)/pushes", "create_push"),
+        ("POST", r"/[^/]+/[^/]+/_apis/git/repositories/([^/]+)/refs", "update_refs"),
+        ("POST", r"/[^/]+/[^/]+/_apis/git/repositories/([^/]+)/pullRequests", "create_pull_request_"),
+        ("GET", r"/[^/]+/[^/]+/_apis/git/pullrequests/(\d+)", "get_pull_request"),
+    ]
+
+    def repository(self, name: str) -> dict | None:
+        if name.startswith("id-"):
+            name = f"repo-{int(name.removeprefix('id-')) - 1:05d}"
+        return super().repository(name)
+
+    def repository_data(self, repo: dict) -> dict:
+        return {
+            "id": f"id-{repo['id']}",
+            "name": repo["name"],
+            "defaultBranch": "refs/heads/main",
+            "isDisabled": False,
+            "webUrl": f"{self.base_url}/{self.namespace}/_git/{repo['name']}",
+            "project": {"name": self.namespace.split("/")[1]},
+        }
+
+    def list_repositories(self, request, organization, project):
+        if f"{organization}/{project}" != self.namespace:
+            return error(404, "Project not found")
+        return 200, {"value": [self.repository_data(repo) for repo in self.repositories.values()]}
+
+    def get_language_metrics(self, request, organization, project):
+        return 200, {
+            "repositoryLanguageAnalytics": [
+                {"id": f"id-{repo['id']}", "languageBreakdown": [{"name": repo["language"]}]}
+                for repo in self.repositories.values()
+            ],
+            "languageBreakdown": [{"name": LANGUAGES[0]}],
+        }
+
+    def get_refs(self, request, repo_id, branch):
+        repo = self.repository(repo_id)
+        if repo is None:
+            return error(404, "Repository not found")
+        if branch is None:
+            branch = request.query.get("filter", "").removeprefix("heads/")
+        if branch not in repo["branches"]:
+            return 200, {"value": []}
+        return 200, {
+            "value": [{"name": f"refs/heads/{branch}", "objectId": repo["branches"][branch]}]
+        }
+
+    def create_push(self, request, repo_id):
+        repo = self.repository(repo_id)
+        data = request.json()
+        branch = data["refUpdates"][0]["name"].removeprefix("refs/heads/")
+        if repo is None or not self.create_branch(repo, branch):
+            return error(409, "The branch already exists")
+        return 201, {"pushId": next(self.ids)}
+
+    def update_refs(self, request, repo_id):
+        repo = self.repository(repo_id)
+        for ref in request.json():
+            if repo is not None and set(ref["newObjectId"]) == {"0"}:
+                self.delete_branch(repo, ref["name"].removeprefix("refs/heads/"))
+        return 200, {"value": []}
+
+    def pull_request_data(self, pull_request: dict) -> dict:
+        repo = self.repository_data(pull_request["repo"])
+        organization = self.namespace.split("/")[0]
+        return {
+            "pullRequestId": pull_request["id"],
+            "status": "active",
+            "creationDate": pull_request["created_at"],
+            "sourceRefName": f"refs/heads/{pull_request['branch']}",
+            "targetRefName": pull_request["target"],
+            "repository": repo,
+            "url": f"{self.base_url}/{organization}/project-id/_apis/git/repositories/"
+            f"{repo['id']}/pullRequests/{pull_request['id']}",
+        }
+
+    def create_pull_request_(self, request, repo_id):
+        repo = self.repository(repo_id)
+        data = request.json()
+        branch = data["sourceRefName"].removeprefix("refs/heads/")
+        if repo is None or branch not in repo["branches"]:
+            return error(400, "The source branch does not exist")
+        pull_request = self.create_pull_request(repo, branch, data["targetRefName"])
+        return 201, self.pull_request_data(pull_request)
+
+    def get_pull_request(self, request, pull_request_id):
+        pull_request = self.pull_requests.get(int(pull_request_id))
+        if pull_request is None:
+            return error(404, "Pull request not found")
+        return 200, self.pull_request_data(pull_request)
+
+
+class BitBucketBackend(MockVCSBackend):
+    """
+    BitBucket Server, with the repositories in the project whose key is `namespace`
+    """
+
+    routes = [
+        ("GET", r"/rest/api/1.0/users", "get_users"),
+        ("GET", r"/rest/api/1.0/projects/([^/]+)/repos", "list_repositories"),
+        ("GET", r"/rest/api/1.0/projects/[^/]+/repos/([^/]+)/default-branch", "get_default_branch"),
+        ("POST", r"/rest/api/1.0/projects/[^/]+/repos/([^/]+)/branches", "create_ref"),
+        ("GET", r"/rest/api/1.0/projects/[^/]+/repos/([^/]+)/browse/(.+)", "get_file"),
+        ("PUT", r"/rest/api/1.0/projects/[^/]+/repos/([^/]+)/browse/(.+)", "put_file"),
+        ("POST", r"/rest/api/1.0/projects/[^/]+/repos/([^/]+)/pull-requests", "create_pull_request_"),
+        ("GET", r"/rest/api/1.0/projects/[^/]+/repos/([^/]+)/pull-requests/(\d+)", "get_pull_request"),
+        ("DELETE", r"/rest/branch-utils/1.0/projects/[^/]+/repos/([^/]+)/branches", "delete_ref"),
+    ]
+
+    def __init__(self, namespace: str, repositories: int):
+        super().__init__(namespace, repositories)
+        # content of the files committed on each branch, by repository and branch
+        self.files: dict[tuple[str, str], dict[str, str]] = {}
+
+    def get_users(self, request):
+        return 200, {"values": []}
+
+    def list_repositories(self, request, project_key):
+        if project_key != self.namespace:
+            return error(404, f"Project {project_key} does not exist.")
+        start = int(request.query.get("start", 0))
+        limit = int(request.query.get("limit", 25))
+        repos = list(self.repositories.values())[start : start + limit]
+        is_last_page = start + limit >= len(self.repositories)
+        page = {
+            "values": [
+                {"id": repo["id"], "slug": repo["name"], "archived": False}
+                for repo in repos
+            ],
+            "isLastPage": is_last_page,
+        }
+        if not is_last_page:
+            page["nextPageStart"] = start + limit
+        return 200, page
+
+    def get_default_branch(self, request, slug):
+        if self.repository(slug) is None:
+            return error(404, f"Repository {slug} does not exist.")
+        return 200, {"id": "refs/heads/main", "displayId": "main"}
+
+    def create_ref(self, request, slug):
+        repo = self.repository(slug)
+        if repo is None or not self.create_branch(repo, request.json()["name"]):
+            return error(409, "Branch already exists")
+        return 200, {"id": f"refs/heads/{request.json()['name']}"}
+
+    def get_file(self, request, slug, path):
+        branch = request.query.get("at", "main").removeprefix("refs/heads/")
+        content = self.files.get((slug, branch), {}).get(path)
+        if content is None:
+            return error(404, f'The path "{path}" does not exist at revision "{branch}"')
+        lines = [{"text": line} for line in content.splitlines()]
+        return 200, {"lines": lines, "start": 0, "size": len(lines), "isLastPage": True}
+
+    def put_file(self, request, slug, path):
+        repo = self.repository(slug)
+        form = request.form()
+        if repo is None or form["branch"] not in repo["branches"]:
+            return error(404, f"Branch {form['branch']} does not exist.")
+        with self.lock:
+            files = self.files.setdefault((slug, form["branch"]), {})
+            if path in files and "sourceCommitId" not in form:
+                return error(409, f'The file "{path}" already exists.')
+            files[path] = form["content"]
+        return 200, {"id": fake_sha(slug, path, next(self.ids))}
+
+    def pull_request_data(self, pull_request: dict) -> dict:
+        repo = pull_request["repo"]
+        repository = {
+            "id": repo["id"],
+            "slug": repo["name"],
+            "project": {"key": self.namespace},
+        }
+        created_at = datetime.fromisoformat(pull_request["created_at"].replace("Z", "+00:00"))
+        return {
+            "id": pull_request["id"],
+            "state": "OPEN",
+            "createdDate": int(created_at.timestamp() * 1000),
+            "fromRef": {"displayId": pull_request["branch"], "repository": repository},
+            "toRef": {"id": pull_request["target"], "repository": repository},
+            "links": {
+                "self": [
+                    {
+                        "href": f"{self.base_url}/projects/{self.namespace}/repos/"
+                        f"{repo['name']}/pull-requests/{pull_request['id']}"
+                    }
+                ]
+            },
+        }
+
+    def create_pull_request_(self, request, slug):
+        repo = self.repository(slug)
+        data = request.json()
+        branch = data["fromRef"]["id"].removeprefix("refs/heads/")
+        if repo is None or branch not in repo["branches"]:
+            return error(409, "The source branch does not exist")
+        pull_request = self.create_pull_request(repo, branch, data["toRef"]["id"])
+        return 201, self.pull_request_data(pull_request)
+
+    def get_pull_request(self, request, slug, pull_request_id):
+        pull_request = self.pull_requests.get(int(pull_request_id))
+        if pull_request is None:
+            return error(404, "Pull request not found")
+        return 200, self.pull_request_data(pull_request)
+
+    def delete_ref(self, request, slug):
+        repo = self.repository(slug)
+        if repo is not None:
+            self.delete_branch(repo, request.json()["name"])
+            with self.lock:
+                self.files.pop((slug, request.json()["name"]), None)
+        return 204, None
+
+
+class GitGuardianBackend(MockBackend):
+    """
+    GitGuardian honeytoken API. The URL of a self-hosted instance, given to the
+    clients, is turned into its API URL by adding /exposed
+    """
+
+    routes = [
+        ("GET", r"(?:/exposed)?/v1/health", "get_health"),
+        ("POST", r"(?:/exposed)?/v1/honeytokens/with-context", "create_honeytoken"),
+        ("POST", r"(?:/exposed)?/v1/honeytokens/([^/]+)/revoke", "revoke_honeytoken"),
+        ("GET", r"(?:/exposed)?/v1/honeytokens", "list_honeytokens"),
+    ]
+
+    def __init__(self):
+        super().__init__()
+        self.honeytokens: dict[str, dict] = {}
+
+    def get_health(self, request):
+        return 200, {"detail": "Valid API key."}
+
+    def create_honeytoken(self, request):
+        data = request.json()
+        honeytoken_id = fake_sha("honeytoken", next(self.ids))[:32]
+        with self.lock:
+            self.honeytokens[honeytoken_id] = {
+                "id": honeytoken_id,
+                "name": data["name"],
+                "status": "ACTIVE",
+                "created_at": now_iso(),
+            }
+        filename = {"python": "settings.py", "go": "config.go"}.get(
+            data.get("language"), "config.env"
+        )
+        return 201, {
+            "honeytoken_id": honeytoken_id,
+            "content": f"aws_access_key_id = AKIA{honeytoken_id[:16].upper()}\n",
+            "filename": filename,
+            "suggested_commit_message": f"Add {filename} for deployment",
+        }
+
+    def revoke_honeytoken(self, request, honeytoken_id):
+        with self.lock:
+            honeytoken = self.honeytokens.get(honeytoken_id)
+            if honeytoken is None:
+                return error(404, "Not found.")
+            honeytoken["status"] = "REVOKED"
+        return 200, honeytoken
+
+    def list_honeytokens(self, request):
+        per_page = int(request.query.get("per_page", 20))
+        page = int(request.query.get("page", 1))
+        honeytokens = list(self.honeytokens.values())
+        headers = {}
+        if page * per_page < len(honeytokens):
+            headers["Link"] = (
+                f'<{self.base_url}/exposed/v1/honeytokens?per_page={per_page}'
+                f'&page={page + 1}>; rel="next"'
+            )
+        return 200, honeytokens[(page - 1) * per_page : page * per_page], headers
+
+
+class MockServer:
+    """
+    HTTP server running a backend in a background thread, delaying, failing and
+    rate limiting the requests according to the settings
+    """
+
+    def __init__(self, backend: MockBackend, settings: MockSettings, port: int = 0):
+        self.backend = backend
+        self.settings = settings
+        self.random = random.Random(settings.seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.window_start = time.time()
+        self.window_requests = 0
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server.serve(self)
+
+            do_POST = do_PUT = do_DELETE = do_PATCH = do_GET
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        backend.base_url = self.url
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def start(self) -> "MockServer":
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def serve(self, handler: BaseHTTPRequestHandler) -> None:
+        length = int(handler.headers.get("Content-Length") or 0)
+        body = handler.rfile.read(length) if length else b""
+        url = urlparse(handler.path)
+        request = MockRequest(
+            method=handler.command,
+            path=url.path.rstrip("/"),
+            query={key: values[0] for key, values in parse_qs(url.query).items()},
+            body=body,
+            content_type=handler.headers.get("Content-Type", ""),
+        )
+
+        settings = self.settings
+        with self.lock:
+            self.requests += 1
+            delay = settings.latency + self.random.uniform(0, settings.jitter)
+            failed = self.random.random() < settings.failure_rate
+            rate_limit_headers, retry_after = self.count_rate_limit()
+        if delay:
+            time.sleep(delay)
+
+        if retry_after is not None:
+            status, data = error(429, "API rate limit exceeded")
+            headers = {"Retry-After": str(retry_after)}
+        elif failed:
+            status, data = error(503, "Injected failure")
+            headers = {}
+        else:
+            try:
+                status, data, *rest = self.backend.handle(request)
+                headers = rest[0] if rest else {}
+            except (KeyError, ValueError, TypeError) as exception:
+                status, data = error(400, f"Bad request: {exception!r}")
+                headers = {}
+
+        content = json.dumps(data).encode() if data is not None else b""
+        handler.send_response(status)
+        for name, value in {**rate_limit_headers, **headers}.items():
+            handler.send_header(name, value)
+        if content:
+            handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(content)))
+        handler.end_headers()
+        handler.wfile.write(content)
+
+    def count_rate_limit(self) -> tuple[dict, int | None]:
+        """
+        Count a request in the current rate limit window.
+        :return: the rate limit headers, and the Retry-After delay if the limit is exceeded
+        """
+        settings = self.settings
+        if not settings.rate_limit:
+            return {}, None
+        now = time.time()
+        if now >= self.window_start + settings.rate_limit_window:
+            self.window_start, self.window_requests = now, 0
+        self.window_requests += 1
+        reset_at = self.window_start + settings.rate_limit_window
+        remaining = max(settings.rate_limit - self.window_requests, 0)
+        headers = {
+            "X-RateLimit-Limit": str(settings.rate_limit),
+            "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Reset": str(math.ceil(reset_at)),
+        }
+        if self.window_requests > settings.rate_limit:
+            return headers, max(math.ceil(reset_at - now), 1)
+        return headers, None
+
+
+def create_vcs_backend(vcs: str, repositories: int) -> MockVCSBackend:
+    """
+    Backend of a VCS with `repositories` repositories, in the namespace returned by namespace_for_vcs
+    """
+    backend_cls = {
+        "github": GitHubBackend,
+        "gitlab": GitLabBackend,
+        "ado": ADOBackend,
+        "bitbucket": BitBucketBackend,
+    }[vcs]
+    return backend_cls(namespace_for_vcs(vcs), repositories)
+
+
+def namespace_for_vcs(vcs: str) -> str:
+    """
+    Namespace of the mocked repositories, as given to --namespaces
+    """
+    return {"ado": "bench/project", "bitbucket": "BENCH"}.get(vcs, "bench")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run local mocks of a VCS and of GitGuardian for disseminate_honeytokens.py"
+    )
+    parser.add_argument(
+        "--vcs",
+        choices=["github", "gitlab", "ado", "bitbucket"],
+        required=True,
+        help="Version control system to mock",
+    )
+    parser.add_argument(
+        "--repositories", type=int, default=100, help="Number of mocked repositories"
+    )
+    parser.add_argument("--vcs-port", type=int, default=8001, help="Port of the VCS mock")
+    parser.add_argument(
+        "--gitguardian-port", type=int, default=8002, help="Port of the GitGuardian mock"
+    )
+    add_settings_arguments(parser)
+    args = parser.parse_args()
+
+    settings = settings_from_arguments(args)
+    vcs_server = MockServer(
+        create_vcs_backend(args.vcs, args.repositories), settings, args.vcs_port
+    ).start()
+    gitguardian_server = MockServer(
+        GitGuardianBackend(), settings, args.gitguardian_port
+    ).start()
+
+    print(f"export VCS_URL={vcs_server.url} GITGUARDIAN_URL={gitguardian_server.url}")
+    print("export VCS_TOKEN=mock GITGUARDIAN_TOKEN=mock")
+    print(
+        f"python disseminate_honeytokens.py --vcs {args.vcs} "
+        f"--namespaces {namespace_for_vcs(args.vcs)}"
+    )
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        vcs_server.stop()
+        gitguardian_server.stop()
+
+
+def add_settings_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Delay of each response, in seconds"
+    )
+    parser.add_argument(
+        "--jitter",
+        type=float,
+        default=0.0,
+        help="Maximum random delay added to the latency, in seconds",
+    )
+    parser.add_argument(
+        "--failure-rate",
+        type=float,
+        default=0.0,
+        help="Fraction of the requests answered with an HTTP 503",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=int,
+        default=0,
+        help="Number of requests accepted per --rate-limit-window, per server. "
+        "The others are answered with an HTTP 429.",
+    )
+    parser.add_argument(
+        "--rate-limit-window",
+        type=float,
+        default=60.0,
+        help="Duration of a rate limit window, in seconds",
+    )
+    parser.add_argument("--seed", type=int, help="Seed of the injected jitter and failures")
+
+
+def settings_from_arguments(args: argparse.Namespace) -> MockSettings:
+    return MockSettings(
+        latency=args.latency,
+        jitter=args.jitter,
+        failure_rate=args.failure_rate,
+        rate_limit=args.rate_limit,
+        rate_limit_window=args.rate_limit_window,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import sys
+import threading
+import time
+
+import requests
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+# Wait used for a secondary rate limit response that doesn't say how long to wait
+DEFAULT_RATE_LIMIT_WAIT = 60.0
+
+
+class RateLimitScheduler:
+    """
+    Schedule the requests to a host according to its rate limits.
+    A single scheduler is shared by all the clients of the host.
+
+    - Content-creating requests (POST, PUT, PATCH, DELETE) are spaced by at least
+      `write_interval` seconds, as GitHub requires to avoid its secondary rate limits.
+    - When the primary rate limit is exhausted (X-RateLimit-Remaining or
+      RateLimit-Remaining at 0), all the requests wait for its reset.
+    - Requests answered with a rate limit error (429, or 403 with a rate limit
+      message) are retried after Retry-After, the rate limit reset, or a minute.
+    """
+
+    def __init__(self, write_interval: float = 0.0, max_retries: int = 5):
+        self.write_interval = write_interval
+        self.max_retries = max_retries
+        self.lock = threading.Lock()
+        # monotonic times
+        self.blocked_until = 0.0
+        self.next_write_at = 0.0
+
+    def wait(self, method: str) -> None:
+        """
+        Wait until a request can be sent
+        """
+        with self.lock:
+            now = time.monotonic()
+            start_at = max(now, self.blocked_until)
+            if method.upper() in WRITE_METHODS and self.write_interval:
+                start_at = max(start_at, self.next_write_at)
+                self.next_write_at = start_at + self.write_interval
+        if start_at > now:
+            time.sleep(start_at - now)
+
+    def update(self, resp: requests.Response) -> float | None:
+        """
+        Update the limits with the headers of a response.
+        :return: the delay after which the request must be retried,
+        None if the request was not rate limited
+        """
+        headers = resp.headers
+        remaining = headers.get("X-RateLimit-Remaining", headers.get("RateLimit-Remaining"))
+        reset = headers.get("X-RateLimit-Reset", headers.get("RateLimit-Reset"))
+        reset_delay = None
+        if reset and reset.isdigit():
+            reset_delay = max(int(reset) - time.time(), 0.0) + 1
+
+        rate_limited = resp.status_code == 429 or (
+            resp.status_code == 403
+            and (
+                "Retry-After" in headers
+                or remaining == "0"
+                or "rate limit" in resp.text.lower()
+            )
+        )
+
+        delay = None
+        if rate_limited:
+            retry_after = headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                delay = float(retry_after)
+            elif remaining == "0" and reset_delay is not None:
+                delay = reset_delay
+            else:
+                delay = DEFAULT_RATE_LIMIT_WAIT
+            self.block(delay)
+        elif remaining == "0" and reset_delay is not None:
+            self.block(reset_delay)
+
+        return delay
+
+    def block(self, delay: float) -> None:
+        """
+        Hold all the requests to the host for `delay` seconds
+        """
+        with self.lock:
+            blocked_until = time.monotonic() + delay
+            if blocked_until <= self.blocked_until:
+                return
+            self.blocked_until = blocked_until
+        print(f"Rate limit reached, waiting {delay:.0f}s", file=sys.stderr)
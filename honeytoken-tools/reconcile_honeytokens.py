@@ -0,0 +1,369 @@
+import argparse
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from cache import DEFAULT_CACHE_TTL, TTLCache
+from client import DEFAULT_RETRIES, DEFAULT_TIMEOUT, VCSClient, create_session
+from common import (
+    PULL_REQUEST_DECLINED,
+    PULL_REQUEST_MERGED,
+    BitBucketCloudNotSupportedError,
+    CredentialsValidationError,
+    HoneyTokenAccessError,
+    ProgressDisplay,
+    dashboard_to_api_url,
+)
+from disseminate_honeytokens import format_error, parse_gitguardian_url, parse_vcs_url
+from gg_client import GGClient
+from ledger import DONE, MERGED, REVOKED, DisseminationLedger
+from rate_limit import RateLimitScheduler
+
+from utils import get_client_for_vcs, get_repository_client_from_vcs_client
+
+# Action taken for each honeytoken
+KEEP = "keep"
+REVOKE = "revoke"
+
+# Honeytoken statuses returned by GitGuardian
+HONEYTOKEN_REVOKED = "REVOKED"
+HONEYTOKEN_TRIGGERED = "TRIGGERED"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Script to revoke the honeytokens whose pull request was declined, "
+        "or left open for too long, and to delete their branches."
+    )
+
+    parser.add_argument(
+        "--vcs",
+        choices=["github", "gitlab", "ado", "bitbucket"],
+        required=True,
+        help="Version control system",
+    )
+    parser.add_argument(
+        "--vcs-url",
+        help="VCS instance URL. If omitted, the default VCS URL will be used. "
+        "Can be also configured via environment variable VCS_URL.",
+    )
+    parser.add_argument(
+        "--gitguardian-url",
+        help="GitGuardian instance URL. If omitted, https://dashboard.gitguardian.com "
+        "will be used. Can be also configured via environment variable GITGUARDIAN_URL.",
+    )
+    parser.add_argument(
+        "--ledger",
+        required=True,
+        help="SQLite file recorded by disseminate_honeytokens.py --ledger",
+    )
+    parser.add_argument(
+        "--max-age",
+        type=float,
+        help="Number of days after which a pull request that is still open is considered "
+        "abandoned: its honeytoken is revoked and its branch deleted. Open pull requests "
+        "are kept if omitted.",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Report the honeytokens to revoke without revoking them",
+    )
+    parser.add_argument(
+        "--output",
+        choices=["json", "text"],
+        default="text",
+        help="Output format",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=16,
+        help="Number of honeytokens reconciled concurrently",
+    )
+    parser.add_argument(
+        "--gitguardian-concurrency",
+        type=int,
+        default=4,
+        help="Maximum number of concurrent requests to the GitGuardian instance",
+    )
+    parser.add_argument(
+        "--vcs-concurrency",
+        type=int,
+        default=8,
+        help="Maximum number of concurrent requests to the VCS instance",
+    )
+    parser.add_argument(
+        "--vcs-write-interval",
+        type=float,
+        help="Minimum number of seconds between two branch deletions. "
+        "Defaults to 1 for GitHub and to 0 for the other VCS.",
+    )
+    parser.add_argument(
+        "--cache-file",
+        help="JSON file keeping the state of the pull requests between runs",
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=DEFAULT_CACHE_TTL,
+        help="Number of seconds during which the cached pull request states are reused",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=DEFAULT_TIMEOUT,
+        help="Timeout of each request to the VCS and GitGuardian instances, in seconds",
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=DEFAULT_RETRIES,
+        help="Number of retries of idempotent requests failing with a connection "
+        "error or an HTTP 502, 503 or 504 response",
+    )
+
+    args = parser.parse_args()
+
+    try:
+        vcs_url = parse_vcs_url(args.vcs_url, args.vcs)
+    except BitBucketCloudNotSupportedError:
+        parser.error(
+            "BitBucket Cloud is not supported. Use VCS_URL to provide your BitBucket Server instance."
+        )
+
+    vcs_token = os.getenv("VCS_TOKEN")
+    if not vcs_token:
+        parser.error(
+            "VCS token is required. Configure it via environment variable VCS_TOKEN."
+        )
+
+    gitguardian_url = parse_gitguardian_url(args.gitguardian_url)
+    gitguardian_token = os.getenv("GITGUARDIAN_TOKEN")
+    if not gitguardian_token:
+        parser.error(
+            "GitGuardian access token is required. Configure it via environment variable GITGUARDIAN_TOKEN."
+        )
+
+    if not os.path.exists(args.ledger):
+        parser.error(f"Ledger {args.ledger} does not exist.")
+
+    vcs_write_interval = args.vcs_write_interval
+    if vcs_write_interval is None:
+        vcs_write_interval = 1.0 if args.vcs == "github" else 0.0
+
+    ledger = DisseminationLedger(args.ledger, args.vcs, vcs_url)
+    try:
+        vcs_client = get_client_for_vcs(
+            args.vcs,
+            vcs_url,
+            vcs_token,
+            limiter=threading.BoundedSemaphore(args.vcs_concurrency),
+            session=create_session(args.vcs_concurrency, args.retries),
+            timeout=args.timeout,
+            scheduler=RateLimitScheduler(write_interval=vcs_write_interval),
+        )
+        vcs_client.validate_credentials()
+
+        gg_client = GGClient(
+            dashboard_to_api_url(gitguardian_url),
+            gitguardian_token,
+            limiter=threading.BoundedSemaphore(args.gitguardian_concurrency),
+            session=create_session(args.gitguardian_concurrency, args.retries),
+            timeout=args.timeout,
+            scheduler=RateLimitScheduler(),
+        )
+        gg_client.validate_credentials()
+
+        results = reconcile_honeytokens(
+            vcs_client,
+            gg_client,
+            ledger,
+            TTLCache(args.cache_ttl, args.cache_file),
+            max_age=timedelta(days=args.max_age) if args.max_age is not None else None,
+            workers=args.workers,
+            dry_run=args.dry_run,
+        )
+        print_results(results, args.output, args.dry_run)
+
+    except (CredentialsValidationError, HoneyTokenAccessError) as error:
+        parser.error(error.message)
+    finally:
+        ledger.close()
+
+
+def reconcile_honeytokens(
+    vcs_client: VCSClient,
+    gg_client: GGClient,
+    ledger: DisseminationLedger,
+    cache: TTLCache,
+    max_age: timedelta | None = None,
+    workers: int = 1,
+    dry_run: bool = False,
+) -> dict:
+    """
+    Reconcile the honeytokens of the pull requests recorded in the ledger, up to
+    `workers` at a time, with the state of their pull request:
+    - declined pull requests, and open ones created more than `max_age` ago,
+      get their honeytoken revoked and their branch deleted,
+    - merged pull requests and revoked honeytokens are recorded in the ledger,
+      and not checked again by later runs,
+    - triggered honeytokens are kept, as they are being investigated.
+    The states of the pull requests still open are kept in `cache`.
+    """
+    entries = ledger.entries(DONE)
+    honey_token_statuses = {
+        honey_token["id"]: honey_token["status"].upper()
+        for honey_token in gg_client.iter_honey_tokens()
+    }
+    deadline = datetime.now(timezone.utc) - max_age if max_age is not None else None
+    progress = ProgressDisplay("Reconciling honeytokens", len(entries))
+
+    def reconcile(entry: dict) -> dict:
+        result = reconcile_honeytoken(
+            vcs_client,
+            gg_client,
+            ledger,
+            cache,
+            entry,
+            honey_token_statuses.get(entry["honeytoken_id"]),
+            deadline,
+            dry_run,
+        )
+        progress.advance(failed=not result["ok"])
+        return result
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = dict(
+            zip(
+                (entry["repository"] for entry in entries),
+                executor.map(reconcile, entries),
+            )
+        )
+    progress.finish()
+    return results
+
+
+def reconcile_honeytoken(
+    vcs_client: VCSClient,
+    gg_client: GGClient,
+    ledger: DisseminationLedger,
+    cache: TTLCache,
+    entry: dict,
+    honey_token_status: str | None,
+    deadline: datetime | None,
+    dry_run: bool,
+) -> dict:
+    """
+    Reconcile the honeytoken of a ledger entry, see reconcile_honeytokens.
+    :param honey_token_status: status of the honeytoken in GitGuardian, None if it is not listed
+    """
+    pull_request_url = entry["pull_request_url"]
+    result = {
+        "url": pull_request_url,
+        "honeytoken_id": entry["honeytoken_id"],
+        "honeytoken_status": honey_token_status or "",
+        "pull_request_state": "",
+        "action": KEEP,
+        "ok": True,
+        "error": "",
+    }
+
+    if honey_token_status == HONEYTOKEN_REVOKED:
+        if not dry_run:
+            ledger.record_status(entry["repository"], REVOKED)
+        return result
+    if honey_token_status == HONEYTOKEN_TRIGGERED:
+        return result
+
+    try:
+        pull_request = cache.get(
+            f"pull-request:{pull_request_url}",
+            lambda: vcs_client.get_pull_request(pull_request_url),
+        )
+        status = vcs_client.pull_request_status(pull_request)
+    except Exception as error:
+        result["ok"] = False
+        result["error"] = f"Failed to get the pull request: {format_error(error)}"
+        return result
+
+    result["pull_request_state"] = status.state
+    if status.state == PULL_REQUEST_MERGED:
+        if not dry_run:
+            ledger.record_status(entry["repository"], MERGED)
+        return result
+    if status.state != PULL_REQUEST_DECLINED and (
+        deadline is None or status.created_at > deadline
+    ):
+        return result
+
+    result["action"] = REVOKE
+    if dry_run:
+        return result
+
+    # the extra honeytokens of the pull request share the state of the first one
+    not_revoked = []
+    for honey_token in [entry, *entry["extra_honeytokens"]]:
+        try:
+            revoked = gg_client.revoke_honey_token(honey_token["honeytoken_id"])
+        except Exception:
+            revoked = False
+        if not revoked:
+            not_revoked.append(honey_token["honeytoken_id"])
+    if not_revoked:
+        result["ok"] = False
+        result["error"] = f"Failed to revoke honeytoken {', '.join(not_revoked)}."
+        return result
+    ledger.record_status(entry["repository"], REVOKED)
+    result["honeytoken_status"] = HONEYTOKEN_REVOKED
+
+    try:
+        repo_client = get_repository_client_from_vcs_client(
+            vcs_client, status.repository
+        )
+        repo_client.delete_branch(status.branch)
+    except Exception as error:
+        result["ok"] = False
+        result["error"] = (
+            f"Honeytoken revoked but failed to delete branch {status.branch}: "
+            + format_error(error)
+        )
+    return result
+
+
+def print_results(results: dict, output: str, dry_run: bool = False):
+    if output == "json":
+        print(json.dumps(results, indent=2))
+        return
+
+    revoked = [
+        repo
+        for repo, result in results.items()
+        if result["action"] == REVOKE and result["ok"]
+    ]
+    failed = [repo for repo, result in results.items() if not result["ok"]]
+
+    if revoked:
+        print("Honeytokens to revoke:" if dry_run else "Honeytokens revoked:")
+        for repo in revoked:
+            result = results[repo]
+            print(f"{repo}: {result['url']} ({result['pull_request_state']})")
+
+    if failed:
+        print("Could not reconcile:")
+        for repo in failed:
+            print(f"{repo}: {results[repo]['error']}")
+
+    print(
+        f"Reconciled {len(results)} honeytokens: {len(revoked)} "
+        + ("to revoke" if dry_run else "revoked")
+        + f", {len(failed)} failed, {len(results) - len(revoked) - len(failed)} kept",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
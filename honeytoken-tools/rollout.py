@@ -0,0 +1,187 @@
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+
+from ado import ADORepositoryInfo
+from bitbucket import BitBucketRepositoryInfo
+from common import RepositoryInfo
+from metrics import RequestStats
+
+# Number of recent requests to the VCS whose median latency measures its load
+LATENCY_WINDOW = 50
+# The pace is never slowed down more than this
+MAX_SLOWDOWN = 10.0
+
+
+def organization_of(repo: RepositoryInfo) -> str:
+    """
+    GitHub organization, Gitlab top-level group, Azure DevOps organization or
+    BitBucket project of a repository
+    """
+    if isinstance(repo, ADORepositoryInfo):
+        return repo.organization
+    if isinstance(repo, BitBucketRepositoryInfo):
+        return repo.project
+    return repo.name.split("/")[0]
+
+
+class RolloutScheduler:
+    """
+    Spread the pull requests of a rollout over time, so that the CI pipelines they
+    trigger don't all start at once.
+
+    - Repositories are started in waves of `wave_size`: a wave starts once all the
+      repositories of the previous one are done, and `wave_interval` seconds later.
+      The rollout stops after `max_waves` waves, the next run resumes it from the ledger.
+    - At most `pull_requests_per_minute` repositories are started per minute, and
+      `org_pull_requests_per_minute` per organization. The next repositories are
+      looked ahead so that a busy organization doesn't hold the others.
+    - When the median latency of the recent requests to `vcs_host` reaches
+      `latency_threshold` times the lowest one observed, the pace and the wave
+      interval are slowed down in proportion.
+
+    Repositories for which `needs_pull_request` is False, e.g. already done in the
+    ledger, are not paced and don't count in the waves.
+    """
+
+    def __init__(
+        self,
+        wave_size: int | None = None,
+        wave_interval: float = 0.0,
+        max_waves: int | None = None,
+        pull_requests_per_minute: float | None = None,
+        org_pull_requests_per_minute: float | None = None,
+        request_stats: RequestStats | None = None,
+        vcs_host: str | None = None,
+        latency_threshold: float = 2.0,
+        needs_pull_request: Callable[[RepositoryInfo], bool] | None = None,
+        lookahead: int = 100,
+    ):
+        self.wave_size = wave_size
+        self.wave_interval = wave_interval
+        self.max_waves = max_waves
+        self.pull_requests_per_minute = pull_requests_per_minute
+        self.org_pull_requests_per_minute = org_pull_requests_per_minute
+        self.request_stats = request_stats
+        self.vcs_host = vcs_host
+        self.latency_threshold = latency_threshold
+        self.needs_pull_request = needs_pull_request
+        self.lookahead = lookahead
+
+        self.condition = threading.Condition()
+        self.in_flight: set[str] = set()
+        self.waves = 0
+        # monotonic times
+        self.next_start_at = 0.0
+        self.next_org_start_at: dict[str, float] = {}
+        self.baseline_latency: float | None = None
+        self.slowdown = 1.0
+
+    def scheduled(self, repos: Iterable[RepositoryInfo]) -> Iterator[RepositoryInfo]:
+        """
+        Yield the repositories when they can be started.
+        done must be called once each repository is processed.
+        """
+        repos = iter(repos)
+        buffer: list[RepositoryInfo] = []
+        wave_started = 0
+        exhausted = False
+        while True:
+            while not exhausted and len(buffer) < self.lookahead:
+                repo = next(repos, None)
+                if repo is None:
+                    exhausted = True
+                elif self.needs_pull_request is None or self.needs_pull_request(repo):
+                    buffer.append(repo)
+                else:
+                    yield repo
+            if not buffer:
+                return
+
+            if self.waves == 0 or (self.wave_size and wave_started >= self.wave_size):
+                if self.waves == self.max_waves:
+                    print(
+                        f"Stopped after {self.waves} waves, run the same command again "
+                        "with the same ledger to resume the rollout",
+                        file=sys.stderr,
+                    )
+                    return
+                self._start_wave()
+                wave_started = 0
+
+            repo = self._next_repository(buffer)
+            wave_started += 1
+            with self.condition:
+                self.in_flight.add(repo.full_name)
+            yield repo
+
+    def done(self, repository: str) -> None:
+        """
+        Record that a repository is processed
+        :param repository: full name of the repository
+        """
+        with self.condition:
+            self.in_flight.discard(repository)
+            self.condition.notify_all()
+
+    def _start_wave(self) -> None:
+        if self.waves > 0:
+            with self.condition:
+                self.condition.wait_for(lambda: not self.in_flight)
+            time.sleep(self.wave_interval * self._update_slowdown())
+        self.waves += 1
+        if self.wave_size:
+            print(f"Starting wave {self.waves}", file=sys.stderr)
+
+    def _next_repository(self, buffer: list[RepositoryInfo]) -> RepositoryInfo:
+        """
+        Take the first repository of `buffer` that can be started the soonest,
+        and wait until it can be
+        """
+
+        def ready_at(repo: RepositoryInfo) -> float:
+            return max(
+                self.next_start_at,
+                self.next_org_start_at.get(organization_of(repo), 0.0),
+            )
+
+        repo = buffer.pop(min(range(len(buffer)), key=lambda index: ready_at(buffer[index])))
+        now = time.monotonic()
+        start_at = max(now, ready_at(repo))
+        if start_at > now:
+            time.sleep(start_at - now)
+
+        slowdown = self._update_slowdown()
+        if self.pull_requests_per_minute:
+            self.next_start_at = start_at + 60 / self.pull_requests_per_minute * slowdown
+        if self.org_pull_requests_per_minute:
+            self.next_org_start_at[organization_of(repo)] = (
+                start_at + 60 / self.org_pull_requests_per_minute * slowdown
+            )
+        return repo
+
+    def _update_slowdown(self) -> float:
+        """
+        Compare the recent latency of the VCS with the lowest one observed
+        :return: the factor by which the pace is slowed down
+        """
+        if self.request_stats is None or self.vcs_host is None:
+            return self.slowdown
+        latency = self.request_stats.recent_latency(self.vcs_host, LATENCY_WINDOW)
+        if not latency:
+            return self.slowdown
+        if self.baseline_latency is None or latency < self.baseline_latency:
+            self.baseline_latency = latency
+
+        ratio = latency / self.baseline_latency
+        slowdown = min(ratio, MAX_SLOWDOWN) if ratio >= self.latency_threshold else 1.0
+        if slowdown > 1.0 and self.slowdown == 1.0:
+            print(
+                f"The VCS latency rose to {latency:.2f}s, slowing down the rollout",
+                file=sys.stderr,
+            )
+        elif slowdown == 1.0 and self.slowdown > 1.0:
+            print("The VCS latency is back to normal, resuming the pace", file=sys.stderr)
+        self.slowdown = slowdown
+        return slowdown
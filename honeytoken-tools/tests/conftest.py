@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the modules of honeytoken-tools are imported by their flat name, as in the scripts
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
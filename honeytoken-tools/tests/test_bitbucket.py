@@ -0,0 +1,64 @@
+"""
+BitBucket Server repository client against mock_servers.py
+"""
+
+from common import PullRequestFile, PullRequestInfo
+from mock_servers import BitBucketBackend, MockServer, MockSettings
+from utils import get_client_for_vcs, get_repository_client_from_vcs_client
+
+
+def test_resume_after_partial_commit():
+    """
+    Each file is a commit on BitBucket Server: a run interrupted after the first
+    file must not fail on it when resuming
+    """
+    backend = BitBucketBackend("BENCH", 3)
+    server = MockServer(backend, MockSettings()).start()
+    try:
+        vcs_client = get_client_for_vcs("bitbucket", server.url, "token")
+        repo_client = get_repository_client_from_vcs_client(
+            vcs_client, vcs_client.get_repository_info("BENCH/repo-00001")
+        )
+        pr_info = PullRequestInfo(
+            content="aws_access_key_id = AKIA1\n",
+            commit_message="Add configuration",
+            branch="honeytoken-resume",
+            filename="config.env",
+            extra_files=[PullRequestFile("settings.py", "aws_access_key_id = AKIA2\n")],
+        )
+        repo_client.create_new_branch(pr_info.branch, "main")
+        first_file = PullRequestInfo(
+            content=pr_info.content,
+            commit_message=pr_info.commit_message,
+            branch=pr_info.branch,
+            filename=pr_info.filename,
+        )
+        repo_client.create_new_commit(first_file, repo_client.repo_info)
+
+        url = repo_client.disseminate_in_pull_request(pr_info, completed_steps=["branch"])
+
+        assert "/projects/BENCH/repos/repo-00001/pull-requests/" in url
+        assert backend.files[("repo-00001", "honeytoken-resume")] == {
+            "config.env": "aws_access_key_id = AKIA1\n",
+            "settings.py": "aws_access_key_id = AKIA2\n",
+        }
+    finally:
+        server.stop()
+
+
+def test_default_branch_without_lookups():
+    """
+    With a default branch given to the client, the repositories are resolved from
+    the listing of their project only
+    """
+    server = MockServer(BitBucketBackend("BENCH", 3), MockSettings()).start()
+    try:
+        vcs_client = get_client_for_vcs(
+            "bitbucket", server.url, "token", default_branch="main"
+        )
+        repos = list(vcs_client.iter_repositories("BENCH"))
+
+        assert [repo.default_branch for repo in repos] == ["refs/heads/main"] * 3
+        assert server.requests == 1
+    finally:
+        server.stop()
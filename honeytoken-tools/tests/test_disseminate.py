@@ -0,0 +1,72 @@
+"""
+disseminate_in_repository against mock_servers.py
+"""
+
+import pytest
+import requests
+from common import RepositoryInfo
+from disseminate_honeytokens import disseminate_in_repository
+from gg_client import GGClient
+from mock_servers import GitGuardianBackend, GitLabBackend, MockServer, MockSettings
+from utils import get_client_for_vcs
+
+
+class FailingGGClient(GGClient):
+    """
+    GitGuardian client whose revocations time out, and whose creations fail
+    after `creations` honeytokens
+    """
+
+    def __init__(self, *args, creations: int | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.creations = creations
+
+    def create_honey_token_with_context(self, repo_info: RepositoryInfo) -> dict:
+        if self.creations == 0:
+            raise requests.ConnectionError("Connection reset")
+        if self.creations is not None:
+            self.creations -= 1
+        return super().create_honey_token_with_context(repo_info)
+
+    def revoke_honey_token(self, honey_token_id: str) -> bool:
+        raise requests.Timeout("Read timed out")
+
+
+@pytest.fixture
+def servers():
+    vcs = MockServer(GitLabBackend("bench", 3), MockSettings()).start()
+    gitguardian = MockServer(GitGuardianBackend(), MockSettings()).start()
+    yield vcs, gitguardian
+    vcs.stop()
+    gitguardian.stop()
+
+
+def test_revoke_error_after_failed_pull_request(servers):
+    vcs, gitguardian = servers
+    vcs_client = get_client_for_vcs("gitlab", vcs.url, "token")
+    missing_repo = RepositoryInfo(
+        id=404, name="bench/missing", default_branch="main", main_language=None
+    )
+
+    result = disseminate_in_repository(
+        vcs_client, FailingGGClient(gitguardian.url, "token"), missing_repo
+    )
+
+    assert not result["ok"]
+    assert result["error"].endswith("was created and not revoked.")
+
+
+def test_revoke_error_after_failed_creation(servers):
+    vcs, gitguardian = servers
+    vcs_client = get_client_for_vcs("gitlab", vcs.url, "token")
+
+    result = disseminate_in_repository(
+        vcs_client,
+        FailingGGClient(gitguardian.url, "token", creations=1),
+        vcs_client.get_repository_info("bench/repo-00001"),
+        honeytokens_per_repository=2,
+    )
+
+    assert not result["ok"]
+    assert result["error"].startswith("Failed to create a honeytoken: ConnectionError")
+    assert result["error"].endswith("was created and not revoked.")
@@ -0,0 +1,24 @@
+"""
+Gitlab client against mock_servers.py
+"""
+
+import pytest
+from common import RepositoryAccessError
+from mock_servers import GitLabBackend, MockServer, MockSettings
+from utils import get_client_for_vcs
+
+
+@pytest.fixture
+def gitlab_client():
+    server = MockServer(GitLabBackend("bench", 3), MockSettings()).start()
+    yield get_client_for_vcs("gitlab", server.url, "token")
+    server.stop()
+
+
+def test_get_repositories_info_by_id_and_path(gitlab_client):
+    results = gitlab_client.get_repositories_info(["2", "bench/repo-00002", "404"])
+
+    assert results["2"].name == "bench/repo-00001"
+    assert results["2"].id == 2
+    assert results["bench/repo-00002"].name == "bench/repo-00002"
+    assert isinstance(results["404"], RepositoryAccessError)
@@ -0,0 +1,69 @@
+"""
+Resuming disseminations interrupted between their steps, against mock_servers.py
+"""
+
+import pytest
+from common import PullRequestInfo
+from mock_servers import GitLabBackend, MockServer, MockSettings
+from utils import get_client_for_vcs, get_repository_client_from_vcs_client
+
+REPOSITORY = "bench/repo-00001"
+
+
+@pytest.fixture
+def gitlab():
+    backend = GitLabBackend("bench", 3)
+    server = MockServer(backend, MockSettings()).start()
+    yield backend, get_client_for_vcs("gitlab", server.url, "token")
+    server.stop()
+
+
+def pull_request_info(branch: str) -> PullRequestInfo:
+    return PullRequestInfo(
+        content="honeytoken",
+        commit_message="Add configuration",
+        branch=branch,
+        filename="config.env",
+    )
+
+
+def test_gitlab_resume_after_commit(gitlab):
+    """
+    The commit creates the branch on Gitlab: a run interrupted once the commit is
+    done, but before it was recorded, must not commit again nor delete the branch
+    """
+    backend, vcs_client = gitlab
+    repo_client = get_repository_client_from_vcs_client(
+        vcs_client, vcs_client.get_repository_info(REPOSITORY)
+    )
+    pr_info = pull_request_info("honeytoken-resume")
+    repo_client.create_new_commit(pr_info, repo_client.repo_info)
+
+    steps = []
+    url = repo_client.disseminate_in_pull_request(
+        pr_info, completed_steps=["branch"], on_step=steps.append
+    )
+
+    assert "/bench/repo-00001/-/merge_requests/" in url
+    assert len(backend.pull_requests) == 1
+    assert steps == ["commit"]
+    assert "honeytoken-resume" in backend.repository("repo-00001")["branches"]
+
+
+def test_gitlab_resume_before_commit(gitlab):
+    backend, vcs_client = gitlab
+    repo_client = get_repository_client_from_vcs_client(
+        vcs_client, vcs_client.get_repository_info(REPOSITORY)
+    )
+    steps = []
+    url = repo_client.disseminate_in_pull_request(
+        pull_request_info("honeytoken-resume"),
+        completed_steps=["branch"],
+        on_step=steps.append,
+    )
+
+    assert "/bench/repo-00001/-/merge_requests/" in url
+    assert len(backend.pull_requests) == 1
+    assert steps == ["commit"]
+    assert "honeytoken-resume" in backend.repository("repo-00001")["branches"]
+
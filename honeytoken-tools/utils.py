@@ -8,16 +8,16 @@ from github import GitHubClient, GitHubRepoClient
 from gitlab import GitLabClient, GitLabRepoClient
 
 
-def get_client_for_vcs(vcs: str, url: str, token: str):
+def get_client_for_vcs(vcs: str, url: str, token: str, **kwargs):
     if vcs == "github":
-        return GitHubClient(url, token)
+        return GitHubClient(url, token, **kwargs)
     elif vcs == "gitlab":
-        return GitLabClient(url, token)
+        return GitLabClient(url, token, **kwargs)
     elif vcs == "ado":
         token = b64encode(f":{token}".encode()).decode()
-        return ADOClient(url, token)
+        return ADOClient(url, token, **kwargs)
     elif vcs == "bitbucket":
-        return BitBucketClient(url, token)
+        return BitBucketClient(url, token, **kwargs)
     else:
         raise NotImplementedError(f"Unsupported VCS: {vcs}")
 
@@ -37,5 +37,8 @@ def get_repository_client_from_vcs_client(
         raise NotImplementedError(f"Unsupported VCS: {type(vcs_client)}")
 
     return repo_client_cls(
-        repo_info, vcs_client.instance_url, vcs_client.instance_token
+        repo_info,
+        vcs_client.instance_url,
+        vcs_client.instance_token,
+        **vcs_client.connection_kwargs(),
     )
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Load benchmark for sync_risk_to_severity.py
+
+Starts the fake incidents API from mock_api.py in a separate process, runs
+process_incidents against it in dry-run and live mode, and reports the
+throughput and the peak memory of the sync.
+
+Usage:
+    python3 benchmark.py                                  # 10k, 100k and 500k incidents
+    python3 benchmark.py --sizes 10000 50000 --modes live --latency 0.005
+"""
+
+import argparse
+import contextlib
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Dict, List
+
+import sync_risk_to_severity as sync
+
+MOCK_API = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mock_api.py")
+
+
+@contextlib.contextmanager
+def fake_api(incidents: int, args: argparse.Namespace):
+    """Run the fake API in a subprocess and yield its base URL."""
+    command = [
+        sys.executable, MOCK_API,
+        "--port", "0",
+        "--incidents", str(incidents),
+        "--latency", str(args.latency),
+        "--error-rate", str(args.error_rate),
+    ]
+    if args.rate_limit:
+        command += ["--rate-limit", str(args.rate_limit)]
+
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    try:
+        # First line: "Fake incidents API with N incidents listening on http://host:port"
+        url = process.stdout.readline().strip().rsplit(" ", 1)[-1]
+        yield url
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def run_once(incidents: int, dry_run: bool, args: argparse.Namespace) -> Dict:
+    """Run one sync against a fresh fake API and measure it."""
+    with fake_api(incidents, args) as url:
+        sync.API_BASE_URL = url
+        sync.API_KEY = "benchmark"
+        sync.DRY_RUN = dry_run
+        sync.UPDATE_DELAY = args.update_delay
+
+        metrics = sync.RunMetrics()
+        tracemalloc.start()
+        start = time.perf_counter()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            stats = sync.process_incidents(force_update=args.force, metrics=metrics)
+        elapsed = time.perf_counter() - start
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        metrics.finish()
+
+    return {
+        "incidents": incidents,
+        "mode": "dry-run" if dry_run else "live",
+        "seconds": elapsed,
+        "throughput": stats["total_processed"] / elapsed if elapsed else 0.0,
+        "updated": stats["updated"],
+        "errors": stats["errors"],
+        "peak_memory_mb": peak_memory / 1024 / 1024,
+        "fetch_p50": sync.percentile(metrics.fetch_latencies, 50),
+        "update_p50": sync.percentile(metrics.update_latencies, 50),
+        "rate_limited": metrics.rate_limited,
+    }
+
+
+def print_results(results: List[Dict]):
+    """Print the benchmark results as a table."""
+    header = (f"{'Incidents':>10} {'Mode':>8} {'Seconds':>9} {'Incidents/s':>12} "
+              f"{'Updated':>8} {'Errors':>7} {'429s':>6} {'Fetch p50':>10} "
+              f"{'Update p50':>11} {'Peak MB':>8}")
+    print("=" * len(header))
+    print(header)
+    print("=" * len(header))
+    for result in results:
+        print(f"{result['incidents']:>10} {result['mode']:>8} {result['seconds']:>9.2f} "
+              f"{result['throughput']:>12.1f} {result['updated']:>8} {result['errors']:>7} "
+              f"{result['rate_limited']:>6} {result['fetch_p50'] * 1000:>8.1f}ms "
+              f"{result['update_p50'] * 1000:>9.1f}ms {result['peak_memory_mb']:>8.2f}")
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark sync_risk_to_severity.py against a fake API")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 500_000],
+                        help="Numbers of synthetic incidents to benchmark")
+    parser.add_argument("--modes", nargs="+", choices=["dry-run", "live"],
+                        default=["dry-run", "live"], help="Modes to benchmark")
+    parser.add_argument("--force", action="store_true",
+                        help="Benchmark --force updates instead of 'unknown' severities only")
+    parser.add_argument("--update-delay", type=float, default=0.0,
+                        help="Pause between updates in live mode (the script defaults to 0.1s)")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Added latency per request on the fake API, in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Fraction of requests failing with HTTP 500 on the fake API")
+    parser.add_argument("--rate-limit", type=float, default=None,
+                        help="Requests per second allowed by the fake API before HTTP 429")
+    return parser.parse_args()
+
+
+def main():
+    """Main entry point."""
+    args = parse_args()
+    results = []
+    for incidents in args.sizes:
+        for mode in args.modes:
+            print(f"Running {mode} sync over {incidents} incidents...", flush=True)
+            results.append(run_once(incidents, mode == "dry-run", args))
+    print_results(results)
+
+
+if __name__ == "__main__":
+    main()
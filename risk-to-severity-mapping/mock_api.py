@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Fake GitGuardian incidents API
+
+A self-contained stand-in for the endpoints used by sync_risk_to_severity.py:
+
+- GET   /v1/incidents/secrets          (cursor pagination with Link headers)
+- GET   /v1/incidents/secrets/{id}
+- PATCH /v1/incidents/secrets/{id}
+
+Incidents are synthesized on the fly from their id, so millions of them cost
+no memory until they are updated. Latency, error rate and rate limiting are
+configurable to reproduce production conditions locally.
+
+Usage:
+    python3 mock_api.py --incidents 100000 --port 8000 --latency 0.02 --rate-limit 50
+    GITGUARDIAN_API_URL=http://127.0.0.1:8000 GITGUARDIAN_API_KEY=test python3 sync_risk_to_severity.py
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlencode, urlparse
+
+SEVERITIES = ["critical", "high", "medium", "low", "info", "unknown"]
+DETECTORS = ["aws_iam", "github_token", "slack_bot_token", "generic_password", "stripe_key"]
+MAX_PER_PAGE = 100
+INCIDENT_PATH = re.compile(r"^/v1/incidents/secrets/(\d+)$")
+
+
+class TokenBucket:
+    """Simple token bucket allowing `rate` requests per second."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class FakeIncidentStore:
+    """Synthetic incidents 1..count, with in-memory severity overrides."""
+
+    def __init__(self, count: int, seed: int = 0):
+        self.count = count
+        self.seed = seed
+        self.severity_overrides: Dict[int, str] = {}
+        self.patch_count = 0
+        self.lock = threading.Lock()
+
+    def get(self, incident_id: int) -> Optional[Dict]:
+        if not 1 <= incident_id <= self.count:
+            return None
+
+        rng = random.Random(self.seed * 1_000_003 + incident_id)
+        risk_score = None if rng.random() < 0.05 else rng.randint(0, 100)
+        severity = "unknown" if rng.random() < 0.4 else rng.choice(SEVERITIES[:-1])
+        with self.lock:
+            severity = self.severity_overrides.get(incident_id, severity)
+
+        detected_at = 1_700_000_000 + incident_id * 37
+        return {
+            "id": incident_id,
+            "date": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(detected_at)),
+            "detector": {"name": rng.choice(DETECTORS)},
+            "secret_revoked": False,
+            "severity": severity,
+            "status": "TRIGGERED",
+            "risk_score": risk_score,
+        }
+
+    def update_severity(self, incident_id: int, severity: str):
+        with self.lock:
+            self.severity_overrides[incident_id] = severity
+            self.patch_count += 1
+
+
+class FakeAPIHandler(BaseHTTPRequestHandler):
+    server: "FakeAPIServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_json(self, status: int, payload, headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def check_request(self) -> bool:
+        """Apply auth, rate limiting, latency and error injection. Return False if answered."""
+        if not self.headers.get("Authorization", "").startswith("Token "):
+            self.send_json(401, {"detail": "Invalid API key."})
+            return False
+
+        if self.server.rate_limiter and not self.server.rate_limiter.try_acquire():
+            self.server.rate_limited += 1
+            self.send_json(429, {"detail": "Rate limit exceeded."},
+                           {"Retry-After": str(self.server.retry_after)})
+            return False
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        if self.server.error_rate and random.random() < self.server.error_rate:
+            self.send_json(500, {"detail": "Injected server error."})
+            return False
+
+        return True
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        match = INCIDENT_PATH.match(parsed.path)
+        if parsed.path != "/v1/incidents/secrets" and not match:
+            self.send_json(404, {"detail": "Not found."})
+            return
+        if not self.check_request():
+            return
+
+        if match:
+            incident = self.server.store.get(int(match.group(1)))
+            if incident is None:
+                self.send_json(404, {"detail": "Not found."})
+            else:
+                self.send_json(200, incident)
+            return
+
+        query = parse_qs(parsed.query)
+        per_page = min(int(query.get("per_page", [MAX_PER_PAGE])[0]), MAX_PER_PAGE)
+        offset = int(query.get("cursor", ["0"])[0])
+
+        store = self.server.store
+        last_id = min(offset + per_page, store.count)
+        incidents = [store.get(incident_id) for incident_id in range(offset + 1, last_id + 1)]
+
+        headers = {}
+        if last_id < store.count:
+            next_query = {key: values[0] for key, values in query.items()}
+            next_query.update({"cursor": str(last_id), "per_page": str(per_page)})
+            host = self.headers.get("Host", "127.0.0.1")
+            next_url = f"http://{host}/v1/incidents/secrets?{urlencode(next_query)}"
+            headers["Link"] = f'<{next_url}>; rel="next"'
+
+        self.send_json(200, incidents, headers)
+
+    def do_PATCH(self):
+        match = INCIDENT_PATH.match(urlparse(self.path).path)
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+
+        if not match:
+            self.send_json(404, {"detail": "Not found."})
+            return
+        if not self.check_request():
+            return
+
+        incident_id = int(match.group(1))
+        severity = payload.get("severity")
+        if severity not in SEVERITIES:
+            self.send_json(400, {"severity": [f'"{severity}" is not a valid choice.']})
+            return
+
+        incident = self.server.store.get(incident_id)
+        if incident is None:
+            self.send_json(404, {"detail": "Not found."})
+            return
+
+        self.server.store.update_severity(incident_id, severity)
+        incident["severity"] = severity
+        self.send_json(200, incident)
+
+
+class FakeAPIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, store: FakeIncidentStore, latency: float = 0.0,
+                 error_rate: float = 0.0, rate_limit: Optional[float] = None,
+                 retry_after: int = 1, verbose: bool = False):
+        super().__init__(address, FakeAPIHandler)
+        self.store = store
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limiter = TokenBucket(rate_limit) if rate_limit else None
+        self.retry_after = retry_after
+        self.rate_limited = 0
+        self.verbose = verbose
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Fake GitGuardian incidents API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--incidents", type=int, default=10_000,
+                        help="Number of synthetic open incidents")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Seed used to synthesize incidents")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Added latency per request, in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Fraction of requests answered with HTTP 500 (0-1)")
+    parser.add_argument("--rate-limit", type=float, default=None,
+                        help="Maximum requests per second before answering HTTP 429")
+    parser.add_argument("--retry-after", type=int, default=1,
+                        help="Retry-After value sent with HTTP 429 responses, in seconds")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    return parser.parse_args()
+
+
+def main():
+    """Main entry point."""
+    args = parse_args()
+    store = FakeIncidentStore(args.incidents, seed=args.seed)
+    server = FakeAPIServer(
+        (args.host, args.port),
+        store,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        retry_after=args.retry_after,
+        verbose=args.verbose,
+    )
+    print(f"Fake incidents API with {args.incidents} incidents listening on {server.url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"\nPATCH requests: {store.patch_count} | 429 responses: {server.rate_limited}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Columnar snapshot of incidents for offline risk score analysis
+
+A snapshot stores, for every incident, its id, risk score, severity, detector
+and dates in compact typed arrays, so hundreds of thousands of incidents fit in
+a few megabytes. Threshold simulations then run on a (risk score, severity)
+count table and never call the API.
+
+File format: a gzip stream holding a JSON header line, followed by the raw
+bytes of each column in the order listed in the header.
+"""
+
+import gzip
+import json
+import sys
+from array import array
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional
+
+SNAPSHOT_VERSION = 1
+SEVERITIES = ["critical", "high", "medium", "low", "info", "unknown"]
+NO_RISK_SCORE = -1
+MAX_RISK_SCORE = 100
+
+# Column name -> array typecode
+COLUMNS = {
+    "id": "q",
+    "risk_score": "b",  # -1 when the incident has no risk score
+    "severity": "B",  # index in SEVERITIES
+    "detector": "H",  # index in the detector table of the snapshot
+    "date": "q",  # detection date, Unix seconds (0 if missing)
+    "last_occurrence_date": "q",  # Unix seconds (0 if missing)
+}
+
+
+def parse_timestamp(value: Optional[str]) -> int:
+    """Convert an API date to Unix seconds, 0 if missing or invalid."""
+    if not value:
+        return 0
+    try:
+        return int(datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp())
+    except ValueError:
+        return 0
+
+
+class IncidentSnapshot:
+    """Typed arrays holding one entry per incident."""
+
+    def __init__(self):
+        self.columns: Dict[str, array] = {name: array(code) for name, code in COLUMNS.items()}
+        self.detectors: List[str] = []
+        self.detector_index: Dict[str, int] = {}
+        self.created_at = datetime.now(timezone.utc).isoformat()
+
+    def __len__(self) -> int:
+        return len(self.columns["id"])
+
+    def add(self, incident: Dict):
+        """Append an incident, as returned by the API."""
+        risk_score = incident.get("risk_score")
+        severity = incident.get("severity") or "unknown"
+        detector = (incident.get("detector") or {}).get("name") or "unknown"
+
+        if detector not in self.detector_index:
+            self.detector_index[detector] = len(self.detectors)
+            self.detectors.append(detector)
+
+        self.columns["id"].append(incident["id"])
+        self.columns["risk_score"].append(NO_RISK_SCORE if risk_score is None else int(risk_score))
+        self.columns["severity"].append(
+            SEVERITIES.index(severity) if severity in SEVERITIES else SEVERITIES.index("unknown")
+        )
+        self.columns["detector"].append(self.detector_index[detector])
+        self.columns["date"].append(parse_timestamp(incident.get("date")))
+        self.columns["last_occurrence_date"].append(parse_timestamp(incident.get("last_occurrence_date")))
+
+    @classmethod
+    def from_incidents(cls, incidents: Iterable[Dict]) -> "IncidentSnapshot":
+        """Build a snapshot from a stream of incidents."""
+        snapshot = cls()
+        for incident in incidents:
+            snapshot.add(incident)
+        return snapshot
+
+    def save(self, path: str):
+        header = {
+            "version": SNAPSHOT_VERSION,
+            "created_at": self.created_at,
+            "count": len(self),
+            "byteorder": sys.byteorder,
+            "columns": COLUMNS,
+            "severities": SEVERITIES,
+            "detectors": self.detectors,
+        }
+        with gzip.open(path, "wb") as f:
+            f.write(json.dumps(header).encode() + b"\n")
+            for name in COLUMNS:
+                f.write(self.columns[name].tobytes())
+
+    @classmethod
+    def load(cls, path: str) -> "IncidentSnapshot":
+        snapshot = cls()
+        with gzip.open(path, "rb") as f:
+            header = json.loads(f.readline())
+            if header.get("version") != SNAPSHOT_VERSION:
+                raise ValueError(f"Unsupported snapshot version: {header.get('version')}")
+
+            for name, code in header["columns"].items():
+                column = array(code)
+                column.frombytes(f.read(header["count"] * column.itemsize))
+                if header["byteorder"] != sys.byteorder:
+                    column.byteswap()
+                snapshot.columns[name] = column
+
+        snapshot.created_at = header["created_at"]
+        snapshot.detectors = header["detectors"]
+        snapshot.detector_index = {name: index for index, name in enumerate(snapshot.detectors)}
+        return snapshot
+
+    def score_severity_counts(self) -> List[List[int]]:
+        """
+        Count incidents by (risk score, current severity).
+
+        Returns:
+            Table indexed by [risk score + 1][severity index]; row 0 holds the
+            incidents without a risk score
+        """
+        counts = [[0] * len(SEVERITIES) for _ in range(MAX_RISK_SCORE + 2)]
+        for risk_score, severity in zip(self.columns["risk_score"], self.columns["severity"]):
+            counts[risk_score + 1][severity] += 1
+        return counts
+
+
+def risk_score_histogram(counts: List[List[int]]) -> Dict[str, Dict[str, int]]:
+    """Group the (risk score, severity) table by ranges of ten risk scores (90-100 last)."""
+    histogram: Dict[str, Dict[str, int]] = {}
+    for row_index, row in enumerate(counts):
+        if row_index == 0:
+            bucket = "none"
+        else:
+            low = min((row_index - 1) // 10 * 10, 90)
+            bucket = f"{low}-{MAX_RISK_SCORE if low == 90 else low + 9}"
+        per_severity = histogram.setdefault(bucket, {severity: 0 for severity in SEVERITIES})
+        for severity_index, count in enumerate(row):
+            per_severity[SEVERITIES[severity_index]] += count
+    return histogram
+
+
+def detector_histogram(snapshot: IncidentSnapshot) -> Dict[str, Dict[str, float]]:
+    """Number of incidents and average risk score by detector."""
+    totals = [[0, 0, 0] for _ in snapshot.detectors]
+    for detector, risk_score in zip(snapshot.columns["detector"], snapshot.columns["risk_score"]):
+        totals[detector][0] += 1
+        if risk_score != NO_RISK_SCORE:
+            totals[detector][1] += 1
+            totals[detector][2] += risk_score
+
+    return {
+        snapshot.detectors[index]: {
+            "incidents": count,
+            "average_risk_score": round(score_sum / scored, 1) if scored else None,
+        }
+        for index, (count, scored, score_sum) in sorted(
+            enumerate(totals), key=lambda item: item[1][0], reverse=True
+        )
+    }
+
+
+def simulate_mapping(counts: List[List[int]], to_severity: Callable[[int], str]) -> Dict:
+    """
+    Simulate a threshold table over the (risk score, severity) table.
+
+    Args:
+        counts: Table returned by IncidentSnapshot.score_severity_counts
+        to_severity: Function converting a risk score to a severity
+
+    Returns:
+        Number of incidents each run mode would update, the resulting severity
+        distribution, and the (current -> target) transitions of a forced run
+    """
+    unknown = SEVERITIES.index("unknown")
+    result = {
+        "would_update": 0,  # default mode, "unknown" severities only
+        "would_update_force": 0,  # --force
+        "distribution": {severity: 0 for severity in SEVERITIES},
+        "transitions": defaultdict(int),
+    }
+
+    for row_index, row in enumerate(counts[1:]):
+        target = to_severity(row_index)
+        for severity_index, count in enumerate(row):
+            if not count:
+                continue
+            current = SEVERITIES[severity_index]
+            result["distribution"][target] += count
+            if severity_index == unknown:
+                result["would_update"] += count
+            if current != target:
+                result["would_update_force"] += count
+                result["transitions"][f"{current} -> {target}"] += count
+
+    for severity_index, count in enumerate(counts[0]):
+        result["distribution"][SEVERITIES[severity_index]] += count
+
+    result["transitions"] = dict(sorted(result["transitions"].items()))
+    return result
+
+
+def compare_mappings(counts: List[List[int]], baseline: Callable[[int], str],
+                     candidate: Callable[[int], str]) -> int:
+    """Number of incidents whose target severity differs between two threshold tables."""
+    return sum(
+        sum(row)
+        for risk_score, row in enumerate(counts[1:])
+        if baseline(risk_score) != candidate(risk_score)
+    )
+
+
+def monthly_drift(snapshot: IncidentSnapshot) -> Dict[str, Dict[str, float]]:
+    """Number of incidents and average risk score by month of detection."""
+    totals: Dict[str, List[int]] = defaultdict(lambda: [0, 0, 0])
+    for date, risk_score in zip(snapshot.columns["date"], snapshot.columns["risk_score"]):
+        month = datetime.fromtimestamp(date, timezone.utc).strftime("%Y-%m") if date else "unknown"
+        totals[month][0] += 1
+        if risk_score != NO_RISK_SCORE:
+            totals[month][1] += 1
+            totals[month][2] += risk_score
+
+    return {
+        month: {
+            "incidents": count,
+            "scored": scored,
+            "average_risk_score": round(score_sum / scored, 1) if scored else None,
+        }
+        for month, (count, scored, score_sum) in sorted(totals.items())
+    }
@@ -8,12 +8,27 @@ Schedule this script to run daily via cron or your preferred scheduler.
 """
 
 import os
+import json
+import math
 import requests
 import time
 import argparse
-from typing import Dict, List, Optional
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 from datetime import datetime
 from dotenv import load_dotenv
+from risk_snapshot import (
+    IncidentSnapshot,
+    SEVERITIES,
+    compare_mappings,
+    detector_histogram,
+    monthly_drift,
+    risk_score_histogram,
+    simulate_mapping,
+)
 load_dotenv()
 
 # Configuration
@@ -21,6 +36,21 @@ API_KEY = os.environ.get("GITGUARDIAN_API_KEY")  # Set this environment variable
 API_BASE_URL = os.environ.get("GITGUARDIAN_API_URL", "https://api.gitguardian.com")
 DRY_RUN = os.environ.get("DRY_RUN", "true").lower() == "true"
 FORCE_UPDATE = os.environ.get("FORCE_UPDATE", "false").lower() == "true"
+UPDATE_DELAY = float(os.environ.get("UPDATE_DELAY", "0.1"))  # Pause between updates, in seconds
+CHECKPOINT_FILE = os.environ.get("CHECKPOINT_FILE")  # Optional update journal for resumable runs
+BATCH_SIZE = int(os.environ.get("BATCH_SIZE", "100"))  # Updates committed to the journal together
+WORKSPACES_FILE = os.environ.get("WORKSPACES_FILE")  # Optional JSON list of workspaces to sync
+METRICS_JSON = os.environ.get("METRICS_JSON")  # Optional path for the JSON run report
+METRICS_PROM = os.environ.get("METRICS_PROM")  # Optional path for the Prometheus textfile
+
+# Retry behaviour when the API answers 429 Too Many Requests
+MAX_RETRIES = 5
+DEFAULT_RETRY_AFTER = 10  # seconds, used when no Retry-After header is sent
+
+LATENCY_PERCENTILES = (50, 90, 95, 99)
+
+# Set to stop the workspace threads of a multi-workspace run
+SHUTDOWN = threading.Event()
 
 # Risk Score to Severity Mapping
 # Adjust these thresholds based on your organization's needs
@@ -32,12 +62,346 @@ SEVERITY_MAPPING = {
     "info": 0,  # Risk score 0-25
 }
 
-def get_severity_from_risk_score(risk_score: Optional[int]) -> str:
+class RateLimiter:
+    """
+    Paces the updates sent to a workspace, and pauses all its requests
+    after a 429 response until the Retry-After delay has passed.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.next_slot = 0.0
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self, paced: bool = True):
+        """Block until the next request can be sent."""
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.paused_until)
+            if paced:
+                slot = max(slot, self.next_slot)
+                self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def pause(self, delay: float):
+        """Hold every request for `delay` seconds."""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + delay)
+
+
+@dataclass
+class Workspace:
+    """A GitGuardian workspace to sync, with its own rate limiter."""
+
+    name: str
+    api_url: str
+    api_key: Optional[str]
+    update_delay: float = UPDATE_DELAY
+    rate_limiter: RateLimiter = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.api_url = self.api_url.rstrip("/")
+        self.rate_limiter = RateLimiter(self.update_delay)
+
+    @property
+    def log_prefix(self) -> str:
+        return f"[{self.name}] " if self.name else ""
+
+
+def default_workspace() -> Workspace:
+    """The workspace configured by GITGUARDIAN_API_KEY and GITGUARDIAN_API_URL."""
+    return Workspace(name="", api_url=API_BASE_URL, api_key=API_KEY, update_delay=UPDATE_DELAY)
+
+
+def load_workspaces(path: str) -> List[Workspace]:
+    """
+    Load workspaces from a JSON file.
+
+    The file holds a list of objects with a unique "name", an "api_url", and
+    either an "api_key" or the name of the environment variable holding it in
+    "api_key_env". "update_delay" optionally overrides UPDATE_DELAY.
+
+    Args:
+        path: Path of the JSON file
+
+    Returns:
+        List of workspaces
+    """
+    with open(path) as f:
+        configs = json.load(f)
+
+    workspaces = []
+    for config in configs:
+        api_key = config.get("api_key")
+        if not api_key and config.get("api_key_env"):
+            api_key = os.environ.get(config["api_key_env"])
+        if not api_key:
+            raise ValueError(f"No API key configured for workspace {config.get('name')}")
+
+        workspaces.append(Workspace(
+            name=config["name"],
+            api_url=config.get("api_url", "https://api.gitguardian.com"),
+            api_key=api_key,
+            update_delay=float(config.get("update_delay", UPDATE_DELAY)),
+        ))
+
+    names = [workspace.name for workspace in workspaces]
+    if len(set(names)) != len(names):
+        raise ValueError("Workspace names must be unique")
+    return workspaces
+
+
+@dataclass
+class RunMetrics:
+    """Timings and counters collected during a sync run."""
+
+    started_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    pages_fetched: int = 0
+    fetch_latencies: List[float] = field(default_factory=list)
+    update_latencies: List[float] = field(default_factory=list)
+    rate_limited: int = 0
+    throttled_seconds: float = 0.0
+    transitions: Dict[Tuple[str, str], int] = field(
+        default_factory=lambda: defaultdict(int)
+    )
+
+    def record_request(self, kind: str, elapsed: float):
+        """Record the latency of a single API request ("fetch" or "update")."""
+        if kind == "fetch":
+            self.fetch_latencies.append(elapsed)
+        else:
+            self.update_latencies.append(elapsed)
+
+    def record_throttle(self, delay: float):
+        """Record a 429 response and the time spent waiting before retrying."""
+        self.rate_limited += 1
+        self.throttled_seconds += delay
+
+    def record_transition(self, current_severity: Optional[str], target_severity: str):
+        """Record a severity change (from -> to)."""
+        self.transitions[(current_severity or "unknown", target_severity)] += 1
+
+    def finish(self):
+        self.finished_at = time.time()
+
+    @property
+    def runtime_seconds(self) -> float:
+        return (self.finished_at or time.time()) - self.started_at
+
+    def to_dict(self, stats: Dict[str, int]) -> Dict:
+        """Build the JSON run report."""
+        matrix: Dict[str, Dict[str, int]] = defaultdict(dict)
+        for (current, target), count in sorted(self.transitions.items()):
+            matrix[current][target] = count
+
+        return {
+            "started_at": datetime.fromtimestamp(self.started_at).isoformat(),
+            "runtime_seconds": round(self.runtime_seconds, 3),
+            "dry_run": DRY_RUN,
+            "stats": stats,
+            "pages_fetched": self.pages_fetched,
+            "fetch_latency_seconds": latency_summary(self.fetch_latencies),
+            "update_latency_seconds": latency_summary(self.update_latencies),
+            "rate_limited_responses": self.rate_limited,
+            "throttled_seconds": round(self.throttled_seconds, 3),
+            "severity_transitions": matrix,
+        }
+
+    def prometheus_samples(self, stats: Dict[str, int]) -> List[Tuple[str, str, str, Dict[str, str], float]]:
+        """List the report samples as (name, type, help, labels, value) tuples."""
+        samples = [
+            ("last_run_timestamp_seconds", "gauge", "Unix time the last run started.",
+             {}, round(self.started_at, 3)),
+            ("runtime_seconds", "gauge", "Total runtime of the last run.",
+             {}, round(self.runtime_seconds, 3)),
+            ("dry_run", "gauge", "1 if the last run was a dry run.", {}, int(DRY_RUN)),
+        ]
+        samples += [
+            ("incidents", "gauge", "Incidents seen in the last run, by outcome.",
+             {"outcome": key}, value)
+            for key, value in stats.items()
+        ]
+        samples.append(("pages_fetched", "gauge", "Incident pages fetched in the last run.",
+                        {}, self.pages_fetched))
+        for kind, latencies in (("fetch", self.fetch_latencies), ("update", self.update_latencies)):
+            summary = latency_summary(latencies)
+            samples += [
+                (f"{kind}_latency_seconds", "gauge",
+                 f"Latency percentiles of {kind} requests in the last run.",
+                 {"quantile": str(pct / 100)}, summary[f"p{pct}"])
+                for pct in LATENCY_PERCENTILES
+            ]
+        samples += [
+            ("rate_limited_responses", "gauge", "HTTP 429 responses received in the last run.",
+             {}, self.rate_limited),
+            ("throttled_seconds", "gauge", "Time spent waiting on rate limits in the last run.",
+             {}, round(self.throttled_seconds, 3)),
+        ]
+        samples += [
+            ("severity_transitions", "gauge",
+             "Severity changes made in the last run, by source and target severity.",
+             {"from": current, "to": target}, count)
+            for (current, target), count in sorted(self.transitions.items())
+        ]
+        return samples
+
+
+def escape_label_value(value: str) -> str:
+    """
+    Escape a label value as required by the Prometheus text exposition format.
+
+    Args:
+        value: raw label value, e.g. a workspace name
+
+    Returns:
+        The value with backslashes, double quotes and line feeds escaped
+    """
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_prometheus(runs: List[Tuple[Dict[str, str], Dict[str, int], RunMetrics]]) -> str:
+    """
+    Build run reports in the Prometheus text exposition format.
+
+    Args:
+        runs: (extra labels, stats, metrics) of each run to export
+
+    Returns:
+        The textfile content, with one HELP/TYPE header per metric
+    """
+    prefix = "gitguardian_risk_sync"
+    families: Dict[str, Tuple[str, str, List[str]]] = {}
+
+    for extra_labels, stats, metrics in runs:
+        for name, kind, help_text, labels, value in metrics.prometheus_samples(stats):
+            labels = {**extra_labels, **labels}
+            label_text = ",".join(
+                f'{key}="{escape_label_value(val)}"' for key, val in labels.items()
+            )
+            label_text = f"{{{label_text}}}" if label_text else ""
+            families.setdefault(name, (kind, help_text, []))[2].append(
+                f"{prefix}_{name}{label_text} {value}"
+            )
+
+    lines = []
+    for name, (kind, help_text, samples) in families.items():
+        lines.append(f"# HELP {prefix}_{name} {help_text}")
+        lines.append(f"# TYPE {prefix}_{name} {kind}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+
+class UpdateJournal:
+    """
+    Append-only checkpoint journal of a live run, used to resume it after a crash.
+
+    The first line describes the run (API URL and update mode). Every following
+    line is a committed batch: the ids of the incidents updated in that batch and
+    the pagination cursor (URL of the page to fetch) to resume from. A torn last
+    line, left by a crash during a write, is ignored on load. At most one batch of
+    updates can be sent again after a restart.
+    """
+
+    def __init__(self, path: str, force_update: bool, batch_size: int = BATCH_SIZE,
+                 api_url: Optional[str] = None):
+        self.path = path
+        self.batch_size = batch_size
+        self.run_info = {"api_url": api_url or API_BASE_URL, "force": force_update}
+        self.cursor: Optional[str] = None
+        self.completed: Set[int] = set()
+        self.pending: List[int] = []
+        self.pending_cursor: Optional[str] = None
+
+        exists = os.path.exists(path)
+        if exists:
+            self._load()
+        self.file = open(path, "a")
+        if not exists:
+            self._write(self.run_info)
+
+    def _load(self):
+        with open(self.path) as f:
+            lines = f.read().splitlines()
+
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+
+        if records and records[0] != self.run_info:
+            raise ValueError(
+                f"Checkpoint {self.path} was written by a different run ({records[0]}). "
+                "Remove it to start over."
+            )
+
+        for record in records[1:]:
+            self.completed.update(record["completed"])
+            self.cursor = record["cursor"]
+
+    def _write(self, record: Dict):
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def is_completed(self, incident_id: int) -> bool:
+        return incident_id in self.completed
+
+    def add(self, incident_id: int, cursor: Optional[str]):
+        """Record an updated incident, committing the batch once it is full."""
+        self.pending.append(incident_id)
+        self.pending_cursor = cursor
+        if len(self.pending) >= self.batch_size:
+            self.commit(cursor)
+
+    def commit(self, cursor: Optional[str]):
+        """Durably record the pending updates and the cursor to resume from."""
+        self._write({"cursor": cursor, "completed": self.pending})
+        self.completed.update(self.pending)
+        self.pending = []
+        self.cursor = cursor
+
+    def close(self, finished: bool = False):
+        """Close the journal, removing it if the run went through all the pages."""
+        if self.file.closed:
+            return
+        if self.pending:
+            self.commit(self.pending_cursor)
+        self.file.close()
+        if finished:
+            os.remove(self.path)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of values (0.0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def latency_summary(latencies: List[float]) -> Dict[str, float]:
+    """Summarize request latencies with the usual percentiles."""
+    summary = {"count": len(latencies)}
+    for pct in LATENCY_PERCENTILES:
+        summary[f"p{pct}"] = round(percentile(latencies, pct), 4)
+    summary["max"] = round(max(latencies), 4) if latencies else 0.0
+    return summary
+
+
+def get_severity_from_risk_score(risk_score: Optional[int],
+                                 mapping: Optional[Dict[str, int]] = None) -> str:
     """
     Convert a risk score (0-100) to a severity level.
 
     Args:
         risk_score: Integer between 0-100, or None
+        mapping: Threshold table to use instead of SEVERITY_MAPPING
 
     Returns:
         Severity level string (critical, high, medium, low, info, or unknown)
@@ -45,39 +409,96 @@ def get_severity_from_risk_score(risk_score: Optional[int]) -> str:
     if risk_score is None:
         return "unknown"
 
-    if risk_score >= SEVERITY_MAPPING["critical"]:
+    mapping = mapping or SEVERITY_MAPPING
+
+    if risk_score >= mapping["critical"]:
         return "critical"
-    elif risk_score >= SEVERITY_MAPPING["high"]:
+    elif risk_score >= mapping["high"]:
         return "high"
-    elif risk_score >= SEVERITY_MAPPING["medium"]:
+    elif risk_score >= mapping["medium"]:
         return "medium"
-    elif risk_score >= SEVERITY_MAPPING["low"]:
+    elif risk_score >= mapping["low"]:
         return "low"
     else:
         return "info"
 
-def get_headers() -> Dict[str, str]:
+def get_headers(workspace: Optional[Workspace] = None) -> Dict[str, str]:
     """Get API headers with authentication."""
-    if not API_KEY:
+    workspace = workspace or default_workspace()
+    if not workspace.api_key:
         raise ValueError("GITGUARDIAN_API_KEY environment variable not set")
 
     return {
-        "Authorization": f"Token {API_KEY}",
+        "Authorization": f"Token {workspace.api_key}",
         "Content-Type": "application/json"
     }
 
-def fetch_open_incidents(url: Optional[str] = None) -> tuple:
+def get_retry_delay(response: requests.Response, attempt: int) -> float:
+    """Seconds to wait before retrying a rate limited request."""
+    retry_after = response.headers.get("Retry-After")
+    try:
+        return max(float(retry_after), 0.0)
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER * (2 ** attempt)
+
+def send_request(method: str, url: str, kind: str,
+                 metrics: Optional[RunMetrics] = None,
+                 workspace: Optional[Workspace] = None, **kwargs) -> requests.Response:
+    """
+    Send an API request, waiting and retrying when rate limited (HTTP 429).
+
+    Updates are paced by the rate limiter of the workspace, and a 429 response
+    pauses all the requests of the workspace until Retry-After has passed.
+
+    Args:
+        method: HTTP method
+        url: Full URL of the request
+        kind: "fetch" or "update", used to classify the latency in the metrics
+        metrics: Optional run metrics to record latencies and throttling into
+        workspace: Workspace to send the request to (default: environment configuration)
+
+    Returns:
+        The last response received
+    """
+    workspace = workspace or default_workspace()
+    headers = get_headers(workspace)
+
+    for attempt in range(MAX_RETRIES + 1):
+        workspace.rate_limiter.wait(paced=kind == "update" and attempt == 0)
+        start = time.monotonic()
+        response = requests.request(method, url, headers=headers, **kwargs)
+        if metrics is not None:
+            metrics.record_request(kind, time.monotonic() - start)
+
+        if response.status_code != 429 or attempt == MAX_RETRIES:
+            return response
+
+        delay = get_retry_delay(response, attempt)
+        print(f"{workspace.log_prefix}Rate limited by the API, retrying in {delay:.1f}s")
+        if metrics is not None:
+            metrics.record_throttle(delay)
+        workspace.rate_limiter.pause(delay)
+
+    return response
+
+def fetch_open_incidents(url: Optional[str] = None,
+                         metrics: Optional[RunMetrics] = None,
+                         workspace: Optional[Workspace] = None) -> tuple:
     """
     Fetch open incidents from GitGuardian API.
 
     Args:
         url: Full URL for paginated request, or None for first page
+        metrics: Optional run metrics to record the request into
+        workspace: Workspace to fetch from (default: environment configuration)
 
     Returns:
         Tuple of (response data, next_url)
     """
+    workspace = workspace or default_workspace()
+
     if url is None:
-        url = f"{API_BASE_URL}/v1/incidents/secrets"
+        url = f"{workspace.api_url}/v1/incidents/secrets"
         params = {
             "status": "TRIGGERED",  # Only open incidents
             "per_page": 100,
@@ -85,13 +506,19 @@ def fetch_open_incidents(url: Optional[str] = None) -> tuple:
     else:
         params = None  # URL already contains all parameters
 
-    response = requests.get(
+    response = send_request(
+        "GET",
         url,
-        headers=get_headers(),
+        "fetch",
+        metrics,
+        workspace,
         params=params if params else None
     )
     response.raise_for_status()
 
+    if metrics is not None:
+        metrics.pages_fetched += 1
+
     # Get next URL from Link header
     next_url = None
     if "next" in response.links:
@@ -99,26 +526,71 @@ def fetch_open_incidents(url: Optional[str] = None) -> tuple:
 
     return response.json(), next_url
 
-def update_incident_severity(incident_id: int, severity: str) -> bool:
+def fetch_incident(incident_id: int, metrics: Optional[RunMetrics] = None,
+                   workspace: Optional[Workspace] = None) -> Dict:
+    """
+    Fetch a single incident from GitGuardian API.
+
+    Args:
+        incident_id: The incident ID to fetch
+        metrics: Optional run metrics to record the request into
+        workspace: Workspace of the incident (default: environment configuration)
+
+    Returns:
+        The incident dictionary
+    """
+    workspace = workspace or default_workspace()
+    url = f"{workspace.api_url}/v1/incidents/secrets/{incident_id}"
+
+    response = send_request("GET", url, "fetch", metrics, workspace)
+    response.raise_for_status()
+    return response.json()
+
+def iter_open_incidents(metrics: Optional[RunMetrics] = None,
+                        workspace: Optional[Workspace] = None) -> Iterator[Dict]:
+    """
+    Stream all open incidents, page by page.
+
+    Args:
+        metrics: Optional run metrics to record the requests into
+        workspace: Workspace to fetch from (default: environment configuration)
+
+    Yields:
+        Incident dictionaries from the API
+    """
+    next_url = None
+    while True:
+        data, next_url = fetch_open_incidents(next_url, metrics, workspace)
+        incidents = data if isinstance(data, list) else data.get("results", [])
+        yield from incidents
+        if not incidents or next_url is None:
+            break
+
+def update_incident_severity(incident_id: int, severity: str,
+                             metrics: Optional[RunMetrics] = None,
+                             workspace: Optional[Workspace] = None) -> bool:
     """
     Update an incident's severity via API.
 
     Args:
         incident_id: The incident ID to update
         severity: The new severity level
+        metrics: Optional run metrics to record the request into
+        workspace: Workspace of the incident (default: environment configuration)
 
     Returns:
         True if successful, False otherwise
     """
-    url = f"{API_BASE_URL}/v1/incidents/secrets/{incident_id}"
+    workspace = workspace or default_workspace()
+    url = f"{workspace.api_url}/v1/incidents/secrets/{incident_id}"
     payload = {"severity": severity}
 
     try:
-        response = requests.patch(url, headers=get_headers(), json=payload)
+        response = send_request("PATCH", url, "update", metrics, workspace, json=payload)
         response.raise_for_status()
         return True
     except requests.exceptions.RequestException as e:
-        print(f"Error updating incident {incident_id}: {e}")
+        print(f"{workspace.log_prefix}Error updating incident {incident_id}: {e}")
         return False
 
 def should_update_severity(incident: Dict, force_update: bool = False) -> bool:
@@ -153,89 +625,345 @@ def should_update_severity(incident: Dict, force_update: bool = False) -> bool:
     # Only update if current severity differs from target
     return current_severity != target_severity
 
-def process_incidents(force_update: bool = False) -> Dict[str, int]:
+def new_stats() -> Dict[str, int]:
+    """Statistics of a sync run, all counts at zero."""
+    return {
+        "total_processed": 0,
+        "updated": 0,
+        "skipped": 0,
+        "errors": 0,
+        "resumed": 0,
+    }
+
+def process_incidents(force_update: bool = False,
+                      metrics: Optional[RunMetrics] = None,
+                      journal: Optional[UpdateJournal] = None,
+                      workspace: Optional[Workspace] = None,
+                      stats: Optional[Dict[str, int]] = None) -> Dict[str, int]:
     """
     Main function to process all open incidents.
 
     Args:
         force_update: If True, update all incidents; if False, only update "unknown" severity
+        metrics: Optional run metrics filled in while processing
+        journal: Optional checkpoint journal; the run resumes from its cursor,
+            skips the incidents it already updated and records new updates in it
+        workspace: Workspace to sync (default: environment configuration)
+        stats: Optional statistics dictionary filled in while processing, so that
+            the caller keeps the counts of a run that fails
 
     Returns:
         Statistics dictionary with counts
     """
-    stats = {
-        "total_processed": 0,
-        "updated": 0,
-        "skipped": 0,
-        "errors": 0,
-    }
+    if stats is None:
+        stats = new_stats()
 
-    print(f"Starting risk score to severity sync - {datetime.now().isoformat()}")
-    print(f"Mode: {'DRY RUN' if DRY_RUN else 'LIVE'}")
-    print(f"Update mode: {'ALL severities' if force_update else 'UNKNOWN severity only'}")
-    print(f"API Base URL: {API_BASE_URL}")
-    print("-" * 80)
+    workspace = workspace or default_workspace()
+    prefix = workspace.log_prefix
+
+    print(f"{prefix}Starting risk score to severity sync - {datetime.now().isoformat()}")
+    print(f"{prefix}Mode: {'DRY RUN' if DRY_RUN else 'LIVE'}")
+    print(f"{prefix}Update mode: {'ALL severities' if force_update else 'UNKNOWN severity only'}")
+    print(f"{prefix}API Base URL: {workspace.api_url}")
 
     next_url = None
+    if journal is not None:
+        next_url = journal.cursor
+        print(f"{prefix}Checkpoint: {journal.path} "
+              f"({len(journal.completed)} incidents already updated)")
+    print("-" * 80)
+
+    finished = False
 
     while True:
+        page_url = next_url
         try:
-            data, next_url = fetch_open_incidents(next_url)
+            data, next_url = fetch_open_incidents(page_url, metrics, workspace)
         except requests.exceptions.RequestException as e:
-            print(f"Error fetching incidents: {e}")
+            print(f"{prefix}Error fetching incidents: {e}")
             stats["errors"] += 1
             break
 
         incidents = data if isinstance(data, list) else data.get("results", [])
 
         if not incidents:
+            finished = True
             break
 
         for incident in incidents:
+            if SHUTDOWN.is_set():
+                raise KeyboardInterrupt
+
             incident_id = incident.get("id")
             risk_score = incident.get("risk_score")
             current_severity = incident.get("severity")
 
             stats["total_processed"] += 1
 
+            if journal is not None and journal.is_completed(incident_id):
+                stats["resumed"] += 1
+                continue
+
             if not should_update_severity(incident, force_update):
                 stats["skipped"] += 1
                 continue
 
             target_severity = get_severity_from_risk_score(risk_score)
 
-            print(f"Incident {incident_id}: "
+            print(f"{prefix}Incident {incident_id}: "
                   f"Risk Score={risk_score} | "
                   f"Current={current_severity} → Target={target_severity}")
 
             if not DRY_RUN:
-                if update_incident_severity(incident_id, target_severity):
+                if update_incident_severity(incident_id, target_severity, metrics, workspace):
                     stats["updated"] += 1
-                    # Rate limiting - be nice to the API
-                    time.sleep(0.1)
+                    if metrics is not None:
+                        metrics.record_transition(current_severity, target_severity)
+                    if journal is not None:
+                        journal.add(incident_id, page_url)
                 else:
                     stats["errors"] += 1
             else:
                 stats["updated"] += 1
-                print("  [DRY RUN] Would update severity")
+                if metrics is not None:
+                    metrics.record_transition(current_severity, target_severity)
+                print(f"{prefix}  [DRY RUN] Would update severity")
+
+        # The page is done: commit what is left and move the cursor forward
+        if journal is not None:
+            journal.commit(next_url)
 
         # Check if there's a next page
         if next_url is None:
+            finished = True
             break
 
+    if journal is not None:
+        journal.close(finished=finished)
+
     return stats
 
-def print_summary(stats: Dict[str, int]):
+def load_candidate_mappings(path: str) -> Dict[str, Dict[str, int]]:
+    """
+    Load candidate threshold tables from a JSON file.
+
+    The file maps a candidate name to a table with the same keys as
+    SEVERITY_MAPPING, e.g. {"stricter": {"critical": 90, "high": 70, ...}}.
+    """
+    with open(path) as f:
+        candidates = json.load(f)
+
+    for name, mapping in candidates.items():
+        missing = set(SEVERITY_MAPPING) - set(mapping)
+        if missing:
+            raise ValueError(f"Candidate {name} is missing thresholds for: {', '.join(sorted(missing))}")
+    return candidates
+
+def analyze_snapshot(snapshot: IncidentSnapshot,
+                     candidates: Optional[Dict[str, Dict[str, int]]] = None) -> Dict:
+    """
+    Compute histograms of a snapshot and simulate threshold tables over it, offline.
+
+    The current SEVERITY_MAPPING is always simulated first, as "current".
+
+    Args:
+        snapshot: Snapshot of open incidents
+        candidates: Candidate threshold tables, by name
+
+    Returns:
+        Analysis report
+    """
+    counts = snapshot.score_severity_counts()
+
+    def to_severity(mapping):
+        return lambda risk_score: get_severity_from_risk_score(risk_score, mapping)
+
+    simulations = {}
+    for name, mapping in {"current": SEVERITY_MAPPING, **(candidates or {})}.items():
+        simulation = simulate_mapping(counts, to_severity(mapping))
+        simulation["thresholds"] = mapping
+        simulation["moved_vs_current"] = compare_mappings(
+            counts, to_severity(SEVERITY_MAPPING), to_severity(mapping)
+        )
+        simulations[name] = simulation
+
+    return {
+        "snapshot_created_at": snapshot.created_at,
+        "incidents": len(snapshot),
+        "risk_score_histogram": risk_score_histogram(counts),
+        "detectors": detector_histogram(snapshot),
+        "monthly_drift": monthly_drift(snapshot),
+        "simulations": simulations,
+    }
+
+def print_analysis(report: Dict):
+    """Print the main figures of an analysis report."""
+    print("\n" + "=" * 80)
+    print(f"RISK SCORE ANALYSIS - {report['incidents']} open incidents "
+          f"(snapshot of {report['snapshot_created_at']})")
+    print("=" * 80)
+    print(f"{'Risk score':<12}" + "".join(f"{severity:>10}" for severity in SEVERITIES) + f"{'Total':>10}")
+    for bucket, per_severity in report["risk_score_histogram"].items():
+        print(f"{bucket:<12}" + "".join(f"{count:>10}" for count in per_severity.values())
+              + f"{sum(per_severity.values()):>10}")
+
+    print("-" * 80)
+    print(f"{'Thresholds':<16}{'Update':>10}{'Force':>10}{'Moved':>10}   Resulting distribution")
+    for name, simulation in report["simulations"].items():
+        distribution = ", ".join(
+            f"{severity}={count}" for severity, count in simulation["distribution"].items() if count
+        )
+        print(f"{name:<16}{simulation['would_update']:>10}{simulation['would_update_force']:>10}"
+              f"{simulation['moved_vs_current']:>10}   {distribution}")
+    print("=" * 80)
+    print("Update: incidents a default run would update ('unknown' severity only)")
+    print("Force:  incidents a --force run would update")
+    print("Moved:  incidents whose target severity differs from the current SEVERITY_MAPPING")
+
+def run_analysis(args: argparse.Namespace):
+    """Take a snapshot of the open incidents and/or analyze one, without updating anything."""
+    snapshot = None
+    if args.snapshot:
+        print(f"Streaming open incidents from {API_BASE_URL} into {args.snapshot}...")
+        snapshot = IncidentSnapshot.from_incidents(iter_open_incidents())
+        snapshot.save(args.snapshot)
+        print(f"Saved {len(snapshot)} incidents to {args.snapshot}")
+
+    if args.analyze:
+        if snapshot is None or args.analyze != args.snapshot:
+            snapshot = IncidentSnapshot.load(args.analyze)
+        candidates = load_candidate_mappings(args.candidates) if args.candidates else None
+        report = analyze_snapshot(snapshot, candidates)
+        print_analysis(report)
+        if args.analysis_report:
+            write_file_atomically(args.analysis_report, json.dumps(report, indent=2) + "\n")
+
+def print_summary(stats: Dict[str, int], title: str = "EXECUTION SUMMARY"):
     """Print execution summary."""
     print("\n" + "=" * 80)
-    print("EXECUTION SUMMARY")
+    print(title)
     print("=" * 80)
     print(f"Total incidents processed: {stats['total_processed']}")
     print(f"Incidents updated:         {stats['updated']}")
     print(f"Incidents skipped:         {stats['skipped']}")
     print(f"Errors:                    {stats['errors']}")
+    if stats.get("resumed"):
+        print(f"Already updated (resumed): {stats['resumed']}")
     print("=" * 80)
 
+def combine_stats(all_stats: List[Dict[str, int]]) -> Dict[str, int]:
+    """Sum the statistics of several workspaces."""
+    combined: Dict[str, int] = defaultdict(int)
+    for stats in all_stats:
+        for key, value in stats.items():
+            combined[key] += value
+    return dict(combined)
+
+def write_file_atomically(path: str, content: str):
+    """Write a file through a temporary file so readers never see a partial report."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+def write_metrics(runs: List[Tuple[str, Dict[str, int], RunMetrics]],
+                  json_path: Optional[str] = None, prom_path: Optional[str] = None):
+    """
+    Write the run report as JSON and/or as a Prometheus textfile.
+
+    Args:
+        runs: (workspace name, stats, metrics) of each synced workspace. The name
+            is empty for the workspace configured through the environment.
+        json_path: Path of the JSON report, or None to skip it
+        prom_path: Path of the Prometheus textfile (for node_exporter's
+            textfile collector), or None to skip it
+    """
+    if json_path:
+        if len(runs) == 1 and not runs[0][0]:
+            _, stats, metrics = runs[0]
+            report = metrics.to_dict(stats)
+        else:
+            report = {
+                "stats": combine_stats([stats for _, stats, _ in runs]),
+                "runtime_seconds": round(max(metrics.runtime_seconds for _, _, metrics in runs), 3),
+                "workspaces": {name: metrics.to_dict(stats) for name, stats, metrics in runs},
+            }
+        write_file_atomically(json_path, json.dumps(report, indent=2) + "\n")
+    if prom_path:
+        write_file_atomically(prom_path, format_prometheus([
+            ({"workspace": name} if name else {}, stats, metrics)
+            for name, stats, metrics in runs
+        ]))
+
+def sync_workspace(workspace: Workspace, args: argparse.Namespace,
+                   stats: Optional[Dict[str, int]] = None,
+                   metrics: Optional[RunMetrics] = None) -> Tuple[Dict[str, int], RunMetrics]:
+    """
+    Sync one workspace, with its own checkpoint journal and run metrics.
+
+    Args:
+        workspace: Workspace to sync
+        args: Parsed command line arguments
+        stats: Optional statistics dictionary filled in while syncing
+        metrics: Optional run metrics filled in while syncing
+
+    Returns:
+        Tuple of (statistics, run metrics)
+    """
+    journal = None
+    stats = stats if stats is not None else new_stats()
+    metrics = metrics if metrics is not None else RunMetrics()
+
+    try:
+        if args.checkpoint and not DRY_RUN:
+            path = f"{args.checkpoint}.{workspace.name}" if workspace.name else args.checkpoint
+            journal = UpdateJournal(path, args.force, args.batch_size, workspace.api_url)
+
+        process_incidents(force_update=args.force, metrics=metrics,
+                          journal=journal, workspace=workspace, stats=stats)
+    finally:
+        # Keep the checkpoint of an interrupted run, with its last batch committed
+        if journal is not None:
+            journal.close()
+        metrics.finish()
+
+    return stats, metrics
+
+def sync_workspaces(workspaces: List[Workspace], args: argparse.Namespace,
+                    runs: List[Tuple[Dict[str, int], RunMetrics]]) -> List[Tuple[Dict[str, int], RunMetrics]]:
+    """
+    Sync several workspaces in parallel, one thread per workspace.
+
+    A workspace failing does not stop the others: it is reported with one more error.
+
+    Args:
+        workspaces: Workspaces to sync
+        args: Parsed command line arguments
+        runs: (statistics, run metrics) of each workspace, filled in while syncing
+    """
+    executor = ThreadPoolExecutor(max_workers=len(workspaces))
+    futures = [
+        executor.submit(sync_workspace, workspace, args, stats, metrics)
+        for workspace, (stats, metrics) in zip(workspaces, runs)
+    ]
+    results = []
+
+    try:
+        for workspace, future, (stats, metrics) in zip(workspaces, futures, runs):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f"{workspace.log_prefix}Fatal error: {e}")
+                stats["errors"] += 1
+                results.append((stats, metrics))
+    except KeyboardInterrupt:
+        SHUTDOWN.set()
+        raise
+    finally:
+        executor.shutdown(wait=True)
+
+    return results
+
 def parse_args():
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(
@@ -249,19 +977,91 @@ def parse_args():
              "By default, only incidents with 'unknown' severity are updated "
              "to preserve severities set via the Severity Rules Engine or manually."
     )
+    parser.add_argument(
+        "--checkpoint",
+        default=CHECKPOINT_FILE,
+        help="Path of an update journal used to resume an interrupted live run. "
+             "Completed incidents and the pagination cursor are recorded in it, "
+             "and it is removed once all the pages have been processed."
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=BATCH_SIZE,
+        help="Number of updates committed to the checkpoint journal together."
+    )
+    parser.add_argument(
+        "--workspaces",
+        default=WORKSPACES_FILE,
+        help="JSON file listing several workspaces to sync in parallel, each with its "
+             "own rate limiter, checkpoint and stats. Overrides GITGUARDIAN_API_KEY "
+             "and GITGUARDIAN_API_URL."
+    )
+    parser.add_argument(
+        "--snapshot",
+        help="Stream all open incidents once into a columnar snapshot file at this path, "
+             "without updating anything."
+    )
+    parser.add_argument(
+        "--analyze",
+        help="Analyze a snapshot file offline: risk score histograms and simulation "
+             "of the threshold tables given with --candidates. No API calls are made."
+    )
+    parser.add_argument(
+        "--candidates",
+        help="JSON file of candidate threshold tables to simulate with --analyze, "
+             'e.g. {"stricter": {"critical": 90, "high": 70, "medium": 45, "low": 30, "info": 0}}.'
+    )
+    parser.add_argument(
+        "--analysis-report",
+        help="Write the full --analyze report as JSON to this path."
+    )
+    parser.add_argument(
+        "--metrics-json",
+        default=METRICS_JSON,
+        help="Write a JSON run report (latencies, throttling, severity transitions) to this path."
+    )
+    parser.add_argument(
+        "--metrics-prom",
+        default=METRICS_PROM,
+        help="Write the run report as a Prometheus textfile to this path "
+             "(e.g. in the node_exporter textfile collector directory)."
+    )
     return parser.parse_args()
 
 
 def main():
     """Main entry point."""
     args = parse_args()
+    # (workspace name, stats, metrics) of each run, reported even if the sync fails
+    runs: List[Tuple[str, Dict[str, int], RunMetrics]] = []
 
     try:
-        stats = process_incidents(force_update=args.force)
-        print_summary(stats)
+        if args.snapshot or args.analyze:
+            run_analysis(args)
+            return
+
+        if args.workspaces:
+            workspaces = load_workspaces(args.workspaces)
+        else:
+            workspaces = [default_workspace()]
+        runs = [(workspace.name, new_stats(), RunMetrics()) for workspace in workspaces]
+
+        if args.workspaces:
+            results = sync_workspaces(workspaces, args, [(stats, metrics) for _, stats, metrics in runs])
+        else:
+            results = [sync_workspace(workspaces[0], args, runs[0][1], runs[0][2])]
+
+        for workspace, (stats, _) in zip(workspaces, results):
+            title = f"EXECUTION SUMMARY - {workspace.name}" if workspace.name else "EXECUTION SUMMARY"
+            print_summary(stats, title)
+
+        combined = combine_stats([stats for stats, _ in results])
+        if len(workspaces) > 1:
+            print_summary(combined, "COMBINED SUMMARY")
 
         # Exit with error code if there were errors
-        if stats["errors"] > 0:
+        if combined["errors"] > 0:
             exit(1)
 
     except KeyboardInterrupt:
@@ -270,6 +1070,13 @@ def main():
     except Exception as e:
         print(f"\nFatal error: {e}")
         exit(1)
+    finally:
+        # Partial reports of failed or interrupted runs are written too
+        if runs:
+            try:
+                write_metrics(runs, args.metrics_json, args.metrics_prom)
+            except OSError as e:
+                print(f"Could not write the run metrics: {e}")
 
 if __name__ == "__main__":
     main()
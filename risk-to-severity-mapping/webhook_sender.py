@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Fake GitGuardian webhook sender
+
+Sends signed `incident_triggered` events to webhook_service.py, including
+repeated events for the same incidents, to test it locally together with
+mock_api.py.
+
+Usage:
+    python3 mock_api.py --incidents 1000 --port 8000
+    GITGUARDIAN_API_URL=http://127.0.0.1:8000 GITGUARDIAN_API_KEY=test WEBHOOK_SECRET=secret \\
+        DRY_RUN=false python3 webhook_service.py --port 8080
+    python3 webhook_sender.py --url http://127.0.0.1:8080 --incidents 1000 --repeat 3 --secret secret
+"""
+
+import argparse
+import json
+import random
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Optional
+
+import requests
+
+from webhook_service import sign_payload
+
+
+def build_event(incident_id: int, with_risk_score: bool) -> dict:
+    """Build an incident_triggered event as sent by GitGuardian."""
+    incident = {
+        "id": incident_id,
+        "date": datetime.now(timezone.utc).isoformat(),
+        "detector": {"name": "generic_password"},
+        "severity": "unknown",
+        "status": "TRIGGERED",
+    }
+    if with_risk_score:
+        incident["risk_score"] = random.randint(0, 100)
+    return {
+        "source": "GitGuardian",
+        "timestamp": incident["date"],
+        "action": "incident_triggered",
+        "message": "A new incident has been triggered.",
+        "incident": incident,
+    }
+
+
+def send_event(url: str, event: dict, secret: Optional[str]) -> int:
+    payload = json.dumps(event).encode()
+    headers = {"Content-Type": "application/json"}
+    if secret:
+        timestamp = str(int(time.time()))
+        headers["Timestamp"] = timestamp
+        headers["Gitguardian-Signature"] = sign_payload(payload, timestamp, secret)
+    return requests.post(url, data=payload, headers=headers).status_code
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Send fake GitGuardian incident webhooks")
+    parser.add_argument("--url", default="http://127.0.0.1:8080", help="Webhook service URL")
+    parser.add_argument("--incidents", type=int, default=100, help="Number of distinct incidents")
+    parser.add_argument("--repeat", type=int, default=1, help="Events sent per incident")
+    parser.add_argument("--with-risk-score", action="store_true",
+                        help="Include a random risk score in events (otherwise the service fetches it)")
+    parser.add_argument("--secret", help="Webhook signature token")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent senders")
+    return parser.parse_args()
+
+
+def main():
+    """Main entry point."""
+    args = parse_args()
+    events = [
+        build_event(incident_id, args.with_risk_score)
+        for incident_id in range(1, args.incidents + 1)
+        for _ in range(args.repeat)
+    ]
+    random.shuffle(events)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        statuses = Counter(executor.map(lambda event: send_event(args.url, event, args.secret), events))
+    elapsed = time.perf_counter() - start
+
+    print(f"Sent {len(events)} events in {elapsed:.2f}s ({len(events) / elapsed:.1f}/s)")
+    print("Responses: " + ", ".join(f"HTTP {status}: {count}" for status, count in sorted(statuses.items())))
+    print(json.dumps(requests.get(f"{args.url}/health").json()["stats"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+GitGuardian Risk Score to Severity Webhook Service
+Long-running companion of sync_risk_to_severity.py: it receives GitGuardian
+incident webhooks and sets the severity of new incidents within seconds,
+instead of waiting for the next daily run.
+
+Events are queued, repeated events for the same incident are coalesced, and a
+bounded pool of workers applies the same rules as the batch script.
+
+Usage:
+    export GITGUARDIAN_API_KEY="your_api_key_here"
+    export WEBHOOK_SECRET="the signature token of your GitGuardian webhook"
+    DRY_RUN=false python3 webhook_service.py --port 8080 --workers 4
+"""
+
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Set
+
+import requests
+
+import sync_risk_to_severity as sync
+
+WEBHOOK_SECRET = os.environ.get("WEBHOOK_SECRET")  # Signature token of the GitGuardian webhook
+MAX_TIMESTAMP_AGE = 300  # seconds, older signed events are rejected
+RISK_SCORE_RETRIES = 5  # times an incident is re-checked while its risk score is not computed yet
+RISK_SCORE_RETRY_DELAY = 5  # seconds between those checks
+
+
+class IncidentQueue:
+    """
+    Bounded FIFO of incidents waiting for a severity update.
+
+    Events for an incident that is already queued replace the queued payload
+    instead of adding an entry. Events for an incident being processed, or
+    processed less than `dedup_window` seconds ago, are dropped.
+    """
+
+    def __init__(self, maxsize: int, dedup_window: float):
+        self.maxsize = maxsize
+        self.dedup_window = dedup_window
+        self.pending: "OrderedDict[int, Dict]" = OrderedDict()
+        self.processed_at: Dict[int, float] = {}
+        self.in_progress: Set[int] = set()
+        self.condition = threading.Condition()
+
+    def __len__(self) -> int:
+        with self.condition:
+            return len(self.pending)
+
+    def put(self, incident: Dict, force: bool = False) -> str:
+        """
+        Queue an incident.
+
+        Args:
+            incident: Incident payload of the event
+            force: Queue the incident even if it was processed recently (retries)
+
+        Returns:
+            "queued", "merged", "duplicate" or "full"
+        """
+        incident_id = incident["id"]
+        with self.condition:
+            if incident_id in self.pending:
+                self.pending[incident_id] = incident
+                return "merged"
+
+            if not force and incident_id in self.in_progress:
+                return "duplicate"
+
+            processed_at = self.processed_at.get(incident_id)
+            if not force and processed_at and time.monotonic() - processed_at < self.dedup_window:
+                return "duplicate"
+
+            if len(self.pending) >= self.maxsize:
+                return "full"
+
+            self.pending[incident_id] = incident
+            self.condition.notify()
+            return "queued"
+
+    def put_later(self, incident: Dict, delay: float):
+        """Queue an incident again after `delay` seconds."""
+        timer = threading.Timer(delay, self.put, args=(incident,), kwargs={"force": True})
+        timer.daemon = True
+        timer.start()
+
+    def get(self) -> Dict:
+        """Block until an incident is available and return it."""
+        with self.condition:
+            while not self.pending:
+                self.condition.wait()
+            incident_id, incident = self.pending.popitem(last=False)
+            self.in_progress.add(incident_id)
+            return incident
+
+    def mark_processed(self, incident_id: int):
+        with self.condition:
+            now = time.monotonic()
+            self.in_progress.discard(incident_id)
+            self.processed_at[incident_id] = now
+            # Forget incidents that left the deduplication window
+            if len(self.processed_at) > self.maxsize:
+                self.processed_at = {
+                    key: value for key, value in self.processed_at.items()
+                    if now - value < self.dedup_window
+                }
+
+
+class SeverityService:
+    """Queue and worker pool applying severities to incoming incidents."""
+
+    def __init__(self, workers: int, queue_size: int, dedup_window: float, force_update: bool = False):
+        self.queue = IncidentQueue(queue_size, dedup_window)
+        self.workers = workers
+        self.force_update = force_update
+        self.workspace = sync.default_workspace()
+        self.stats = {
+            "received": 0,
+            "queued": 0,
+            "merged": 0,
+            "duplicate": 0,
+            "rejected": 0,
+            "updated": 0,
+            "skipped": 0,
+            "retried": 0,
+            "errors": 0,
+        }
+        self.stats_lock = threading.Lock()
+
+    def count(self, key: str):
+        with self.stats_lock:
+            self.stats[key] += 1
+
+    def start(self):
+        for index in range(self.workers):
+            threading.Thread(target=self.work, name=f"severity-worker-{index}", daemon=True).start()
+
+    def submit(self, event: Dict) -> str:
+        """Queue the incident of a webhook event. Returns the queueing outcome."""
+        self.count("received")
+        incident = event.get("incident")
+        if not isinstance(incident, dict) or "id" not in incident:
+            return "ignored"
+        if incident.get("status", "TRIGGERED") != "TRIGGERED":
+            return "ignored"
+
+        incident = {**incident, "_attempts": 0}
+        outcome = self.queue.put(incident)
+        self.count("rejected" if outcome == "full" else outcome)
+        return outcome
+
+    def work(self):
+        while True:
+            incident = self.queue.get()
+            try:
+                self.process(incident)
+            except Exception as e:
+                print(f"Error processing incident {incident['id']}: {e}")
+                self.count("errors")
+            finally:
+                self.queue.mark_processed(incident["id"])
+
+    def process(self, incident: Dict):
+        """Apply the severity of an incident, fetching it when the event lacks its risk score."""
+        incident_id = incident["id"]
+
+        if incident.get("risk_score") is None:
+            try:
+                incident = {**sync.fetch_incident(incident_id, workspace=self.workspace),
+                            "_attempts": incident["_attempts"]}
+            except requests.exceptions.RequestException as e:
+                print(f"Error fetching incident {incident_id}: {e}")
+                self.count("errors")
+                return
+
+        risk_score = incident.get("risk_score")
+        if risk_score is None:
+            # The risk score is computed shortly after the incident is created
+            if incident["_attempts"] < RISK_SCORE_RETRIES:
+                incident["_attempts"] += 1
+                self.count("retried")
+                self.queue.put_later(incident, RISK_SCORE_RETRY_DELAY)
+            else:
+                self.count("skipped")
+            return
+
+        if not sync.should_update_severity(incident, self.force_update):
+            self.count("skipped")
+            return
+
+        current_severity = incident.get("severity")
+        target_severity = sync.get_severity_from_risk_score(risk_score)
+        print(f"Incident {incident_id}: "
+              f"Risk Score={risk_score} | "
+              f"Current={current_severity} → Target={target_severity}")
+
+        if sync.DRY_RUN:
+            print("  [DRY RUN] Would update severity")
+            self.count("updated")
+        elif sync.update_incident_severity(incident_id, target_severity, workspace=self.workspace):
+            self.count("updated")
+        else:
+            self.count("errors")
+
+    def health(self) -> Dict:
+        with self.stats_lock:
+            stats = dict(self.stats)
+        return {"status": "ok", "queue_length": len(self.queue), "stats": stats}
+
+
+def sign_payload(payload: bytes, timestamp: str, secret: str) -> str:
+    """Compute the Gitguardian-Signature value of a webhook payload."""
+    digest = hmac.new(f"{timestamp}{secret}".encode(), payload, hashlib.sha256).hexdigest()
+    return f"sha256={digest}"
+
+
+def verify_signature(payload: bytes, timestamp: Optional[str], signature: Optional[str], secret: str) -> bool:
+    """Check the signature of a webhook payload and reject stale timestamps."""
+    if not timestamp or not signature:
+        return False
+    try:
+        if abs(time.time() - int(timestamp)) > MAX_TIMESTAMP_AGE:
+            return False
+    except ValueError:
+        return False
+    return hmac.compare_digest(sign_payload(payload, timestamp, secret), signature)
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    server: "WebhookServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status: int, payload: Dict):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self.send_json(200, self.server.service.health())
+        else:
+            self.send_json(404, {"detail": "Not found."})
+
+    def do_POST(self):
+        payload = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        if self.server.secret and not verify_signature(
+            payload,
+            self.headers.get("Timestamp"),
+            self.headers.get("Gitguardian-Signature"),
+            self.server.secret,
+        ):
+            self.send_json(401, {"detail": "Invalid signature."})
+            return
+
+        try:
+            event = json.loads(payload)
+        except json.JSONDecodeError:
+            self.send_json(400, {"detail": "Invalid JSON payload."})
+            return
+
+        outcome = self.server.service.submit(event)
+        if outcome == "full":
+            self.send_json(503, {"detail": "Queue is full, retry later."})
+        else:
+            self.send_json(202, {"result": outcome})
+
+
+class WebhookServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, service: SeverityService, secret: Optional[str]):
+        super().__init__(address, WebhookHandler)
+        self.service = service
+        self.secret = secret
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Receive GitGuardian incident webhooks and set severities from risk scores"
+    )
+    parser.add_argument("--host", default="0.0.0.0", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="Number of workers updating incidents concurrently")
+    parser.add_argument("--queue-size", type=int, default=10_000,
+                        help="Maximum number of queued incidents; events are refused with HTTP 503 beyond it")
+    parser.add_argument("--dedup-window", type=float, default=300,
+                        help="Seconds during which repeated events for a processed incident are dropped")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        default=sync.FORCE_UPDATE,
+        help="Update all severities, not just 'unknown' (same as the batch script)."
+    )
+    return parser.parse_args()
+
+
+def main():
+    """Main entry point."""
+    args = parse_args()
+
+    service = SeverityService(args.workers, args.queue_size, args.dedup_window, args.force)
+    server = WebhookServer((args.host, args.port), service, WEBHOOK_SECRET)
+
+    print(f"Starting risk score to severity webhook service - listening on {args.host}:{args.port}")
+    print(f"Mode: {'DRY RUN' if sync.DRY_RUN else 'LIVE'}")
+    print(f"Update mode: {'ALL severities' if args.force else 'UNKNOWN severity only'}")
+    print(f"API Base URL: {service.workspace.api_url}")
+    if not WEBHOOK_SECRET:
+        print("WARNING: WEBHOOK_SECRET is not set, webhook signatures are not verified")
+    print("-" * 80)
+
+    service.start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n\nService stopped by user")
+    finally:
+        server.server_close()
+        print(json.dumps(service.health()["stats"]))
+
+
+if __name__ == "__main__":
+    main()
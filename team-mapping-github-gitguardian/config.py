@@ -3,6 +3,7 @@ import logging
 from functools import cached_property
 from pygitguardian.client import GGClient
 import requests
+from requests.adapters import HTTPAdapter
 from github import Auth, Github, GithubRetry
 
 
@@ -90,9 +91,36 @@ class Config:
             return value.lower() == "true"
         return True
 
+    @property
+    def team_sync_workers(self) -> int:
+        """
+        The number of teams whose perimeter is synchronized concurrently.
+        """
+        return int(self._env("TEAM_SYNC_WORKERS", "8"))
+
+    @property
+    def github_concurrency(self) -> int:
+        """
+        The maximum number of concurrent requests to the GitHub API while
+        synchronizing the team perimeters.
+        """
+        return int(self._env("GITHUB_CONCURRENCY", "4"))
+
+    @property
+    def gitguardian_concurrency(self) -> int:
+        """
+        The maximum number of concurrent requests to the GitGuardian API while
+        synchronizing the team perimeters.
+        """
+        return int(self._env("GITGUARDIAN_CONCURRENCY", "4"))
+
     @cached_property
     def gg_client(self) -> GGClient:
         session = requests.Session()
+        # keep a connection alive for each concurrent request
+        adapter = HTTPAdapter(pool_maxsize=self.gitguardian_concurrency)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
         if not self.reuse_connections:
             session.headers = {"Connection": "close"}
         return GGClient(
@@ -107,6 +135,7 @@ class Config:
             base_url=self.github_instance,
             auth=Auth.Token(self.github_token),
             retry=GithubRetry(),
+            pool_size=self.github_concurrency,
         )
 
 
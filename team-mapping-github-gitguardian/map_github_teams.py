@@ -1,7 +1,9 @@
 import logging
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from json import JSONDecodeError
-from pygitguardian.models import Team, TeamMember, TeamInvitation, Member, Invitation
+from pygitguardian.models import Team, TeamMember, TeamInvitation, Member, Invitation, Source
 from github.Team import Team as GHTeam
 from github.Repository import Repository as GHRepository
 from gitguardian_calls import (
@@ -130,31 +132,65 @@ def delete_extra_teams(
 
 
 def sync_team_perimeters(gh_teams_by_id: dict[int, GHTeam], gg_teams_by_gh_id: dict[int, Team]):
-    """Synchronize the perimeter of the team to the repositories it has access on GitHub."""
+    """
+    Synchronize the perimeter of the teams to the repositories they have access on GitHub.
+    Teams are processed concurrently, while the requests to each API are capped by
+    the GitHub and GitGuardian concurrency settings.
+    """
     gg_sources_by_gh_id = {int(source.external_id): source for source in list_all_gg_sources()}
-
-    for gh_id, gh_team in gh_teams_by_id.items():
-        gg_team = gg_teams_by_gh_id[gh_id]
-
-        current_gh_repo_ids = set(
-            repo.id for repo in gh_team.get_repos() if team_has_maintainer_permission(gh_team, repo)
-        )
+    github_limiter = threading.BoundedSemaphore(CONFIG.github_concurrency)
+    gitguardian_limiter = threading.BoundedSemaphore(CONFIG.gitguardian_concurrency)
+
+    with ThreadPoolExecutor(max_workers=CONFIG.team_sync_workers) as executor:
+        futures = [
+            executor.submit(
+                sync_team_perimeter,
+                gh_team,
+                gg_teams_by_gh_id[gh_id],
+                gg_sources_by_gh_id,
+                github_limiter,
+                gitguardian_limiter,
+            )
+            for gh_id, gh_team in gh_teams_by_id.items()
+        ]
+        for future in futures:
+            future.result()
+
+
+def sync_team_perimeter(
+    gh_team: GHTeam,
+    gg_team: Team,
+    gg_sources_by_gh_id: dict[int, Source],
+    github_limiter: threading.BoundedSemaphore,
+    gitguardian_limiter: threading.BoundedSemaphore,
+):
+    """Synchronize the perimeter of a team to the repositories it has access on GitHub."""
+    with github_limiter:
+        gh_repos = list(gh_team.get_repos())
+    current_gh_repo_ids = set()
+    for repo in gh_repos:
+        with github_limiter:
+            if team_has_maintainer_permission(gh_team, repo):
+                current_gh_repo_ids.add(repo.id)
+
+    with gitguardian_limiter:
         old_gh_repo_ids = {int(source.external_id) for source in list_team_sources(gg_team)}
 
-        gh_repo_ids_to_add = current_gh_repo_ids - old_gh_repo_ids
-        gh_repo_ids_to_remove = old_gh_repo_ids - current_gh_repo_ids
+    gh_repo_ids_to_add = current_gh_repo_ids - old_gh_repo_ids
+    gh_repo_ids_to_remove = old_gh_repo_ids - current_gh_repo_ids
 
-        sources_to_add = [
-            gg_sources_by_gh_id[gh_repo_id].id
-            for gh_repo_id in gh_repo_ids_to_add
-            if gg_sources_by_gh_id.get(gh_repo_id)
-        ]
-        sources_to_remove = [
-            gg_sources_by_gh_id[gh_repo_id].id
-            for gh_repo_id in gh_repo_ids_to_remove
-            if gg_sources_by_gh_id.get(gh_repo_id)
-        ]
+    sources_to_add = [
+        gg_sources_by_gh_id[gh_repo_id].id
+        for gh_repo_id in gh_repo_ids_to_add
+        if gg_sources_by_gh_id.get(gh_repo_id)
+    ]
+    sources_to_remove = [
+        gg_sources_by_gh_id[gh_repo_id].id
+        for gh_repo_id in gh_repo_ids_to_remove
+        if gg_sources_by_gh_id.get(gh_repo_id)
+    ]
 
+    with gitguardian_limiter:
         update_team_sources(
             gg_team=gg_team,
             sources_to_add=sources_to_add,